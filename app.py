@@ -1,21 +1,32 @@
 #app.py
-import json
 import streamlit as st
-import streamlit_lottie as st_lottie
 from modules.config import *
 from modules.data_manager import DataManager
-from modules.scraper import Scraper
+from modules.image_cache import ImageCache
 from modules.recipe_generator import RecipeGenerator
+from modules.recipe_cache import RecipeCache
+from modules.request_gate import shared_gate
+from modules.assets import asset_registry
+from modules.llm_backends import GeminiBackend, MockBackend
 from modules.ui_components import (
     render_sidebar, 
-    render_product_card, 
+    render_macro_balance,
+    render_product_grid,
     render_add_product_form, 
+    render_top_products,
+    render_diet_optimizer,
+    render_pareto_frontier,
     render_recipe_generator, 
+    render_weekly_recipes,
     render_nutrition_comparison,
+    render_meal_plan,
+    render_sensitivity_sweep,
     donation_footer
 )
-from utils.calculations import calculate_daily_consumption, calculate_optimal_purchase
-from utils.constants import MEAT_TYPES
+from utils.calculation_cache import cached_product_calculations, product_calculations_cache
+from utils.macro_balance import MacroBalanceTracker
+from utils.meal_planner import MealPlanner
+from utils.constants import MEAT_TYPES, MEALS
 import logging
 from datetime import datetime
 import calendar
@@ -24,19 +35,47 @@ import calendar
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize components
-data_manager = DataManager(DATA_DIR)
-scraper = Scraper(CHROME_OPTIONS)
-recipe_generator = RecipeGenerator(st.secrets["GEMINIAPI"]["key"])
-
-# Function to load the Lottie file
-def load_lottie_file(filepath: str):
-    with open(filepath, "r") as f:
-        return json.load(f)
+# Recursos compartidos por todas las sesiones: se crean una vez por proceso,
+# la primera vez que se usan, y no en cada rerun
+@st.cache_resource
+def get_data_manager():
+    # El catálogo y sus índices viven en esta instancia y se invalidan al escribir
+    manager = DataManager(
+        DATA_DIR, backup_retention=BACKUP_RETENTION, data_format=DATA_FORMAT,
+        image_cache=ImageCache(THUMBNAIL_DIR, **THUMBNAILS)
+    )
+    # Miniaturas que faltan (catálogo editado a mano o caché borrada), sin bloquear el arranque
+    manager.refresh_thumbnails()
+    return manager
+
+@st.cache_resource
+def get_scraper():
+    # selenium, webdriver_manager, zenrows y bs4 solo se cargan al scrapear
+    from modules.scraper import Scraper
+    return Scraper(CHROME_OPTIONS)
+
+@st.cache_resource
+def get_llm_backend():
+    if LLM_BACKEND == 'mock':
+        return MockBackend(**MOCK_LLM)
+    return GeminiBackend(st.secrets["GEMINIAPI"]["key"])
+
+@st.cache_resource
+def get_recipe_cache():
+    return RecipeCache(RECIPE_CACHE_DIR, **RECIPE_CACHE)
+
+data_manager = get_data_manager()
+
+def get_recipe_generator():
+    """Generador de la sesión; el modelo, la caché y el límite de llamadas son del proceso"""
+    return RecipeGenerator(
+        backend=get_llm_backend(),
+        cache=get_recipe_cache(),
+        gate=shared_gate('recipes', **RECIPE_CONCURRENCY)
+    )
 
-# Load the Lottie animation
-lottie_path = f"{LOGOS_DIR}/gemini_logo.json"
-gemini_logo = load_lottie_file(lottie_path)
+# Logos, imágenes y animaciones se leen y codifican una vez por proceso
+asset_registry.preload()
 
 def validate_url(url):
     """Validate Makro URL"""
@@ -60,15 +99,14 @@ def main():
     # Get the current theme
     theme = st.get_option("theme.base")
 
-    # Cargar datos de productos ANTES de usarlos
-    products = data_manager.load_food_data()
-    
-    # Obtener los tipos de productos disponibles
-    product_types = list(set(product['type'] for product in products.values() if product.get('type') is not None))
-    product_types.insert(0, 'Todos')  # Agregar opción para mostrar todos los productos
+    # Catálogo e índice de tipos compartidos por todas las sesiones
+    catalog = data_manager.catalog_view(use_snapshot=USE_CATALOG_SNAPSHOT)
+    products = catalog.products
+    product_types = catalog.product_types  # 'Todos' y luego los tipos disponibles
 
     # Renderizar sidebar y obtener preferencias del usuario
     user_prefs = render_sidebar()
+    balance_placeholder = st.sidebar.empty()
     
     # Filtro por tipo de producto
     col1, col2 = st.columns([1, 4])
@@ -78,17 +116,13 @@ def main():
     # Inicializar la lista de productos seleccionados en la sesión
     if 'selected_products' not in st.session_state:
         st.session_state.selected_products = []
+    if 'macro_balance' not in st.session_state:
+        st.session_state.macro_balance = MacroBalanceTracker()
     
-    # Filtrar productos según el tipo seleccionado
-    if selected_type != 'Todos':
-        filtered_products = {url: product for url, product in products.items() if product.get('type') == selected_type}
-    else:
-        filtered_products = products
+    # Productos del tipo seleccionado (lista precalculada)
+    available_options = catalog.urls_of_type(selected_type)
 
     with col2:
-        # Mostrar solo los productos filtrados en las opciones, pero mantener los seleccionados
-        available_options = list(filtered_products.keys())
-        
         # Asegurarse de que los productos ya seleccionados estén disponibles en las opciones
         all_options = list(set(available_options + st.session_state.selected_products))
         
@@ -96,73 +130,104 @@ def main():
             "Selecciona los productos",
             options=all_options,
             default=st.session_state.selected_products,
-            format_func=lambda x: products[x]['name']
+            format_func=lambda x: catalog.names[x]
         )
         
         # Actualizar la sesión con las nuevas selecciones
         st.session_state.selected_products = new_selections
 
+    # Quitar del balance los productos deseleccionados
+    macro_balance = st.session_state.macro_balance
+    macro_balance.retain(st.session_state.selected_products)
+
+    # Plan diario del mes; se reinicia si cambia el mes seleccionado
+    plan_key = (user_prefs['month'], user_prefs['days_in_month'])
+    if st.session_state.get('meal_plan_key') != plan_key:
+        st.session_state.meal_plan_key = plan_key
+        st.session_state.meal_planner = MealPlanner(user_prefs['days_in_month'], MEALS)
+    meal_plan_items = {}
+
     # Usar st.session_state.selected_products para el resto de la lógica
     if st.session_state.selected_products:
+        cards = []
         for product_url in st.session_state.selected_products:
             product = products[product_url]
             # Validar si el producto tiene información nutricional
             if not product.get('nutrition'):
                 st.warning(f"No hay información nutricional para {product['name']}")
+                macro_balance.remove(product_url)
                 continue
 
-            # Manejar información de precios de forma segura
-            regular_price = product.get('price', {}).get('regular_price')
-            promo_price = None
-            promo_units = None
-            
-            if product.get('price', {}).get('promotion'):
-                promo_price = product['price']['promotion'].get('price')
-                promo_units = product['price']['promotion'].get('units')
-            
-            consumption = calculate_daily_consumption(
+            # Consumo y compra memorizados entre reruns y sesiones
+            consumption, purchase = cached_product_calculations(
+                product_url,
+                product,
                 protein_needed=user_prefs['daily_protein'] / len(st.session_state.selected_products),
-                protein_per_100g=product['nutrition']['protein'],
-                weight_gr=product['weight_gr']
-            )
-            
-            purchase = calculate_optimal_purchase(
-                units_daily=consumption['units'],
-                regular_price=regular_price,
-                promo_price=promo_price,
-                promo_units=promo_units,
                 days=user_prefs['days_in_month']
             )
-            
-            # Renderizar tarjeta del producto
-            render_product_card(product, theme)
-
-            # Mostrar consumo diario y compra mensual óptima
-            col1, col2 = st.columns(2)
-            with col1:
-                st.markdown(f"""
-                    **Consumo diario:**
-                    - Gramos: {consumption['grams']:.1f}g
-                    - Unidades: {consumption['units']:.2f}
-                """)
-            
-            with col2:
-                st.markdown(f"""
-                    **Compra mensual óptima:**
-                    - Total unidades: {purchase['units']}
-                    - Costo total: S/ {purchase.get('total_cost', 'N/A'):.2f}
-                    - Costo diario: S/ {purchase.get('daily_cost', 'N/A'):.2f}
-                """)
+            macro_balance.set(product_url, product['nutrition'], consumption['grams'])
+            meal_plan_items[product_url] = {
+                'name': product['name'],
+                'grams_daily': consumption['grams'],
+                'weight_gr': product['weight_gr'],
+                'units': purchase['units']
+            }
+            cards.append({'product': product, 'consumption': consumption, 'purchase': purchase})
+
+        render_macro_balance(balance_placeholder, macro_balance.balance(user_prefs))
+
+        # Todas las tarjetas, con su consumo y compra, en un solo componente paginado
+        render_product_grid(cards, theme, image_cache=data_manager.image_cache, **PRODUCT_GRID)
+
+        cache_stats = product_calculations_cache.stats()
+        st.sidebar.caption(
+            f"Caché de cálculos: {cache_stats['hits']} aciertos, {cache_stats['misses']} fallos "
+            f"({cache_stats['size']}/{cache_stats['maxsize']} entradas)"
+        )
+
+        # En el mes en curso solo se replanifican los días desde hoy
+        from_day = datetime.now().day - 1 if user_prefs['month'] == calendar.month_name[datetime.now().month] else 0
+        st.session_state.meal_planner.sync(meal_plan_items, from_day=from_day)
+        with st.expander("Plan diario del mes"):
+            render_meal_plan(st.session_state.meal_planner, user_prefs)
+
+        # Barrido de escenarios sin recalcular la página por cada punto
+        with st.expander("¿Qué pasa si...? Costo según peso y proteína"):
+            render_sensitivity_sweep({url: products[url] for url in st.session_state.selected_products}, user_prefs)
 
         # Renderizar comparación nutricional
-        render_nutrition_comparison({url: products[url] for url in st.session_state.selected_products})
+        render_nutrition_comparison(catalog, st.session_state.selected_products)
 
         # Renderizar generador de recetas
-        render_recipe_generator(recipe_generator, {url: products[url] for url in st.session_state.selected_products}, user_prefs)
+        recipe_generator = get_recipe_generator()
+        render_recipe_generator(
+            recipe_generator,
+            {url: products[url] for url in st.session_state.selected_products},
+            user_prefs,
+            data_manager.get_ingredient_matcher()
+        )
+
+        # Una receta por día del plan, generadas en paralelo
+        with st.expander("Recetas de la semana"):
+            render_weekly_recipes(recipe_generator, st.session_state.meal_planner, user_prefs, RECIPE_BATCH)
+
+    # Ranking de productos por métricas derivadas
+    with st.expander("Mejores productos por costo y nutrientes"):
+        render_top_products(data_manager, product_types, user_prefs)
+
+    # Productos no dominados en precio por proteína y grasa
+    with st.expander("Frontera de Pareto: precio por proteína vs grasa"):
+        render_pareto_frontier(data_manager, product_types)
+
+    # Optimizador de compra sobre todo el catálogo
+    with st.expander("Optimizar compra al menor costo"):
+        render_diet_optimizer(data_manager, product_types, user_prefs, **OPTIMIZER)
 
     # Renderizar formulario para agregar nuevos productos
     with st.expander("Agregar nuevo producto"):
-        producto_agregado = render_add_product_form(data_manager)
+        producto_agregado = render_add_product_form(
+            data_manager, fetch_product=lambda url_data: get_scraper().get_product_info(url_data)
+        )
         if producto_agregado:
             st.rerun()  # Recargar la aplicación para mostrar el nuevo producto
 
@@ -175,7 +240,7 @@ def main():
     #         updated_products = {}
             
     #         for product_url_data in products_urls:
-    #             product_info = scraper.get_product_info(product_url_data)
+    #             product_info = get_scraper().get_product_info(product_url_data)
     #             if product_info:
     #                 updated_products[product_url_data['url']] = product_info
             
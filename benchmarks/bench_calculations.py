@@ -0,0 +1,154 @@
+# benchmarks/bench_calculations.py
+"""
+Mide las funciones de utils.calculations sobre catálogos sintéticos y
+compara con una línea base guardada en la misma máquina
+
+Las propiedades de los cálculos se verifican en tests/test_calculations.py;
+este script es opcional y solo mide tiempos. La línea base no se versiona:
+los tiempos absolutos dependen de la máquina.
+
+Uso:
+    python -m benchmarks.bench_calculations --save-baseline
+    python -m benchmarks.bench_calculations [--sizes 10 100 1000 10000 100000]
+
+Termina con código 1 si algún caso es más lento que la línea base por
+encima de la tolerancia.
+"""
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from benchmarks.synthetic import make_catalog
+from utils.calculations import (
+    calculate_daily_consumption,
+    calculate_optimal_purchase,
+    calculate_savings_percentage,
+    calculate_macronutrient_balance,
+    calculate_catalog_costs,
+    catalog_columns
+)
+
+BASELINE_PATH = Path(__file__).resolve().parent / 'baselines' / 'calculations.json'
+GOALS = {'daily_protein': 200.0, 'daily_carbs': 500.0, 'daily_fat': 90.0}
+PROTEIN_NEEDED = 60.0
+
+# Diferencias menores a esto se consideran ruido aunque superen la tolerancia
+MIN_REGRESSION_SECONDS = 0.002
+
+
+def _scalar_inputs(products):
+    return [
+        (url, product) for url, product in products.items()
+        if (product.get('nutrition') or {}).get('protein') and product.get('weight_gr')
+    ]
+
+
+def _case_consumption(products, days):
+    for _, product in _scalar_inputs(products):
+        calculate_daily_consumption(PROTEIN_NEEDED, product['nutrition']['protein'], product['weight_gr'])
+
+
+def _case_purchase(products, days):
+    for _, product in _scalar_inputs(products):
+        consumption = calculate_daily_consumption(PROTEIN_NEEDED, product['nutrition']['protein'], product['weight_gr'])
+        calculate_optimal_purchase(
+            consumption['units'], product['price']['regular_price'], days=days,
+            promotions=product['price']['promotion']
+        )
+
+
+def _case_savings(products, days):
+    for _, product in products.items():
+        promotion = product['price']['promotion']
+        calculate_savings_percentage(
+            product['price']['regular_price'], promotion['price'] if promotion else product['price']['regular_price']
+        )
+
+
+def _case_balance(products, days):
+    grams = {url: 100.0 for url in products}
+    calculate_macronutrient_balance(products, GOALS, grams)
+
+
+def _case_catalog_costs(products, days):
+    calculate_catalog_costs(PROTEIN_NEEDED, catalog_columns(products), days=days)
+
+
+CASES = {
+    'daily_consumption': _case_consumption,
+    'optimal_purchase': _case_purchase,
+    'savings_percentage': _case_savings,
+    'macronutrient_balance': _case_balance,
+    'catalog_costs_batch': _case_catalog_costs
+}
+
+
+def run_benchmarks(sizes, repeat, days):
+    """
+    Mide cada caso con cada tamaño de catálogo (mejor de varias repeticiones)
+
+    :return: Diccionario 'caso@tamaño' -> segundos
+    """
+    results = {}
+    print(f"{'caso':<24}{'productos':>10}{'mejor (ms)':>12}{'µs/producto':>13}")
+    for size in sizes:
+        products = make_catalog(size, seed=size)
+        for name, case in CASES.items():
+            times = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                case(products, days)
+                times.append(time.perf_counter() - start)
+            best = min(times)
+            results[f"{name}@{size}"] = best
+            print(f"{name:<24}{size:>10}{best * 1000:>12.2f}{best / size * 1e6:>13.2f}")
+    return results
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """
+    Compara los tiempos con la línea base
+
+    :return: Lista de mensajes de regresión
+    """
+    regressions = []
+    for key, seconds in results.items():
+        reference = baseline.get(key)
+        if reference is None:
+            continue
+        if seconds > reference * tolerance and seconds - reference > MIN_REGRESSION_SECONDS:
+            regressions.append(f"{key}: {seconds * 1000:.2f} ms (línea base {reference * 1000:.2f} ms)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3, help="Repeticiones por caso (se toma la mejor)")
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help="Guardar los tiempos como nueva línea base")
+    parser.add_argument('--tolerance', type=float, default=1.5, help="Factor de lentitud aceptado frente a la línea base")
+    args = parser.parse_args()
+
+    regressions = []
+    results = run_benchmarks(args.sizes, args.repeat, args.days)
+
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(results, indent=2, sort_keys=True))
+        print(f"Línea base guardada en {args.baseline}")
+    elif args.baseline.exists():
+        regressions = compare_with_baseline(results, json.loads(args.baseline.read_text()), args.tolerance)
+        print(f"Regresiones frente a la línea base (tolerancia x{args.tolerance}): {len(regressions)}")
+        for regression in regressions:
+            print(f"  REGRESIÓN {regression}")
+    else:
+        print(f"Sin línea base en {args.baseline}; usa --save-baseline para crearla")
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# benchmarks/bench_optimizer.py
+"""
+Mide el tiempo del optimizador de dieta según el tamaño del catálogo
+
+Además de los catálogos sintéticos mide el catálogo real (data/food_data.json)
+con varias combinaciones de metas, que es donde la brecha entre la
+relajación lineal y el problema entero es mayor.
+
+Uso: python -m benchmarks.bench_optimizer [--sizes 100 1000 5000 10000 50000] [--target 1.0]
+
+Termina con código 1 si alguna ejecución supera --target segundos.
+"""
+import sys
+import time
+import argparse
+from benchmarks.synthetic import make_catalog
+from modules.config import DATA_DIR, OPTIMIZER
+from modules.data_manager import DataManager
+from utils.calculations import catalog_columns
+from utils.optimizer import optimize_diet
+
+GOALS = {'protein': 200.0, 'carbs': 150.0, 'fat': 80.0}
+
+# Metas con las que se mide el catálogo real
+REAL_CATALOG_GOALS = [
+    GOALS,
+    {'protein': 150.0, 'carbs': None, 'fat': None},
+    {'protein': 120.0, 'carbs': 250.0, 'fat': 60.0}
+]
+
+
+def _measure(columns, goals, days, time_limit):
+    start = time.perf_counter()
+    result = optimize_diet(columns, goals, days=days, time_limit=time_limit)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 5000, 10000, 50000])
+    parser.add_argument('--seeds', type=int, default=3, help="Catálogos distintos por tamaño")
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--time-limit', type=float, default=OPTIMIZER['time_limit'],
+                        help="Tiempo máximo del optimizador (el de la aplicación por defecto)")
+    parser.add_argument('--target', type=float, default=1.0, help="Segundos máximos por ejecución")
+    args = parser.parse_args()
+
+    slow = []
+    print(f"{'productos':>10}{'media (ms)':>12}{'máx (ms)':>12}{'costo medio (S/)':>18}  estados")
+    for size in args.sizes:
+        times, costs, statuses = [], [], []
+        for seed in range(args.seeds):
+            elapsed, result = _measure(catalog_columns(make_catalog(size, seed=seed)), GOALS, args.days, args.time_limit)
+            times.append(elapsed)
+            statuses.append(result['status'])
+            if 'total_cost' in result:
+                costs.append(result['total_cost'])
+            if elapsed > args.target:
+                slow.append(f"{size} productos (semilla {seed}): {elapsed * 1000:.1f} ms")
+
+        mean_cost = sum(costs) / len(costs) if costs else float('nan')
+        print(
+            f"{size:>10}{sum(times) / len(times) * 1000:>12.1f}{max(times) * 1000:>12.1f}"
+            f"{mean_cost:>18.2f}  {', '.join(sorted(set(statuses)))}"
+        )
+
+    catalog = DataManager(DATA_DIR).load_food_data()
+    if catalog:
+        columns = catalog_columns(catalog)
+        print(f"\nCatálogo real ({len(catalog)} productos)")
+        for goals in REAL_CATALOG_GOALS:
+            elapsed, result = _measure(columns, goals, args.days, args.time_limit)
+            label = ', '.join(f"{macro}={goal:g}" for macro, goal in goals.items() if goal)
+            print(f"  {label:<36}{elapsed * 1000:>10.1f} ms  S/ {result.get('total_cost', float('nan')):>8.2f}  {result['status']}")
+            if elapsed > args.target:
+                slow.append(f"catálogo real ({label}): {elapsed * 1000:.1f} ms")
+
+    print(f"\nEjecuciones por encima de {args.target:g} s: {len(slow)}")
+    for entry in slow:
+        print(f"  LENTO {entry}")
+    sys.exit(1 if slow else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# benchmarks/bench_serialization.py
+"""
+Mide los tiempos de carga y guardado de food_data con cada serializador
+
+Uso: python -m benchmarks.bench_serialization [--sizes 1000 10000 100000]
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+from modules.serializers import SERIALIZERS, JsonSerializer, orjson, validate_food_data
+from benchmarks.synthetic import make_catalog
+
+
+class LegacyJsonSerializer:
+    """Serializador original: json estándar con indent=4"""
+    name = 'json (indent=4)'
+    extension = '.json'
+
+    def dumps(self, data):
+        return json.dumps(data, indent=4).encode('utf-8')
+
+    def loads(self, payload):
+        return json.loads(payload)
+
+
+def _best_of(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench(size, repeat=3):
+    catalog = make_catalog(size)
+    serializers = [LegacyJsonSerializer(), JsonSerializer()]
+    for name, serializer_class in SERIALIZERS.items():
+        if name == 'json':
+            continue
+        try:
+            serializers.append(serializer_class())
+        except ImportError:
+            pass
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for serializer in serializers:
+            path = os.path.join(tmp_dir, f'food_data{serializer.extension}')
+
+            def save():
+                with open(path, 'wb') as f:
+                    f.write(serializer.dumps(catalog))
+
+            def load():
+                with open(path, 'rb') as f:
+                    return serializer.loads(f.read())
+
+            save_time = _best_of(save, repeat)
+            load_time = _best_of(load, repeat)
+            rows.append((serializer.name, save_time, load_time, os.path.getsize(path)))
+
+    validate_time = _best_of(lambda: validate_food_data(catalog), repeat)
+    return rows, validate_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"orjson: {'sí' if orjson else 'no'}")
+    for size in args.sizes:
+        rows, validate_time = bench(size, args.repeat)
+        print(f"\n{size} productos (validación de esquema: {validate_time * 1000:.1f} ms)")
+        print(f"{'formato':<18}{'guardar (ms)':>14}{'cargar (ms)':>14}{'tamaño (KB)':>14}")
+        for name, save_time, load_time, file_size in rows:
+            print(f"{name:<18}{save_time * 1000:>14.1f}{load_time * 1000:>14.1f}{file_size / 1024:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# benchmarks/bench_startup.py
+"""
+Mide el tiempo de importación de los módulos que carga app.py al arrancar,
+con python -X importtime en un proceso nuevo por repetición
+
+Los módulos se leen de los import de nivel superior de app.py, así que la
+medición sigue los cambios del archivo. También verifica que ningún módulo
+pesado (scraping, cliente del modelo, gráficos) se cargue al arrancar. La línea base
+no se versiona: los tiempos absolutos dependen de la máquina.
+
+Uso:
+    python -m benchmarks.bench_startup [--repeat 5] [--top 15]
+    python -m benchmarks.bench_startup --save-baseline
+"""
+import ast
+import sys
+import json
+import argparse
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+BASELINE_PATH = Path(__file__).resolve().parent / 'baselines' / 'startup.json'
+
+# Módulos que solo deben cargarse cuando se usan (plotly no está: lo importa streamlit)
+HEAVY_MODULES = (
+    'selenium', 'webdriver_manager', 'zenrows', 'bs4', 'google.generativeai',
+    'pandas', 'scipy', 'streamlit_lottie', 'streamlit_tailwind'
+)
+
+
+def startup_imports(app_path):
+    """
+    Módulos importados en el nivel superior de app.py
+
+    :param app_path: Ruta de app.py
+    :return: Lista de nombres de módulos
+    """
+    tree = ast.parse(Path(app_path).read_text(encoding='utf-8'))
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+def measure(modules):
+    """
+    Importa los módulos en un proceso nuevo con -X importtime
+
+    :return: Diccionario módulo importado -> tiempo propio en segundos
+    """
+    code = "; ".join(f"import {module}" for module in modules)
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if process.returncode != 0:
+        raise RuntimeError(process.stderr.strip().splitlines()[-1])
+
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(self_us) / 1e6
+    return times
+
+
+def by_package(times):
+    packages = {}
+    for name, seconds in times.items():
+        package = name.split('.')[0]
+        packages[package] = packages.get(package, 0.0) + seconds
+    return packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--app', type=Path, default=ROOT / 'app.py')
+    parser.add_argument('--repeat', type=int, default=5, help="Procesos medidos (se toma el mejor)")
+    parser.add_argument('--top', type=int, default=15, help="Paquetes más lentos a mostrar")
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help="Guardar el tiempo como nueva línea base")
+    parser.add_argument('--tolerance', type=float, default=1.3, help="Factor de lentitud aceptado frente a la línea base")
+    args = parser.parse_args()
+
+    modules = startup_imports(args.app)
+    runs = [measure(modules) for _ in range(args.repeat)]
+    best = min(runs, key=lambda times: sum(times.values()))
+    total = sum(best.values())
+
+    print(f"Módulos de app.py: {len(modules)}; importados en total: {len(best)}")
+    print(f"{'paquete':<28}{'ms':>10}")
+    for package, seconds in sorted(by_package(best).items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{package:<28}{seconds * 1000:>10.1f}")
+    print(f"{'total':<28}{total * 1000:>10.1f}")
+
+    failures = []
+    loaded = [heavy for heavy in HEAVY_MODULES if heavy in best]
+    if loaded:
+        failures.append(f"Módulos pesados cargados al arrancar: {', '.join(loaded)}")
+
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps({'total': total}, indent=2))
+        print(f"Línea base guardada en {args.baseline}")
+    elif args.baseline.exists():
+        reference = json.loads(args.baseline.read_text())['total']
+        print(f"Línea base: {reference * 1000:.1f} ms ({total / reference:.2f}x)")
+        if total > reference * args.tolerance:
+            failures.append(f"Arranque más lento que la línea base: {total * 1000:.1f} ms")
+    else:
+        print(f"Sin línea base en {args.baseline}; usa --save-baseline para crearla")
+
+    for failure in failures:
+        print(f"  FALLO {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+# benchmarks/load_recipes.py
+"""
+Prueba de carga del generador de recetas con el modelo simulado
+
+Cada solicitud hace lo mismo que una sesión de Streamlit en
+render_recipe_generator: arma el contexto con build_recipe_context, crea su
+propio RecipeGenerator (la caché en disco y el RequestGate son compartidos
+por el proceso) y consume la receta por streaming o completa. Las
+selecciones se repiten con una distribución de Zipf para que haya aciertos
+de caché y solicitudes idénticas en curso.
+
+Uso:
+    python -m benchmarks.load_recipes [--requests 500] [--concurrency 200]
+    python -m benchmarks.load_recipes --latency 1.0 --error-rate 0.05 --no-cache
+"""
+import time
+import random
+import argparse
+import tempfile
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.synthetic import make_catalog
+from modules.llm_backends import MockBackend
+from modules.recipe_cache import RecipeCache
+from modules.request_gate import RequestGate
+from modules.recipe_generator import RecipeGenerator, build_recipe_context
+
+MEAL_TYPES = ["Todas las comidas del día", "Desayuno", "Almuerzo", "Cena", "Snack/Merienda"]
+CUISINE_TYPES = ["Peruana", "Internacional", "Saludable", "Fitness"]
+RESTRICTIONS = ["Sin Gluten", "Vegetariano", "Vegano", "Sin Lácteos"]
+USER_PREFS = {'daily_protein': 140.0, 'daily_carbs': 350.0, 'daily_fat': 70.0}
+
+
+def make_selections(unique, seed):
+    """
+    Genera selecciones distintas de productos y opciones de receta
+
+    :param unique: Número de selecciones distintas
+    :param seed: Semilla
+    :return: Lista de argumentos para build_recipe_context
+    """
+    rng = random.Random(seed)
+    products = make_catalog(max(unique * 3, 50), seed=seed)
+    urls = list(products)
+    selections = []
+    for _ in range(unique):
+        chosen = rng.sample(urls, rng.randint(1, 3))
+        selections.append((
+            {url: products[url] for url in chosen},
+            USER_PREFS,
+            rng.choice(MEAL_TYPES),
+            rng.choice(CUISINE_TYPES),
+            rng.sample(RESTRICTIONS, rng.randint(0, 2))
+        ))
+    return selections
+
+
+def percentiles(values):
+    if not values:
+        return "sin datos"
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return f"p50 {p50:.3f}s  p90 {p90:.3f}s  p99 {p99:.3f}s  máx {max(values):.3f}s"
+
+
+def run_load(args):
+    selections = make_selections(args.unique, args.seed)
+    rng = random.Random(args.seed)
+    weights = [1 / (rank + 1) ** args.zipf for rank in range(len(selections))]
+    plan = [
+        (rng.choices(range(len(selections)), weights)[0], rng.random() < args.stream_ratio)
+        for _ in range(args.requests)
+    ]
+
+    backend = MockBackend(
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, seed=args.seed
+    )
+    gate = RequestGate(args.max_concurrent, args.max_queue, args.queue_timeout)
+    cache_dir = tempfile.TemporaryDirectory()
+    lock = threading.Lock()
+    results = {'latency': [], 'ttft': [], 'cached': 0, 'ok': 0, 'failed': 0}
+
+    def one_request(selection, streaming):
+        generator = RecipeGenerator(
+            backend=backend, gate=gate, cache=None if args.no_cache else RecipeCache(cache_dir.name)
+        )
+        recipe_context, _ = build_recipe_context(*selections[selection])
+        start = time.perf_counter()
+        ttft = None
+        try:
+            if streaming:
+                chunks = []
+                for chunk in generator.generate_recipe_stream(recipe_context):
+                    if ttft is None:
+                        ttft = time.perf_counter() - start
+                    chunks.append(chunk)
+                recipe = "".join(chunks)
+            else:
+                recipe = generator.generate_recipe(recipe_context)
+        except Exception:
+            recipe = None
+        elapsed = time.perf_counter() - start
+        with lock:
+            if recipe:
+                results['ok'] += 1
+                results['cached'] += generator.last_from_cache
+                results['latency'].append(elapsed)
+                if ttft is not None:
+                    results['ttft'].append(ttft)
+            else:
+                results['failed'] += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for future in [pool.submit(one_request, selection, streaming) for selection, streaming in plan]:
+            future.result()
+    wall = time.perf_counter() - start
+
+    print(f"Solicitudes: {args.requests} ({args.concurrency} concurrentes, {args.unique} selecciones distintas)")
+    print(f"Tiempo total: {wall:.2f}s, {args.requests / wall:.1f} solicitudes/s")
+    print(f"Correctas: {results['ok']}, de caché: {results['cached']}, fallidas: {results['failed']}")
+    print(f"Latencia:        {percentiles(results['latency'])}")
+    print(f"Primer fragmento: {percentiles(results['ttft'])}")
+    print(f"Modelo simulado: {backend.calls} llamadas, {backend.errors} errores")
+    gate_stats = gate.stats()
+    print(
+        f"RequestGate: {gate_stats['calls']} llamadas, {gate_stats['coalesced']} compartidas, "
+        f"{gate_stats['rejected']} rechazadas"
+    )
+    if not args.no_cache:
+        cache_stats = RecipeCache(cache_dir.name).stats()
+        print(
+            f"Caché: {cache_stats['hits']} aciertos, {cache_stats['misses']} fallos "
+            f"({cache_stats['hit_rate']:.0%}), {cache_stats['entries']} guardadas"
+        )
+    cache_dir.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=200, help="Sesiones simultáneas")
+    parser.add_argument('--unique', type=int, default=40, help="Selecciones distintas de productos y opciones")
+    parser.add_argument('--zipf', type=float, default=1.1, help="Exponente de popularidad de las selecciones")
+    parser.add_argument('--stream-ratio', type=float, default=0.5, help="Fracción de solicitudes por streaming")
+    parser.add_argument('--latency', type=float, default=0.3, help="Mediana de la latencia del modelo simulado")
+    parser.add_argument('--jitter', type=float, default=0.4)
+    parser.add_argument('--error-rate', type=float, default=0.02)
+    parser.add_argument('--max-concurrent', type=int, default=4, help="Límite global de llamadas al modelo")
+    parser.add_argument('--max-queue', type=int, default=256)
+    parser.add_argument('--queue-timeout', type=float, default=120.0)
+    parser.add_argument('--no-cache', action='store_true', help="Sin caché de recetas")
+    parser.add_argument('--seed', type=int, default=0)
+    run_load(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
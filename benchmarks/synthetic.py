@@ -0,0 +1,67 @@
+# benchmarks/synthetic.py
+import random
+from datetime import datetime
+from typing import Dict, Any
+
+PRODUCT_TYPES = [
+    'yogurt', 'queso', 'pollo', 'leche', 'embutidos', 'res', 'cerdo',
+    'mantequilla', 'pavo', 'pescado', 'huevos', 'pate', 'lacteo'
+]
+
+
+def make_product(index: int, rng: random.Random) -> Dict[str, Any]:
+    """
+    Genera un producto sintético con la misma estructura que food_data.json
+
+    :param index: Índice del producto, usado para la URL y el nombre
+    :param rng: Generador aleatorio
+    :return: Diccionario con información del producto
+    """
+    product_type = rng.choice(PRODUCT_TYPES)
+    url = f"https://www.makro.plazavea.com.pe/producto-{product_type}-{index}/p"
+    regular_price = round(rng.uniform(2.0, 60.0), 2)
+    promotion = None
+    if rng.random() < 0.2:
+        promotion = {
+            'units': rng.choice([2, 3, 4, 6]),
+            'price': round(regular_price * rng.uniform(0.75, 0.95), 2)
+        }
+    protein = round(rng.uniform(1.0, 30.0), 1)
+    fat = round(rng.uniform(0.0, 30.0), 1)
+    carbs = round(rng.uniform(0.0, 20.0), 1)
+
+    return {
+        'name': f"Producto {product_type.title()} {index} x {rng.choice([250, 500, 1000])}g",
+        'image_url': f"https://plazavea.vteximg.com.br/arquivos/ids/{index}-450-450/{index}.jpg",
+        'price': {
+            'regular_price': regular_price,
+            'promotion': promotion
+        },
+        'weight_gr': rng.choice([150, 250, 500, 900, 1000]),
+        'type': product_type,
+        'fitia_url': f"https://fitia.app/es/calorias-informacion-nutricional/producto-{index}/?serving=gramos-100-g",
+        'nutrition': {
+            'calories': round(protein * 4 + carbs * 4 + fat * 9, 1),
+            'fat': fat,
+            'carbs': carbs,
+            'protein': protein
+        },
+        'url': url,
+        'last_update': datetime(2025, 1, 1).isoformat()
+    }
+
+
+def make_catalog(size: int, seed: int = 0) -> Dict[str, Dict[str, Any]]:
+    """
+    Genera un catálogo sintético reproducible
+
+    :param size: Número de productos
+    :param seed: Semilla aleatoria
+    :return: Diccionario de productos por URL
+    """
+    rng = random.Random(seed)
+    catalog = {}
+    for index in range(size):
+        product = make_product(index, rng)
+        catalog[product['url']] = product
+    return catalog
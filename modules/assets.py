@@ -0,0 +1,129 @@
+# modules/assets.py
+import json
+import base64
+import hashlib
+import logging
+import mimetypes
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional
+from modules.config import ASSETS_DIR, LOGOS_DIR
+
+# Archivos de la interfaz por nombre y variante de tema; 'dark' usa 'light' si no existe
+ASSET_MANIFEST = {
+    'fitia_logo': {'light': LOGOS_DIR / 'fitia_logo.svg', 'dark': LOGOS_DIR / 'fitia_logo_blank.svg'},
+    'makro_logo': {'light': LOGOS_DIR / 'makro_logo.svg', 'dark': LOGOS_DIR / 'makro_logo_blank.svg'},
+    'yape': {'light': ASSETS_DIR / 'yape.png'},
+    'binance': {'light': ASSETS_DIR / 'binance.png'}
+}
+
+
+class Asset:
+    """
+    Contenido de un archivo cargado una sola vez, con su data URI y su huella
+    """
+
+    def __init__(self, path: Path, data: bytes):
+        """
+        :param path: Ruta del archivo
+        :param data: Contenido del archivo
+        """
+        self.path = path
+        self.data = data
+        self.mime = mimetypes.guess_type(path.name)[0] or 'application/octet-stream'
+        # Huella del contenido para usar como clave de caché o versión en URLs
+        self.fingerprint = hashlib.blake2b(data, digest_size=8).hexdigest()
+        self.data_uri = f"data:{self.mime};base64,{base64.b64encode(data).decode()}"
+
+
+class AssetRegistry:
+    """
+    Registro de los archivos estáticos de la interfaz
+
+    Cada archivo se lee, codifica y firma la primera vez que se pide y queda
+    en memoria para todo el proceso; después, pedir un logo o una imagen no
+    toca el disco.
+    """
+
+    def __init__(self, manifest: Dict[str, Dict[str, Path]]):
+        """
+        :param manifest: Nombre -> variante de tema ('light', 'dark') -> ruta
+        """
+        self.manifest = manifest
+        self.logger = logging.getLogger(__name__)
+        self._assets: Dict[Path, Optional[Asset]] = {}
+        self._json: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, name: str, theme: str) -> Path:
+        variants = self.manifest[name]
+        return Path(variants.get(theme) or variants['light'])
+
+    def _load(self, path: Path) -> Optional[Asset]:
+        with self._lock:
+            if path not in self._assets:
+                try:
+                    self._assets[path] = Asset(path, path.read_bytes())
+                except OSError as e:
+                    self.logger.error(f"No se pudo cargar el archivo {path}: {e}")
+                    self._assets[path] = None
+            return self._assets[path]
+
+    def get(self, name: str, theme: str = 'light') -> Optional[Asset]:
+        """
+        Devuelve un archivo del registro
+
+        :param name: Nombre en el manifiesto
+        :param theme: Variante de tema ('light' o 'dark')
+        :return: Asset o None si el archivo no existe
+        """
+        return self._load(self._path(name, theme))
+
+    def data_uri(self, name: str, theme: str = 'light') -> str:
+        """
+        Data URI listo para usar en HTML
+
+        :param name: Nombre en el manifiesto
+        :param theme: Variante de tema ('light' o 'dark')
+        :return: Data URI (vacío si el archivo no existe)
+        """
+        asset = self.get(name, theme)
+        return asset.data_uri if asset is not None else ""
+
+    def json(self, name: str) -> Optional[Any]:
+        """
+        Contenido JSON de un archivo (p. ej. animaciones Lottie), parseado una vez
+
+        :param name: Nombre en el manifiesto
+        :return: Objeto JSON o None si el archivo no existe
+        """
+        if name not in self._json:
+            asset = self.get(name)
+            self._json[name] = json.loads(asset.data) if asset is not None else None
+        return self._json[name]
+
+    def preload(self):
+        """
+        Carga todos los archivos del manifiesto
+        """
+        for name, variants in self.manifest.items():
+            for theme in variants:
+                self.get(name, theme)
+
+    def fingerprints(self) -> Dict[str, str]:
+        """
+        Huellas de los archivos cargados
+
+        :return: Diccionario 'nombre/variante' -> huella
+        """
+        result = {}
+        for name, variants in self.manifest.items():
+            for theme in variants:
+                asset = self._assets.get(self._path(name, theme))
+                if asset is not None:
+                    result[f"{name}/{theme}"] = asset.fingerprint
+        return result
+
+
+# Registro compartido por todas las sesiones del proceso
+asset_registry = AssetRegistry(ASSET_MANIFEST)
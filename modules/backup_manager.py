@@ -0,0 +1,453 @@
+# modules/backup_manager.py
+import os
+import json
+import gzip
+import hashlib
+import logging
+import argparse
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional, Tuple
+from modules.serializers import JsonSerializer
+
+try:
+    import zstandard
+except ImportError:  # zstd es opcional, gzip siempre está disponible
+    zstandard = None
+
+# Cada cuántos snapshots incrementales se escribe uno completo (checkpoint)
+CHECKPOINT_INTERVAL = 20
+
+
+def _canonical_bytes(record: Any) -> bytes:
+    """
+    Serializa un registro de forma canónica para obtener siempre el mismo hash
+
+    :param record: Registro a serializar
+    :return: Bytes en JSON canónico
+    """
+    return json.dumps(record, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+class BackupManager:
+    def __init__(self, data_dir: str, backup_dir: str = None, compression: str = None, serializer=None):
+        """
+        Inicializa el gestor de copias de seguridad incrementales
+
+        Los registros se guardan comprimidos y direccionados por contenido en
+        ``objects/``; cada snapshot en ``snapshots/`` solo lista los registros
+        que cambiaron respecto al anterior.
+
+        :param data_dir: Directorio con los archivos de datos
+        :param backup_dir: Directorio de backups (por defecto ``data_dir/backups``)
+        :param compression: 'zstd' o 'gzip' (por defecto zstd si está instalado)
+        :param serializer: Serializador de food_data (por defecto JSON)
+        """
+        self.data_dir = data_dir
+        self.serializer = serializer or JsonSerializer()
+        self.urls_serializer = JsonSerializer()
+        self.backup_dir = backup_dir or os.path.join(data_dir, 'backups')
+        self.objects_dir = os.path.join(self.backup_dir, 'objects')
+        self.snapshots_dir = os.path.join(self.backup_dir, 'snapshots')
+        self.products_urls_path = os.path.join(data_dir, 'products_urls.json')
+        self.food_data_path = os.path.join(data_dir, f'food_data{self.serializer.extension}')
+
+        if compression is None:
+            compression = 'zstd' if zstandard else 'gzip'
+        if compression == 'zstd' and zstandard is None:
+            raise ValueError("zstandard no está instalado, usa compression='gzip'")
+        self.compression = compression
+
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.snapshots_dir, exist_ok=True)
+
+        # Estado del último snapshot escrito por esta instancia:
+        # (id, hashes por URL, hash de products_urls, profundidad desde el checkpoint)
+        self._head: Optional[Tuple[str, Dict[str, str], str, int]] = None
+
+        self.logger = logging.getLogger(__name__)
+
+    # ------------------------------------------------------------------
+    # Almacén de objetos
+    # ------------------------------------------------------------------
+    def _compress(self, payload: bytes) -> bytes:
+        if self.compression == 'zstd':
+            return zstandard.ZstdCompressor(level=10).compress(payload)
+        return gzip.compress(payload, compresslevel=6, mtime=0)
+
+    def _decompress(self, path: str, data: bytes) -> bytes:
+        if path.endswith('.zst'):
+            if zstandard is None:
+                raise RuntimeError(f"Se necesita zstandard para leer {path}")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return gzip.decompress(data)
+
+    def _object_path(self, digest: str) -> Optional[str]:
+        """
+        Devuelve la ruta de un objeto existente, sin importar su compresión
+
+        :param digest: Hash SHA-256 del objeto
+        :return: Ruta del objeto o None si no existe
+        """
+        base = os.path.join(self.objects_dir, digest[:2], digest)
+        for ext in ('.zst', '.gz'):
+            if os.path.exists(base + ext):
+                return base + ext
+        return None
+
+    def _put_object(self, payload: bytes) -> Tuple[str, bool]:
+        """
+        Guarda un objeto si todavía no existe
+
+        :param payload: Contenido sin comprimir
+        :return: Tupla (hash, True si se escribió un objeto nuevo)
+        """
+        digest = hashlib.sha256(payload).hexdigest()
+        if self._object_path(digest):
+            return digest, False
+
+        ext = '.zst' if self.compression == 'zstd' else '.gz'
+        path = os.path.join(self.objects_dir, digest[:2], digest + ext)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._atomic_write(path, self._compress(payload))
+        return digest, True
+
+    def _get_object(self, digest: str) -> Any:
+        path = self._object_path(digest)
+        if not path:
+            raise FileNotFoundError(f"Objeto de backup no encontrado: {digest}")
+        with open(path, 'rb') as f:
+            return json.loads(self._decompress(path, f.read()))
+
+    @staticmethod
+    def _atomic_write(path: str, data: bytes):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    # ------------------------------------------------------------------
+    # Snapshots
+    # ------------------------------------------------------------------
+    def list_snapshots(self) -> List[Dict[str, Any]]:
+        """
+        Lista los snapshots existentes, del más antiguo al más reciente
+
+        :return: Lista de manifiestos sin el detalle de registros
+        """
+        snapshots = []
+        for snapshot_id in self._snapshot_ids():
+            manifest = self._load_manifest(snapshot_id)
+            snapshots.append({
+                'id': snapshot_id,
+                'created_at': manifest['created_at'],
+                'parent': manifest['parent'],
+                'base': manifest['base'],
+                'changed': len(manifest['food_data']['changed']),
+                'removed': len(manifest['food_data']['removed'])
+            })
+        return snapshots
+
+    def _snapshot_ids(self) -> List[str]:
+        return sorted(
+            name[:-len('.json.gz')] for name in os.listdir(self.snapshots_dir)
+            if name.endswith('.json.gz')
+        )
+
+    def _manifest_path(self, snapshot_id: str) -> str:
+        return os.path.join(self.snapshots_dir, f'{snapshot_id}.json.gz')
+
+    def _load_manifest(self, snapshot_id: str) -> Dict[str, Any]:
+        with open(self._manifest_path(snapshot_id), 'rb') as f:
+            return json.loads(gzip.decompress(f.read()))
+
+    def _save_manifest(self, manifest: Dict[str, Any]):
+        payload = json.dumps(manifest, separators=(',', ':')).encode('utf-8')
+        self._atomic_write(self._manifest_path(manifest['id']), gzip.compress(payload, mtime=0))
+
+    def _resolve(self, snapshot_id: str) -> Tuple[Dict[str, str], str]:
+        """
+        Reconstruye el estado completo (url -> hash) de un snapshot
+
+        Recorre la cadena de padres hasta el último checkpoint completo y
+        aplica los cambios incrementales en orden.
+
+        :param snapshot_id: Identificador del snapshot
+        :return: Tupla (hashes de food_data por URL, hash de products_urls)
+        """
+        chain = []
+        current = snapshot_id
+        while current:
+            manifest = self._load_manifest(current)
+            chain.append(manifest)
+            if manifest['base']:
+                break
+            current = manifest['parent']
+
+        records = {}
+        for manifest in reversed(chain):
+            if manifest['base']:
+                records = {}
+            for url in manifest['food_data']['removed']:
+                records.pop(url, None)
+            records.update(manifest['food_data']['changed'])
+
+        return records, chain[0]['products_urls']
+
+    def _depth(self, snapshot_id: str) -> int:
+        """
+        Snapshots incrementales entre snapshot_id y su checkpoint (0 si es checkpoint)
+        """
+        depth = 0
+        current = snapshot_id
+        while current:
+            manifest = self._load_manifest(current)
+            if 'depth' in manifest:
+                return depth + manifest['depth']
+            if manifest['base']:
+                break
+            depth += 1
+            current = manifest['parent']
+        return depth
+
+    def _parent_state(self, parent: str) -> Tuple[Dict[str, str], str, int]:
+        """
+        Hashes, hash de products_urls y profundidad del snapshot padre; se
+        reutiliza el estado en memoria si el padre lo escribió esta instancia
+        """
+        if self._head is not None and self._head[0] == parent:
+            return self._head[1], self._head[2], self._head[3]
+        records, urls_hash = self._resolve(parent)
+        return records, urls_hash, self._depth(parent)
+
+    def create_snapshot(self, changed: Dict[str, Any] = None, removed: List[str] = None) -> Optional[str]:
+        """
+        Crea un snapshot incremental de los archivos de datos
+
+        Solo se escriben los registros cuyo contenido cambió desde el snapshot
+        anterior. Si no hubo cambios no se crea un snapshot nuevo.
+
+        Si se indican los registros cambiados y eliminados desde el snapshot
+        anterior, solo se serializan y firman esos; el resto de los hashes se
+        hereda del padre, así que el costo depende de los cambios y no del
+        tamaño del catálogo. Sin ellos (o en el primer snapshot o un
+        checkpoint) se recorre todo food_data.
+
+        :param changed: Registros cambiados desde el snapshot anterior (URL -> registro)
+        :param removed: URLs eliminadas desde el snapshot anterior
+        :return: Identificador del snapshot vigente
+        """
+        with open(self.products_urls_path, 'rb') as f:
+            urls_hash, _ = self._put_object(_canonical_bytes(self.urls_serializer.loads(f.read())))
+
+        snapshot_ids = self._snapshot_ids()
+        parent = snapshot_ids[-1] if snapshot_ids else None
+        previous, previous_urls_hash, parent_depth = self._parent_state(parent) if parent else ({}, None, -1)
+        base = parent is None or parent_depth + 1 >= CHECKPOINT_INTERVAL
+
+        new_objects = 0
+        if changed is None or base:
+            # Recorrido completo de food_data
+            with open(self.food_data_path, 'rb') as f:
+                food_data = self.serializer.loads(f.read())
+            digests = {}
+            for url, record in food_data.items():
+                digest, created = self._put_object(_canonical_bytes(record))
+                digests[url] = digest
+                new_objects += created
+            changes = {url: digest for url, digest in digests.items() if previous.get(url) != digest}
+            removals = [url for url in previous if url not in food_data]
+        else:
+            # Solo los registros indicados; el resto se hereda del padre
+            changes = {}
+            for url, record in changed.items():
+                digest, created = self._put_object(_canonical_bytes(record))
+                new_objects += created
+                if previous.get(url) != digest:
+                    changes[url] = digest
+            removals = [url for url in (removed or []) if url in previous and url not in changed]
+            digests = previous
+            for url in removals:
+                del digests[url]
+            digests.update(changes)
+
+        if parent and not changes and not removals and urls_hash == previous_urls_hash:
+            self.logger.info(f"Sin cambios desde el backup {parent}")
+            self._head = (parent, digests, urls_hash, parent_depth)
+            return parent
+
+        if base:
+            changes, removals = digests, []
+
+        now = datetime.now()
+        snapshot_id = now.strftime("%Y%m%dT%H%M%S%f")
+        depth = 0 if base else parent_depth + 1
+        self._save_manifest({
+            'id': snapshot_id,
+            'created_at': now.isoformat(),
+            'parent': parent,
+            'base': base,
+            'depth': depth,
+            'products_urls': urls_hash,
+            'food_data': {'changed': changes, 'removed': removals}
+        })
+        self._head = (snapshot_id, digests, urls_hash, depth)
+
+        self.logger.info(
+            f"Backup {snapshot_id}: {len(changes)} registros cambiados, "
+            f"{len(removals)} eliminados, {new_objects} objetos nuevos"
+        )
+        return snapshot_id
+
+    def find_snapshot(self, at: datetime) -> Optional[str]:
+        """
+        Busca el último snapshot creado en o antes de un instante dado
+
+        :param at: Fecha y hora del punto de restauración
+        :return: Identificador del snapshot o None si no hay ninguno
+        """
+        candidate = None
+        for snapshot_id in self._snapshot_ids():
+            if datetime.strptime(snapshot_id, "%Y%m%dT%H%M%S%f") <= at:
+                candidate = snapshot_id
+            else:
+                break
+        return candidate
+
+    def restore(self, snapshot_id: str = None, at: datetime = None) -> Optional[str]:
+        """
+        Restaura los archivos de datos a un snapshot o a un instante dado
+
+        Antes de restaurar se toma un snapshot del estado actual para que la
+        restauración también pueda deshacerse.
+
+        :param snapshot_id: Snapshot a restaurar (por defecto el más reciente)
+        :param at: Alternativa a snapshot_id, restaura al estado en esa fecha
+        :return: Identificador del snapshot restaurado o None si no existe
+        """
+        if snapshot_id is None:
+            snapshot_ids = self._snapshot_ids()
+            snapshot_id = self.find_snapshot(at) if at else (snapshot_ids[-1] if snapshot_ids else None)
+        if not snapshot_id or not os.path.exists(self._manifest_path(snapshot_id)):
+            self.logger.warning("No se encontró un snapshot para restaurar")
+            return None
+
+        records, urls_hash = self._resolve(snapshot_id)
+        self.create_snapshot()
+
+        food_data = {url: self._get_object(digest) for url, digest in records.items()}
+        product_urls = self._get_object(urls_hash)
+
+        self._atomic_write(self.food_data_path, self.serializer.dumps(food_data))
+        self._atomic_write(self.products_urls_path, self.urls_serializer.dumps(product_urls))
+
+        self.logger.info(f"Datos restaurados desde el backup {snapshot_id}")
+        return snapshot_id
+
+    def prune(self, keep_last: int = None, max_age_days: int = None) -> int:
+        """
+        Aplica la política de retención y elimina los objetos huérfanos
+
+        Un snapshot se conserva si está entre los ``keep_last`` más recientes
+        o tiene menos de ``max_age_days`` días. El más reciente nunca se borra.
+
+        :param keep_last: Número de snapshots recientes a conservar
+        :param max_age_days: Antigüedad máxima en días
+        :return: Número de snapshots eliminados
+        """
+        snapshot_ids = self._snapshot_ids()
+        if not snapshot_ids or (keep_last is None and max_age_days is None):
+            return 0
+
+        cutoff = datetime.now() - timedelta(days=max_age_days) if max_age_days is not None else None
+        keep = set(snapshot_ids[-max(keep_last or 1, 1):]) if keep_last is not None else set(snapshot_ids[-1:])
+        if cutoff:
+            keep.update(
+                snapshot_id for snapshot_id in snapshot_ids
+                if datetime.strptime(snapshot_id, "%Y%m%dT%H%M%S%f") >= cutoff
+            )
+        kept = [snapshot_id for snapshot_id in snapshot_ids if snapshot_id in keep]
+        to_delete = [snapshot_id for snapshot_id in snapshot_ids if snapshot_id not in keep]
+        if not to_delete:
+            return 0
+
+        # Convertir en checkpoint a todo snapshot cuyo padre se va a borrar
+        for snapshot_id in kept:
+            manifest = self._load_manifest(snapshot_id)
+            if not manifest['base'] and manifest['parent'] not in keep:
+                records, _ = self._resolve(snapshot_id)
+                manifest['base'] = True
+                manifest['food_data'] = {'changed': records, 'removed': []}
+                self._save_manifest(manifest)
+        # Recalcular la profundidad de cada snapshot desde su checkpoint
+        depths = {}
+        for snapshot_id in kept:
+            manifest = self._load_manifest(snapshot_id)
+            updated = dict(manifest)
+            if updated['parent'] not in keep:
+                updated['parent'] = None
+            updated['depth'] = 0 if updated['base'] else depths[updated['parent']] + 1
+            depths[snapshot_id] = updated['depth']
+            if updated != manifest:
+                self._save_manifest(updated)
+        # El estado resuelto del último snapshot no cambia, solo su profundidad
+        if self._head is not None:
+            head_id, records, urls_hash, _ = self._head
+            self._head = (head_id, records, urls_hash, depths[head_id]) if head_id in depths else None
+
+        for snapshot_id in to_delete:
+            os.remove(self._manifest_path(snapshot_id))
+
+        self._collect_garbage()
+        self.logger.info(f"Retención aplicada: {len(to_delete)} snapshots eliminados")
+        return len(to_delete)
+
+    def _collect_garbage(self):
+        """
+        Elimina los objetos que ya no referencia ningún snapshot
+        """
+        referenced = set()
+        for snapshot_id in self._snapshot_ids():
+            manifest = self._load_manifest(snapshot_id)
+            referenced.add(manifest['products_urls'])
+            referenced.update(manifest['food_data']['changed'].values())
+
+        for prefix in os.listdir(self.objects_dir):
+            prefix_dir = os.path.join(self.objects_dir, prefix)
+            for name in os.listdir(prefix_dir):
+                if name.split('.', 1)[0] not in referenced:
+                    os.remove(os.path.join(prefix_dir, name))
+
+
+def main():
+    from modules.config import DATA_DIR, BACKUP_RETENTION
+
+    parser = argparse.ArgumentParser(description="Backups incrementales de los datos de productos")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('create', help="Crea un snapshot")
+    subparsers.add_parser('list', help="Lista los snapshots")
+    restore_parser = subparsers.add_parser('restore', help="Restaura un snapshot")
+    restore_parser.add_argument('snapshot_id', nargs='?', help="Identificador del snapshot")
+    restore_parser.add_argument('--at', help="Fecha ISO, restaura el estado en ese instante")
+    prune_parser = subparsers.add_parser('prune', help="Aplica la política de retención")
+    prune_parser.add_argument('--keep-last', type=int, default=BACKUP_RETENTION['keep_last'])
+    prune_parser.add_argument('--max-age-days', type=int, default=BACKUP_RETENTION['max_age_days'])
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    manager = BackupManager(str(DATA_DIR))
+
+    if args.command == 'create':
+        print(manager.create_snapshot())
+    elif args.command == 'list':
+        for snapshot in manager.list_snapshots():
+            kind = 'completo' if snapshot['base'] else 'incremental'
+            print(f"{snapshot['id']}  {kind:<11}  +{snapshot['changed']} -{snapshot['removed']}")
+    elif args.command == 'restore':
+        at = datetime.fromisoformat(args.at) if args.at else None
+        print(manager.restore(args.snapshot_id, at=at))
+    elif args.command == 'prune':
+        print(manager.prune(keep_last=args.keep_last, max_age_days=args.max_age_days))
+
+
+if __name__ == "__main__":
+    main()
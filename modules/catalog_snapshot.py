@@ -0,0 +1,280 @@
+# modules/catalog_snapshot.py
+import os
+import json
+import mmap
+import math
+import struct
+from collections.abc import Mapping
+from typing import Dict, List, Any, Iterator, Optional
+from utils.purchase_planner import promotion_tiers
+
+MAGIC = b'MCSNAP02'
+# magic, número de productos, número de strings, offsets de las 4 secciones
+HEADER = struct.Struct('<8sQQQQQQ')
+NO_STRING = 0xFFFFFFFF
+
+# promotion_tiers guarda en JSON los niveles de promoción cuando hay más de uno
+STRING_FIELDS = ('url', 'name', 'image_url', 'type', 'fitia_url', 'last_update', 'promotion_tiers')
+NUMERIC_FIELDS = (
+    'regular_price', 'promo_price', 'promo_units', 'weight_gr',
+    'calories', 'fat', 'carbs', 'protein'
+)
+NUTRITION_FIELDS = ('calories', 'fat', 'carbs', 'protein')
+
+STRING_SLOTS = {field: slot for slot, field in enumerate(STRING_FIELDS)}
+
+FLAG_NUTRITION = 1
+FLAG_PROMOTION = 2
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def _number(value: Any) -> float:
+    try:
+        return float(value) if value is not None else math.nan
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def write_snapshot(products: Dict[str, Dict[str, Any]], path: str):
+    """
+    Escribe un snapshot binario de solo lectura del catálogo
+
+    Estructura: cabecera, columnas numéricas float64, columna de flags,
+    índices de strings por producto y tabla de strings UTF-8. Las filas se
+    ordenan por URL para buscar productos con búsqueda binaria. Las columnas
+    de promoción guardan el primer nivel; si hay varios, la lista completa
+    se guarda además como texto JSON.
+
+    :param products: Diccionario de productos por URL
+    :param path: Ruta del archivo de snapshot
+    """
+    urls = sorted(products)
+    n = len(urls)
+
+    strings = []
+    string_ids = {}
+
+    def intern(value):
+        if value is None:
+            return NO_STRING
+        if value not in string_ids:
+            string_ids[value] = len(strings)
+            strings.append(value.encode('utf-8'))
+        return string_ids[value]
+
+    numeric = {field: [] for field in NUMERIC_FIELDS}
+    flags = bytearray(n)
+    string_columns = []
+
+    for row, url in enumerate(urls):
+        product = products[url]
+        price = product.get('price') or {}
+        tiers = promotion_tiers(price)
+        nutrition = product.get('nutrition') or {}
+
+        numeric['regular_price'].append(_number(price.get('regular_price')))
+        numeric['promo_price'].append(tiers[0][1] if tiers else math.nan)
+        numeric['promo_units'].append(tiers[0][0] if tiers else math.nan)
+        numeric['weight_gr'].append(_number(product.get('weight_gr')))
+        for field in NUTRITION_FIELDS:
+            numeric[field].append(_number(nutrition.get(field)))
+
+        flags[row] = (FLAG_NUTRITION if product.get('nutrition') else 0) | \
+                     (FLAG_PROMOTION if tiers else 0)
+
+        extra = {
+            'url': url,
+            'promotion_tiers': json.dumps(tiers, separators=(',', ':')) if len(tiers) > 1 else None
+        }
+        string_columns.extend(
+            intern(extra[field] if field in extra else product.get(field)) for field in STRING_FIELDS
+        )
+
+    string_offsets = [0]
+    for encoded in strings:
+        string_offsets.append(string_offsets[-1] + len(encoded))
+
+    numeric_offset = _align(HEADER.size)
+    flags_offset = numeric_offset + 8 * n * len(NUMERIC_FIELDS)
+    string_ids_offset = _align(flags_offset + n)
+    string_table_offset = _align(string_ids_offset + 4 * n * len(STRING_FIELDS))
+    blob_offset = string_table_offset + 8 * len(string_offsets)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(
+            MAGIC, n, len(strings), numeric_offset, flags_offset,
+            string_ids_offset, string_table_offset
+        ))
+        f.write(b'\0' * (numeric_offset - HEADER.size))
+        for field in NUMERIC_FIELDS:
+            f.write(struct.pack(f'<{n}d', *numeric[field]))
+        f.write(bytes(flags))
+        f.write(b'\0' * (string_ids_offset - flags_offset - n))
+        f.write(struct.pack(f'<{len(string_columns)}I', *string_columns))
+        f.write(b'\0' * (string_table_offset - string_ids_offset - 4 * len(string_columns)))
+        f.write(struct.pack(f'<{len(string_offsets)}Q', *string_offsets))
+        assert f.tell() == blob_offset
+        for encoded in strings:
+            f.write(encoded)
+    os.replace(tmp_path, path)
+
+
+class CatalogSnapshot(Mapping):
+    """
+    Vista de solo lectura del catálogo sobre un archivo mapeado en memoria
+
+    Abrir el snapshot no lee los datos: las páginas se cargan bajo demanda y
+    se comparten entre procesos a través de la caché de páginas del sistema.
+    Cada producto se decodifica recién cuando se accede a él.
+    """
+
+    def __init__(self, path: str):
+        """
+        Abre un snapshot existente
+
+        :param path: Ruta del archivo de snapshot
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.mtime = os.path.getmtime(path)
+
+        (magic, self._size, string_count, numeric_offset, flags_offset,
+         string_ids_offset, string_table_offset) = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Archivo de snapshot inválido: {path}")
+
+        view = self._view = memoryview(self._mmap)
+        n = self._size
+        self._columns = {
+            field: view[numeric_offset + 8 * n * i: numeric_offset + 8 * n * (i + 1)].cast('d')
+            for i, field in enumerate(NUMERIC_FIELDS)
+        }
+        self._flags = view[flags_offset: flags_offset + n]
+        self._string_ids = view[string_ids_offset: string_ids_offset + 4 * n * len(STRING_FIELDS)].cast('I')
+        self._string_offsets = view[string_table_offset: string_table_offset + 8 * (string_count + 1)].cast('Q')
+        self._blob_offset = string_table_offset + 8 * (string_count + 1)
+
+    def _string(self, row: int, field: str) -> Optional[str]:
+        string_id = self._string_ids[row * len(STRING_FIELDS) + STRING_SLOTS[field]]
+        if string_id == NO_STRING:
+            return None
+        start = self._blob_offset + self._string_offsets[string_id]
+        end = self._blob_offset + self._string_offsets[string_id + 1]
+        return self._mmap[start:end].decode('utf-8')
+
+    def _find_row(self, url: str) -> int:
+        """
+        Busca la fila de una URL con búsqueda binaria sobre las filas ordenadas
+
+        :param url: URL del producto
+        :return: Índice de la fila o -1 si no existe
+        """
+        low, high = 0, self._size
+        while low < high:
+            mid = (low + high) // 2
+            if self._string(mid, 'url') < url:
+                low = mid + 1
+            else:
+                high = mid
+        if low < self._size and self._string(low, 'url') == url:
+            return low
+        return -1
+
+    def column(self, field: str) -> memoryview:
+        """
+        Devuelve una columna numérica sin copiarla (ordenada por URL)
+
+        :param field: Nombre de la columna, ver NUMERIC_FIELDS
+        :return: memoryview de float64 (NaN para valores nulos)
+        """
+        return self._columns[field]
+
+    def strings(self, field: str) -> List[Optional[str]]:
+        """
+        Devuelve una columna de texto completa (ordenada por URL)
+
+        :param field: Nombre de la columna, ver STRING_FIELDS
+        :return: Lista de textos (None para valores nulos)
+        """
+        return [self._string(row, field) for row in range(self._size)]
+
+    def promotion_tiers(self, row: int) -> List[List[float]]:
+        """
+        Devuelve los niveles de promoción de una fila
+
+        :param row: Índice de la fila
+        :return: Lista de [unidades, precio por unidad] (vacía si no hay promoción)
+        """
+        if not self._flags[row] & FLAG_PROMOTION:
+            return []
+        encoded = self._string(row, 'promotion_tiers')
+        if encoded is not None:
+            return json.loads(encoded)
+        return [[int(self._columns['promo_units'][row]), self._columns['promo_price'][row]]]
+
+    def decode_row(self, row: int) -> Dict[str, Any]:
+        """
+        Reconstruye el diccionario de un producto con el formato de food_data
+
+        :param row: Índice de la fila
+        :return: Diccionario con información del producto
+        """
+        def value(field):
+            number = self._columns[field][row]
+            return None if math.isnan(number) else number
+
+        weight = value('weight_gr')
+        regular_price = value('regular_price')
+        promotion = None
+        if self._flags[row] & FLAG_PROMOTION:
+            promotion = [{'units': units, 'price': price} for units, price in self.promotion_tiers(row)]
+            if len(promotion) == 1:
+                promotion = promotion[0]
+        nutrition = None
+        if self._flags[row] & FLAG_NUTRITION:
+            nutrition = {field: value(field) for field in NUTRITION_FIELDS if value(field) is not None}
+
+        return {
+            'name': self._string(row, 'name'),
+            'image_url': self._string(row, 'image_url'),
+            'price': {
+                'regular_price': regular_price,
+                'promotion': promotion
+            },
+            'weight_gr': int(weight) if weight is not None and weight.is_integer() else weight,
+            'type': self._string(row, 'type'),
+            'fitia_url': self._string(row, 'fitia_url'),
+            'nutrition': nutrition,
+            'url': self._string(row, 'url'),
+            'last_update': self._string(row, 'last_update')
+        }
+
+    def __getitem__(self, url: str) -> Dict[str, Any]:
+        row = self._find_row(url)
+        if row < 0:
+            raise KeyError(url)
+        return self.decode_row(row)
+
+    def __contains__(self, url) -> bool:
+        return isinstance(url, str) and self._find_row(url) >= 0
+
+    def __iter__(self) -> Iterator[str]:
+        return (self._string(row, 'url') for row in range(self._size))
+
+    def __len__(self) -> int:
+        return self._size
+
+    def close(self):
+        """
+        Libera las vistas y el mapeo del archivo
+        """
+        for column in self._columns.values():
+            column.release()
+        for view in (self._flags, self._string_ids, self._string_offsets, self._view):
+            view.release()
+        self._mmap.close()
@@ -6,10 +6,76 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 ASSETS_DIR = BASE_DIR / 'assets'
 DATA_DIR = BASE_DIR / 'data'
 LOGOS_DIR = ASSETS_DIR / 'logos'
+BACKUP_DIR = DATA_DIR / 'backups'
 
 CHROME_OPTIONS = {
     'headless': True,  # Cambiado a False para mostrar la interfaz gráfica
     'disable-gpu': False,  # Cambiado a False para habilitar el procesamiento GPU
     'no-sandbox': True,
     'disable-dev-shm-usage': True
-}
\ No newline at end of file
+}
+
+# Formato de food_data: 'json' (orjson si está instalado) o 'msgpack'
+DATA_FORMAT = 'json'
+
+# Leer el catálogo desde un snapshot binario mapeado en memoria (compartido entre procesos)
+USE_CATALOG_SNAPSHOT = True
+
+# Política de retención de backups incrementales
+BACKUP_RETENTION = {
+    'keep_last': 30,  # Snapshots más recientes que siempre se conservan
+    'max_age_days': 90  # Además se conservan los snapshots más nuevos que esto
+}
+
+# Caché persistente de recetas generadas
+RECIPE_CACHE_DIR = DATA_DIR / 'recipe_cache'
+RECIPE_CACHE = {
+    'ttl_hours': 24 * 7,  # Validez de una receta guardada
+    'max_entries': 500,  # Máximo de recetas; se eliminan las menos usadas
+    'grams_precision': 5  # Los gramos se redondean a múltiplos de esto en la clave
+}
+
+# Miniaturas locales de las imágenes de los productos
+THUMBNAIL_DIR = DATA_DIR / 'thumbnails'
+THUMBNAILS = {
+    'size': 192,  # Lado en píxeles (la tarjeta muestra la imagen a 96 px; 2x para pantallas densas)
+    'quality': 75,  # Calidad WebP
+    'timeout': 10.0,  # Segundos máximos por descarga
+    'max_workers': 8  # Descargas simultáneas al actualizar
+}
+
+# Generación de recetas en lote (p. ej. una por día del plan semanal)
+RECIPE_BATCH = {
+    'max_concurrency': 4,  # Llamadas simultáneas al modelo
+    'timeout': 60.0,  # Segundos máximos por llamada
+    'retries': 2  # Reintentos por receta
+}
+
+# Modelo de lenguaje: 'gemini' o 'mock' (local, sin conexión, para desarrollo y pruebas de carga)
+LLM_BACKEND = os.environ.get('LLM_BACKEND', 'gemini')
+MOCK_LLM = {
+    'latency': 0.5,  # Mediana de la latencia en segundos
+    'jitter': 0.3,  # Dispersión de la latencia
+    'error_rate': 0.0,  # Probabilidad de error por llamada
+    'chunk_size': 40  # Caracteres por fragmento en streaming
+}
+
+# Límite de llamadas al modelo compartido por todas las sesiones del proceso
+RECIPE_CONCURRENCY = {
+    'max_concurrent': 4,  # Llamadas simultáneas al modelo
+    'max_queue': 32,  # Solicitudes esperando turno; las demás se rechazan
+    'queue_timeout': 120.0  # Segundos máximos de espera en la cola
+}
+
+# Grilla de tarjetas de los productos seleccionados (un solo componente por página)
+PRODUCT_GRID = {
+    'page_size': 12,  # Tarjetas por página
+    'columns': 2,  # Columnas de la grilla
+    'card_height': 460,  # Altura de cada tarjeta en píxeles
+    'visible_rows': 2  # Filas visibles antes de hacer scroll dentro del componente
+}
+
+# Optimizador de compra (utils.optimizer)
+OPTIMIZER = {
+    'time_limit': 0.5  # Segundos para los problemas enteros; al agotarse se muestra la mejor solución hallada
+}
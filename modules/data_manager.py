@@ -1,29 +1,150 @@
 import os
-import json
-from datetime import datetime
 import logging
-from typing import Dict, List, Any
-from modules.scraper import validate_makro_url, extract_url_metadata, preprocess_product_name
+import threading
+import numpy as np
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+from modules.backup_manager import BackupManager
+from modules.catalog_snapshot import CatalogSnapshot, write_snapshot
+from modules.metrics_index import MetricsIndex
+from modules.pareto_index import ParetoIndex
+from modules.ingredient_matcher import IngredientMatcher
+from modules.image_cache import ImageCache
+from modules.serializers import JsonSerializer, get_serializer, validate_product
+from utils.calculations import catalog_columns
+from modules.product_urls import validate_makro_url, extract_url_metadata, preprocess_product_name
+
+ALL_TYPES = 'Todos'
+
+
+class CatalogView:
+    """
+    Catálogo de solo lectura con el índice de tipos y los nombres, pensado
+    para compartirse entre todas las sesiones hasta que cambien los datos
+    """
+
+    def __init__(self, products, version: Any = None):
+        """
+        :param products: Catálogo (CatalogSnapshot o diccionario de productos por URL)
+        :param version: Número de la vista; cambia cada vez que se reconstruye el
+            catálogo, así que sirve como parte de claves de caché
+        """
+        self.products = products
+        self.version = version
+        if isinstance(products, CatalogSnapshot):
+            # Columnas de texto del snapshot sin decodificar cada producto
+            urls, names, types = products.strings('url'), products.strings('name'), products.strings('type')
+        else:
+            urls = list(products)
+            names = [products[url].get('name') for url in urls]
+            types = [products[url].get('type') for url in urls]
+
+        self.names: Dict[str, str] = dict(zip(urls, names))
+        self.by_type: Dict[str, List[str]] = {}
+        for url, product_type in zip(urls, types):
+            if product_type is not None:
+                self.by_type.setdefault(product_type, []).append(url)
+        self.product_types: List[str] = [ALL_TYPES] + sorted(self.by_type)
+        self.urls: List[str] = urls
+        self._columns = None
+        self._rows = None
+
+    @property
+    def columns(self) -> Dict[str, Any]:
+        """
+        Columnas NumPy del catálogo (ver catalog_columns), calculadas la
+        primera vez que se piden; son compartidas, no modificarlas
+        """
+        if self._columns is None:
+            self._columns = catalog_columns(self.products)
+        return self._columns
+
+    def nutrition_table(self, urls: List[str]) -> Dict[str, Any]:
+        """
+        Nutrientes por 100 g de un grupo de productos, recortados de las
+        columnas del catálogo sin recorrer los diccionarios de productos
+
+        :param urls: URLs de los productos, en el orden deseado
+        :return: Diccionario con 'url' y 'name' (listas) y 'protein', 'carbs',
+            'fat' y 'calories' (arreglos NumPy, NaN si falta el dato); se omiten
+            las URLs que no están en el catálogo o no tienen información nutricional
+        """
+        if self._rows is None:
+            self._rows = {url: row for row, url in enumerate(self.urls)}
+        columns = self.columns
+        rows = np.array([self._rows[url] for url in urls if url in self._rows], dtype=np.intp)
+        table = {
+            key: columns[f'{key}_per_100g'][rows] for key in ('protein', 'carbs', 'fat', 'calories')
+        }
+        has_nutrition = ~np.all(np.isnan(np.column_stack(list(table.values()))), axis=1)
+        rows = rows[has_nutrition]
+        table = {key: values[has_nutrition] for key, values in table.items()}
+        table['url'] = [self.urls[row] for row in rows]
+        table['name'] = [self.names[url] for url in table['url']]
+        return table
+
+    def urls_of_type(self, product_type: str) -> List[str]:
+        """
+        URLs de los productos de un tipo
+
+        :param product_type: Tipo de producto o ALL_TYPES
+        :return: Lista de URLs (compartida, no modificar)
+        """
+        if product_type == ALL_TYPES:
+            return self.urls
+        return self.by_type.get(product_type, [])
+
 
 class DataManager:
-    def __init__(self, data_dir: str):
+    def __init__(self, data_dir: str, backup_retention: Dict[str, int] = None, data_format: str = 'json',
+                 image_cache: ImageCache = None):
         """
         Inicializa el gestor de datos
         
         :param data_dir: Directorio donde se guardarán los archivos de datos
+        :param backup_retention: Política de retención ({'keep_last', 'max_age_days'})
+        :param data_format: Formato de food_data ('json' o 'msgpack')
+        :param image_cache: Caché de miniaturas que se actualiza junto con los productos (opcional)
         """
         self.data_dir = data_dir
+        self.serializer = get_serializer(data_format)
+        self.urls_serializer = JsonSerializer()
         self.products_urls_path = os.path.join(data_dir, 'products_urls.json')
-        self.food_data_path = os.path.join(data_dir, 'food_data.json')
+        self.food_data_path = os.path.join(data_dir, f'food_data{self.serializer.extension}')
+        self.snapshot_path = os.path.join(data_dir, 'catalog.snapshot')
+        self._snapshot = None
+        self._metrics_index = None
+        self._pareto_index = None
+        self._ingredient_matcher = None
+        # mtime de food_data con el que se construyeron o actualizaron los índices
+        self._indexes_mtime = None
+        self._catalog_view = None
+        self._catalog_key = None
+        self._catalog_generation = 0
+        self.image_cache = image_cache
+        self._thumbnail_worker = None
+        # Pendiente para el hilo de miniaturas: catálogo completo o productos cambiados
+        self._thumbnails_full = False
+        self._thumbnails_pending: Dict[str, Dict[str, Any]] = {}
+        # Una instancia se comparte entre las sesiones (st.cache_resource en app.py)
+        self._lock = threading.RLock()
         
+        # Configurar logging
+        self.logger = logging.getLogger(__name__)
+
         # Crear directorio si no existe
         os.makedirs(data_dir, exist_ok=True)
         
         # Inicializar archivos si no existen
         self._initialize_files()
-        
-        # Configurar logging
-        self.logger = logging.getLogger(__name__)
+
+        # Backups incrementales
+        self.backup_manager = BackupManager(data_dir, serializer=self.serializer)
+        self.backup_retention = backup_retention or {}
+        # Registros guardados desde el último backup y mtime de food_data tras
+        # la última escritura propia; None si se desconocen (el backup recorre todo)
+        self._backup_pending: Optional[Dict[str, Dict[str, Any]]] = None
+        self._backup_pending_mtime = None
 
     def _initialize_files(self):
         """
@@ -31,13 +152,31 @@ class DataManager:
         """
         # Inicializar products_urls.json
         if not os.path.exists(self.products_urls_path):
-            with open(self.products_urls_path, 'w') as f:
-                json.dump([], f, indent=4)
+            self._write_file(self.products_urls_path, self.urls_serializer, [])
         
-        # Inicializar food_data.json
+        # Inicializar food_data, migrando desde JSON si se usa otro formato
         if not os.path.exists(self.food_data_path):
-            with open(self.food_data_path, 'w') as f:
-                json.dump({}, f, indent=4)
+            json_path = os.path.join(self.data_dir, 'food_data.json')
+            food_data = {}
+            if os.path.exists(json_path):
+                with open(json_path, 'rb') as f:
+                    food_data = JsonSerializer().loads(f.read())
+                self.logger.info(f"Migrando food_data.json a {self.serializer.name}")
+            self._write_file(self.food_data_path, self.serializer, food_data)
+
+    @staticmethod
+    def _write_file(path: str, serializer, data: Any):
+        """
+        Escribe un archivo de datos de forma atómica
+
+        :param path: Ruta del archivo
+        :param serializer: Serializador a usar
+        :param data: Datos a guardar
+        """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(serializer.dumps(data))
+        os.replace(tmp_path, path)
 
     def load_product_urls(self) -> List[Dict[str, Any]]:
         """
@@ -46,9 +185,9 @@ class DataManager:
         :return: Lista de diccionarios con URLs de productos
         """
         try:
-            with open(self.products_urls_path, 'r') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
+            with open(self.products_urls_path, 'rb') as f:
+                return self.urls_serializer.loads(f.read())
+        except (FileNotFoundError, ValueError):
             self.logger.error("Error al cargar URLs de productos")
             return []
 
@@ -59,12 +198,100 @@ class DataManager:
         :return: Diccionario de datos de alimentos
         """
         try:
-            with open(self.food_data_path, 'r') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
+            with open(self.food_data_path, 'rb') as f:
+                return self.serializer.loads(f.read())
+        except (FileNotFoundError, ValueError):
             self.logger.error("Error al cargar datos de alimentos")
             return {}
 
+    def export_snapshot(self) -> str:
+        """
+        Exporta el catálogo a un snapshot binario de solo lectura
+
+        :return: Ruta del snapshot generado
+        """
+        write_snapshot(self.load_food_data(), self.snapshot_path)
+        self.logger.info(f"Snapshot del catálogo exportado: {self.snapshot_path}")
+        return self.snapshot_path
+
+    def open_snapshot(self) -> CatalogSnapshot:
+        """
+        Abre el snapshot del catálogo mapeado en memoria
+
+        Se regenera si no existe o si food_data es más reciente, y se vuelve a
+        abrir solo cuando el archivo cambió desde la última apertura.
+
+        :return: Vista de solo lectura del catálogo
+        """
+        if (not os.path.exists(self.snapshot_path) or
+                os.path.getmtime(self.snapshot_path) < os.path.getmtime(self.food_data_path)):
+            self.export_snapshot()
+
+        if self._snapshot is None or self._snapshot.mtime != os.path.getmtime(self.snapshot_path):
+            try:
+                self._snapshot = CatalogSnapshot(self.snapshot_path)
+            except ValueError:
+                # Snapshot de una versión anterior del formato
+                self.export_snapshot()
+                self._snapshot = CatalogSnapshot(self.snapshot_path)
+        return self._snapshot
+
+    def load_catalog(self, use_snapshot: bool = True):
+        """
+        Carga el catálogo para lectura
+
+        :param use_snapshot: Usar el snapshot mapeado en memoria en lugar de parsear food_data
+        :return: Mapping de productos por URL
+        """
+        if use_snapshot:
+            try:
+                return self.open_snapshot()
+            except Exception as e:
+                self.logger.warning(f"No se pudo abrir el snapshot del catálogo: {e}")
+        return self.load_food_data()
+
+    def catalog_view(self, use_snapshot: bool = True) -> CatalogView:
+        """
+        Devuelve el catálogo con el índice de tipos, reconstruyéndolo solo si
+        cambió food_data (por esta instancia o por otro proceso)
+
+        :param use_snapshot: Usar el snapshot mapeado en memoria en lugar de parsear food_data
+        :return: Vista compartida del catálogo
+        """
+        with self._lock:
+            mtime = self._food_data_mtime()
+            if self._catalog_view is None or self._catalog_key != (mtime, use_snapshot):
+                self._catalog_view = CatalogView(self.load_catalog(use_snapshot), version=self._catalog_generation)
+                self._catalog_generation += 1
+                self._catalog_key = (mtime, use_snapshot)
+            return self._catalog_view
+
+    def _food_data_mtime(self) -> Optional[float]:
+        try:
+            return os.path.getmtime(self.food_data_path)
+        except OSError:
+            return None
+
+    def invalidate_catalog(self):
+        """
+        Descarta la vista del catálogo y los índices; la próxima lectura los reconstruye
+        """
+        with self._lock:
+            self._catalog_view = None
+            self._indexes_mtime = None
+
+    def _sync_indexes(self):
+        """
+        Descarta los índices si food_data cambió desde que se construyeron
+        (p. ej. al restaurar un backup o por la escritura de otro proceso)
+        """
+        mtime = self._food_data_mtime()
+        if self._indexes_mtime != mtime:
+            self._metrics_index = None
+            self._pareto_index = None
+            self._ingredient_matcher = None
+            self._indexes_mtime = mtime
+
     def add_product_url(self, url_data: Dict[str, Any]) -> bool:
         """
         Agrega una nueva URL de producto
@@ -96,32 +323,195 @@ class DataManager:
 
         # Guardar URLs actualizadas
         try:
-            with open(self.products_urls_path, 'w') as f:
-                json.dump(product_urls, f, indent=4)
+            with self._lock:
+                self._write_file(self.products_urls_path, self.urls_serializer, product_urls)
+                self.invalidate_catalog()
             return True
         except Exception as e:
             self.logger.error(f"Error al guardar URL: {e}")
             return False
 
-    def update_product_data(self, updated_products: Dict[str, Dict[str, Any]]):
+    def update_product_data(self, updated_products: Dict[str, Dict[str, Any]],
+                            rejected: Dict[str, List[str]] = None) -> bool:
         """
         Actualiza los datos de productos
-        
+
+        Los diccionarios recibidos no se modifican; los índices en memoria solo
+        se actualizan si food_data se guardó, para no separarse del disco. Los
+        registros inválidos se descartan y los válidos se guardan igual.
+
         :param updated_products: Diccionario de productos actualizados
+        :param rejected: Diccionario donde se anotan los errores de validación
+            de cada producto descartado (URL -> errores), opcional
+        :return: Booleano indicando si se guardaron todos los productos
         """
-        # Cargar datos existentes
-        current_products = self.load_food_data()
+        with self._lock:
+            # Cargar datos existentes
+            current_products = self.load_food_data()
 
-        # Actualizar o agregar productos
-        for url, product_info in updated_products.items():
-            current_products[url] = product_info
+            # Actualizar o agregar productos (copias sin métricas: se derivan de
+            # nutrición y precio al construir los índices), descartando registros inválidos
+            accepted = {}
+            invalid = {}
+            for url, product_info in updated_products.items():
+                errors = validate_product(product_info)
+                if errors:
+                    self.logger.warning(f"Producto inválido {url}: {'; '.join(errors)}")
+                    invalid[url] = errors
+                    continue
+                accepted[url] = {key: value for key, value in product_info.items() if key != 'metrics'}
+            current_products.update(accepted)
+            # Registros guardados por versiones anteriores con métricas persistidas
+            for url, product_info in current_products.items():
+                if 'metrics' in product_info:
+                    current_products[url] = {key: value for key, value in product_info.items() if key != 'metrics'}
 
-        # Guardar datos actualizados
-        try:
-            with open(self.food_data_path, 'w') as f:
-                json.dump(current_products, f, indent=4)
-        except Exception as e:
-            self.logger.error(f"Error al guardar datos de productos: {e}")
+            # Guardar datos actualizados
+            try:
+                self._write_file(self.food_data_path, self.serializer, current_products)
+            except Exception as e:
+                self.logger.error(f"Error al guardar datos de productos: {e}")
+                if rejected is not None:
+                    rejected.update(invalid)
+                return False
+            try:
+                if os.path.exists(self.snapshot_path):
+                    write_snapshot(current_products, self.snapshot_path)
+            except Exception as e:
+                self.logger.error(f"Error al guardar el snapshot del catálogo: {e}")
+
+            for url, product_info in accepted.items():
+                if self._metrics_index is not None:
+                    self._metrics_index.update(url, product_info)
+                if self._pareto_index is not None:
+                    self._pareto_index.update(url, product_info)
+                if self._ingredient_matcher is not None:
+                    self._ingredient_matcher.update(url, product_info)
+            self.invalidate_catalog()
+            # Los índices ya tienen los cambios: siguen válidos para el archivo recién escrito
+            self._indexes_mtime = self._food_data_mtime()
+            if self._backup_pending is not None:
+                self._backup_pending.update(accepted)
+                self._backup_pending_mtime = self._indexes_mtime
+
+        # Las descargas de imágenes van en segundo plano: guardar no espera a la red
+        if accepted:
+            self.refresh_thumbnails(accepted)
+        if rejected is not None:
+            rejected.update(invalid)
+        return not invalid
+
+    def refresh_thumbnails(self, products: Dict[str, Dict[str, Any]] = None,
+                           background: bool = True) -> Optional[Dict[str, int]]:
+        """
+        Genera las miniaturas que faltan
+
+        Sin productos se recorre el catálogo completo y se borran las
+        miniaturas de imágenes que ya no se usan; con productos solo se revisan
+        esos (las miniaturas reemplazadas se borran en la siguiente pasada completa).
+        En segundo plano hay a lo sumo un hilo de descargas; si se pide otra
+        actualización mientras corre, el mismo hilo la atiende al terminar.
+
+        :param products: Productos cambiados (URL -> producto); None para el catálogo completo
+        :param background: Lanzar la actualización en un hilo y volver de inmediato
+        :return: Resumen de ImageCache.refresh (None en segundo plano o sin caché de miniaturas)
+        """
+        if self.image_cache is None:
+            return None
+        if not background:
+            return self._refresh_thumbnails(products)
+        with self._lock:
+            if products is None:
+                self._thumbnails_full = True
+                self._thumbnails_pending = {}
+            elif not self._thumbnails_full:
+                self._thumbnails_pending.update(products)
+            if self._thumbnail_worker is None:
+                self._thumbnail_worker = threading.Thread(
+                    target=self._run_thumbnail_worker, name='thumbnails', daemon=True
+                )
+                self._thumbnail_worker.start()
+        return None
+
+    def _run_thumbnail_worker(self):
+        while True:
+            with self._lock:
+                if not self._thumbnails_full and not self._thumbnails_pending:
+                    self._thumbnail_worker = None
+                    return
+                products = None if self._thumbnails_full else self._thumbnails_pending
+                self._thumbnails_full = False
+                self._thumbnails_pending = {}
+            try:
+                self._refresh_thumbnails(products)
+            except Exception as e:
+                self.logger.error(f"Error al actualizar miniaturas: {e}")
+
+    def _refresh_thumbnails(self, products: Dict[str, Dict[str, Any]] = None) -> Dict[str, int]:
+        if products is None:
+            stats = self.image_cache.refresh(self.load_food_data())
+        else:
+            stats = self.image_cache.refresh(products, prune=False)
+        self.logger.info(
+            f"Miniaturas: {stats['downloaded']} descargadas, {stats['kept']} sin cambios, "
+            f"{stats['failed']} fallidas, {stats['removed']} borradas"
+        )
+        return stats
+
+    def get_metrics_index(self) -> MetricsIndex:
+        """
+        Devuelve el índice de métricas derivadas, construyéndolo la primera vez
+        o cuando cambia food_data
+
+        :return: Índice de métricas ordenado por producto
+        """
+        with self._lock:
+            self._sync_indexes()
+            if self._metrics_index is None:
+                self._metrics_index = MetricsIndex(self.load_food_data())
+            return self._metrics_index
+
+    def get_pareto_index(self) -> ParetoIndex:
+        """
+        Devuelve la frontera de Pareto de precio por proteína contra grasa,
+        construyéndola la primera vez o cuando cambia food_data
+
+        :return: Índice de la frontera de Pareto
+        """
+        with self._lock:
+            self._sync_indexes()
+            if self._pareto_index is None:
+                self._pareto_index = ParetoIndex(self.load_food_data())
+            return self._pareto_index
+
+    def get_ingredient_matcher(self) -> IngredientMatcher:
+        """
+        Devuelve el índice de nombres de productos para reconocer ingredientes,
+        construyéndolo la primera vez o cuando cambia food_data
+
+        :return: Índice de ingredientes del catálogo
+        """
+        with self._lock:
+            self._sync_indexes()
+            if self._ingredient_matcher is None:
+                self._ingredient_matcher = IngredientMatcher(self.load_food_data())
+            return self._ingredient_matcher
+
+    def top_products(self, metric: str, n: int = 10, product_type: str = None) -> List[Dict[str, Any]]:
+        """
+        Obtiene los N mejores productos según una métrica derivada
+
+        :param metric: Nombre de la métrica (ver modules.metrics_index.METRICS)
+        :param n: Número de productos
+        :param product_type: Tipo de producto (None para todos)
+        :return: Lista de productos con sus métricas
+        """
+        index = self.get_metrics_index()
+        catalog = self.load_catalog()
+        return [
+            {**catalog[url], 'metrics': index.get_metrics(url)}
+            for url, _ in index.top(metric, n=n, product_type=product_type)
+        ]
 
     def search_products(self, query: str) -> List[Dict[str, Any]]:
         """
@@ -167,8 +557,7 @@ class DataManager:
         # Verificar si se eliminó algo
         if len(updated_urls) < len(product_urls):
             try:
-                with open(self.products_urls_path, 'w') as f:
-                    json.dump(updated_urls, f, indent=4)
+                self._write_file(self.products_urls_path, self.urls_serializer, updated_urls)
                 return True
             except Exception as e:
                 self.logger.error(f"Error al eliminar URL: {e}")
@@ -176,32 +565,49 @@ class DataManager:
         
         return False
 
-    def backup_data(self):
+    def backup_data(self) -> Optional[str]:
         """
-        Realiza una copia de seguridad de los archivos de datos
+        Realiza una copia de seguridad incremental de los archivos de datos
+
+        Solo se guardan los productos que cambiaron desde el backup anterior
+        y luego se aplica la política de retención. Si todas las escrituras
+        desde el backup anterior pasaron por update_product_data, solo se
+        firman esos productos; si no (primer backup del proceso, otro proceso
+        o una restauración cambió food_data) se recorre todo el catálogo.
+
+        :return: Identificador del snapshot o None si falló
         """
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        # Backup products_urls.json
-        backup_urls_path = os.path.join(
-            self.data_dir, 
-            f'products_urls_backup_{timestamp}.json'
-        )
-        
-        # Backup food_data.json
-        backup_food_path = os.path.join(
-            self.data_dir, 
-            f'food_data_backup_{timestamp}.json'
-        )
+        try:
+            with self._lock:
+                known = (self._backup_pending is not None and
+                         self._backup_pending_mtime == self._food_data_mtime())
+                changed = self._backup_pending if known else None
+                snapshot_id = self.backup_manager.create_snapshot(changed=changed, removed=[] if known else None)
+                self._backup_pending = {}
+                self._backup_pending_mtime = self._food_data_mtime()
+            if self.backup_retention:
+                self.backup_manager.prune(**self.backup_retention)
+            self.logger.info(f"Backup realizado: {snapshot_id}")
+            return snapshot_id
+        except Exception as e:
+            self.logger.error(f"Error al realizar backup: {e}")
+            return None
 
+    def restore_backup(self, snapshot_id: str = None, at: datetime = None) -> Optional[str]:
+        """
+        Restaura los archivos de datos desde un backup
+
+        :param snapshot_id: Snapshot a restaurar (por defecto el más reciente)
+        :param at: Alternativa a snapshot_id, restaura el estado en esa fecha
+        :return: Identificador del snapshot restaurado o None si falló
+        """
         try:
-            # Copiar archivos
-            with open(self.products_urls_path, 'r') as src, open(backup_urls_path, 'w') as dst:
-                dst.write(src.read())
-            
-            with open(self.food_data_path, 'r') as src, open(backup_food_path, 'w') as dst:
-                dst.write(src.read())
-            
-            self.logger.info(f"Backup realizado: {backup_urls_path}, {backup_food_path}")
+            return self.backup_manager.restore(snapshot_id, at=at)
         except Exception as e:
-            self.logger.error(f"Error al realizar backup: {e}")
\ No newline at end of file
+            self.logger.error(f"Error al restaurar backup: {e}")
+            return None
+        finally:
+            # Los archivos pudieron cambiar aunque la restauración falle a medias
+            self.invalidate_catalog()
+            with self._lock:
+                self._backup_pending = None
@@ -0,0 +1,176 @@
+# modules/image_cache.py
+import io
+import os
+import base64
+import hashlib
+import logging
+import threading
+import urllib.request
+from typing import Dict, Any, Optional
+
+USER_AGENT = 'Mozilla/5.0 (compatible; macros-thumbnails)'
+
+
+class ImageCache:
+    """
+    Caché local de miniaturas WebP de las imágenes de los productos
+
+    Cada imagen se descarga una sola vez al actualizar el catálogo, se
+    recorta al cuadrado, se reduce al tamaño con que se muestra y se guarda
+    como WebP en un archivo cuyo nombre es el hash de image_url y del tamaño;
+    si la URL cambia, la miniatura se vuelve a generar y la anterior se borra.
+    Las tarjetas usan la miniatura como data URI, así que el navegador no
+    vuelve a pedir la imagen remota en cada rerun.
+    """
+
+    def __init__(self, cache_dir: str, size: int = 192, quality: int = 75,
+                 timeout: float = 10.0, max_workers: int = 8):
+        """
+        :param cache_dir: Directorio de las miniaturas
+        :param size: Lado de la miniatura en píxeles
+        :param quality: Calidad WebP (0-100)
+        :param timeout: Segundos máximos por descarga
+        :param max_workers: Descargas simultáneas al actualizar
+        """
+        self.cache_dir = str(cache_dir)
+        self.size = size
+        self.quality = quality
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.logger = logging.getLogger(__name__)
+        self._uris: Dict[str, Optional[str]] = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def path(self, image_url: str) -> str:
+        """
+        Ruta de la miniatura de una imagen
+
+        :param image_url: URL de la imagen original
+        :return: Ruta del archivo WebP
+        """
+        digest = hashlib.blake2b(f"{self.size}:{image_url}".encode('utf-8'), digest_size=12).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.webp")
+
+    def _thumbnail(self, data: bytes) -> bytes:
+        # Se importa aquí para no cargar Pillow al arrancar
+        from PIL import Image, ImageOps
+
+        with Image.open(io.BytesIO(data)) as image:
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+            # Mismo recorte que object-cover en la tarjeta
+            thumbnail = ImageOps.fit(image, (self.size, self.size), Image.LANCZOS)
+            output = io.BytesIO()
+            thumbnail.save(output, format='WEBP', quality=self.quality, method=6)
+            return output.getvalue()
+
+    def _fetch(self, image_url: str) -> bool:
+        """
+        Descarga una imagen y guarda su miniatura
+
+        :return: True si se guardó la miniatura
+        """
+        try:
+            request = urllib.request.Request(image_url, headers={'User-Agent': USER_AGENT})
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                data = response.read()
+            thumbnail = self._thumbnail(data)
+        except Exception as e:
+            self.logger.warning(f"No se pudo generar la miniatura de {image_url}: {e}")
+            return False
+
+        path = self.path(image_url)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(thumbnail)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._uris.pop(image_url, None)
+        return True
+
+    def _fetch_all(self, image_urls) -> int:
+        """
+        Descarga varias imágenes con hasta max_workers hilos
+
+        Los hilos son daemon (los de ThreadPoolExecutor se esperan al salir),
+        así que cerrar la aplicación no espera a las descargas pendientes.
+
+        :return: Número de miniaturas guardadas
+        """
+        queue = list(image_urls)
+        results = []
+        lock = threading.Lock()
+
+        def work():
+            while True:
+                with lock:
+                    if not queue:
+                        return
+                    image_url = queue.pop()
+                saved = self._fetch(image_url)
+                with lock:
+                    results.append(saved)
+
+        workers = [threading.Thread(target=work, name='thumbnail-fetch', daemon=True)
+                   for _ in range(min(self.max_workers, len(queue)))]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return sum(results)
+
+    def refresh(self, products: Dict[str, Dict[str, Any]], prune: bool = True) -> Dict[str, int]:
+        """
+        Genera las miniaturas que faltan para un conjunto de productos
+
+        Solo se descargan las imágenes cuya URL no tiene miniatura todavía.
+
+        :param products: Diccionario de productos por URL
+        :param prune: Borrar las miniaturas que ya no corresponden a ningún producto
+            (solo tiene sentido si products es el catálogo completo)
+        :return: Diccionario con 'downloaded', 'kept', 'failed' y 'removed'
+        """
+        image_urls = {product['image_url'] for product in products.values() if product.get('image_url')}
+        missing = [url for url in image_urls if not os.path.exists(self.path(url))]
+
+        downloaded = self._fetch_all(missing) if missing else 0
+
+        removed = 0
+        if prune:
+            expected = {os.path.basename(self.path(url)) for url in image_urls}
+            for name in os.listdir(self.cache_dir):
+                if name.endswith('.webp') and name not in expected:
+                    os.remove(os.path.join(self.cache_dir, name))
+                    removed += 1
+            with self._lock:
+                for url in [url for url in self._uris if url not in image_urls]:
+                    del self._uris[url]
+
+        return {
+            'downloaded': downloaded,
+            'kept': len(image_urls) - len(missing),
+            'failed': len(missing) - downloaded,
+            'removed': removed
+        }
+
+    def data_uri(self, image_url: str) -> Optional[str]:
+        """
+        Miniatura como data URI, leída del disco una vez por proceso
+
+        :param image_url: URL de la imagen original
+        :return: Data URI o None si todavía no hay miniatura
+        """
+        with self._lock:
+            if image_url in self._uris:
+                return self._uris[image_url]
+        try:
+            with open(self.path(image_url), 'rb') as f:
+                uri = f"data:image/webp;base64,{base64.b64encode(f.read()).decode()}"
+        except OSError:
+            # Sin miniatura: no se memoriza para verla en cuanto se genere
+            return None
+        with self._lock:
+            self._uris[image_url] = uri
+        return uri
@@ -0,0 +1,292 @@
+# modules/ingredient_matcher.py
+import re
+import difflib
+import unicodedata
+from typing import Dict, List, Any, Optional, Tuple
+
+# Palabras que no identifican un producto (artículos, unidades, presentaciones)
+STOPWORDS = {
+    'de', 'del', 'la', 'el', 'los', 'las', 'con', 'en', 'y', 'a', 'al', 'para', 'x',
+    'g', 'gr', 'grs', 'kg', 'ml', 'l', 'lt', 'un', 'una', 'unidad', 'unidades', 'pack', 'bolsa'
+}
+# "sin X" se une en una sola palabra: "Mantequilla sin Sal" no es sal ni mantequilla con sal
+NEGATION = 'sin'
+# Lo que sigue a "con" es un agregado, no el alimento ("Leche con Avena" no es avena)
+ADDITION = 'con'
+# Tras "de" el alimento sigue solo si lo anterior es un corte o una porción
+# ("Filete de Pechuga", "Porciones de Atún"); si no, es el producto ("Bebida de Avena")
+OF = 'de'
+PORTION_WORDS = {
+    'filete', 'porcion', 'porcione', 'medallon', 'medallone', 'trozo', 'pechuga',
+    'pierna', 'muslo', 'chuleta', 'corte', 'lonja', 'guiso'
+}
+NUTRIENTS = ('protein', 'carbs', 'fat', 'calories')
+# Primeras palabras del nombre de un producto que identifican el alimento
+HEAD_WORDS = 2
+# Las palabras más cortas solo coinciden de forma exacta: con pocas letras
+# difflib confunde alimentos distintos (agua/aguja, palta/paleta)
+FUZZY_MIN_LENGTH = 7
+# Diferencia mínima de cobertura entre el mejor producto y otro que coincide
+# por palabras distintas; si no la hay, la consulta es ambigua
+AMBIGUITY_MARGIN = 0.25
+
+
+def fold(text: str) -> str:
+    """
+    Normaliza un texto para comparar: sin tildes, en minúsculas y solo con
+    letras y números separados por un espacio
+
+    :param text: Texto original
+    :return: Texto normalizado
+    """
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    return ' '.join(re.findall(r'[a-z0-9]+', text))
+
+
+def _stem(word: str) -> str:
+    return word[:-1] if len(word) > 3 and word.endswith('s') else word
+
+
+def tokens(text: str) -> List[str]:
+    """
+    Palabras significativas de un texto normalizado, en singular aproximado
+
+    Una negación se une a la palabra que la sigue ("sin lactosa" es una sola
+    palabra), así que nunca coincide con el alimento negado.
+
+    :param text: Texto original
+    :return: Lista de palabras sin repetir, en orden
+    """
+    return _tokens(text)[0]
+
+
+def _tokens(text: str) -> Tuple[List[str], List[str]]:
+    """
+    Palabras significativas y las que identifican el alimento principal
+
+    :return: Tupla (palabras, hasta HEAD_WORDS palabras iniciales antes de un
+        "con" o de un "de" que no sigue a un corte)
+    """
+    result = []
+    head = []
+    negated = False
+    closed = False
+    for word in fold(text).split():
+        if word == ADDITION or (word == OF and result and result[0] not in PORTION_WORDS):
+            closed = True
+        if word == NEGATION:
+            negated = True
+            continue
+        if word in STOPWORDS or word.isdigit():
+            continue
+        word = _stem(word)
+        if negated:
+            word = f"{NEGATION} {word}"
+            negated = False
+        if word not in result:
+            result.append(word)
+            if not closed and len(head) < HEAD_WORDS:
+                head.append(word)
+    return result, head
+
+
+class IngredientMatcher:
+    """
+    Índice del catálogo para reconocer los ingredientes de una receta
+
+    Se precalculan las palabras normalizadas de cada nombre de producto y un
+    índice invertido palabra -> productos. Una consulta primero busca el
+    nombre completo; si no, compara sus palabras de forma exacta o aproximada
+    (difflib contra el vocabulario, solo para palabras largas) y elige, entre
+    los productos cuyo nombre empieza por alguna de esas palabras (antes de
+    un "con" o de un "de" que no sigue a un corte), el que cubre más
+    palabras de la consulta. Si otro producto
+    cubre casi lo mismo con palabras distintas, la consulta es ambigua y no
+    se asigna ninguno. Los resultados se memorizan hasta que cambia el catálogo.
+    """
+
+    def __init__(self, products: Dict[str, Dict[str, Any]] = None, min_score: float = 0.6,
+                 fuzzy_cutoff: float = 0.85, margin: float = AMBIGUITY_MARGIN):
+        """
+        :param products: Diccionario de productos por URL
+        :param min_score: Fracción mínima de palabras de la consulta cubiertas para aceptar un producto
+        :param fuzzy_cutoff: Similitud mínima para que dos palabras largas se consideren iguales
+        :param margin: Ventaja mínima de cobertura sobre un producto que coincide por otras palabras
+        """
+        self.min_score = min_score
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.margin = margin
+        self._entries: Dict[str, Tuple[str, List[str], Dict[str, float]]] = {}
+        self._heads: Dict[str, set] = {}
+        self._names: Dict[str, str] = {}
+        self._index: Dict[str, set] = {}
+        self._vocabulary: Optional[List[str]] = None
+        self._memo: Dict[str, Optional[Tuple[str, float]]] = {}
+        for url, product in (products or {}).items():
+            self._add(url, product)
+
+    def _add(self, url: str, product: Dict[str, Any]):
+        nutrition = product.get('nutrition') or {}
+        if nutrition.get('protein') is None:
+            return
+        name = product.get('name', '')
+        words, head = _tokens(name)
+        self._entries[url] = (name, words, {key: nutrition.get(key) for key in NUTRIENTS})
+        self._heads[url] = set(head)
+        self._names[fold(name)] = url
+        for word in words:
+            self._index.setdefault(word, set()).add(url)
+
+    def remove(self, url: str):
+        """
+        Quita un producto del índice
+
+        :param url: URL del producto
+        """
+        entry = self._entries.pop(url, None)
+        if entry is None:
+            return
+        name, words, _ = entry
+        del self._heads[url]
+        if self._names.get(fold(name)) == url:
+            del self._names[fold(name)]
+        for word in words:
+            urls = self._index.get(word)
+            if urls is not None:
+                urls.discard(url)
+                if not urls:
+                    del self._index[word]
+        self._vocabulary = None
+        self._memo.clear()
+
+    def update(self, url: str, product: Dict[str, Any]):
+        """
+        Inserta o actualiza un producto en el índice
+
+        :param url: URL del producto
+        :param product: Diccionario con información del producto
+        """
+        self.remove(url)
+        self._add(url, product)
+        self._vocabulary = None
+        self._memo.clear()
+
+    def _similar_words(self, word: str) -> List[Tuple[str, float]]:
+        if word in self._index:
+            return [(word, 1.0)]
+        if len(word) < FUZZY_MIN_LENGTH or word.startswith(f"{NEGATION} "):
+            return []
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._index)
+        return [
+            (candidate, difflib.SequenceMatcher(None, word, candidate).ratio())
+            for candidate in difflib.get_close_matches(word, self._vocabulary, n=3, cutoff=self.fuzzy_cutoff)
+        ]
+
+    def match(self, ingredient: str) -> Optional[Tuple[str, float]]:
+        """
+        Busca el producto del catálogo que corresponde a un ingrediente
+
+        :param ingredient: Nombre del ingrediente
+        :return: Tupla (URL, puntaje entre 0 y 1) o None si ninguno alcanza min_score
+        """
+        folded = fold(ingredient)
+        if folded in self._memo:
+            return self._memo[folded]
+
+        result = None
+        if folded in self._names:
+            result = (self._names[folded], 1.0)
+        else:
+            words = tokens(ingredient)
+            scores: Dict[str, float] = {}
+            head: Dict[str, int] = {}
+            covered: Dict[str, frozenset] = {}
+            for word in words:
+                best: Dict[str, float] = {}
+                for candidate, similarity in self._similar_words(word):
+                    for url in self._index[candidate]:
+                        best[url] = max(best.get(url, 0.0), similarity)
+                        position = self._entries[url][1].index(candidate)
+                        head[url] = min(head.get(url, position), position)
+                        covered[url] = covered.get(url, frozenset()) | {candidate}
+                for url, similarity in best.items():
+                    scores[url] = scores.get(url, 0.0) + similarity
+            # El alimento va al inicio del nombre ("Pollo Pechuga ...", "Yogurt ... con Arroz",
+            # "Bebida de Avena"): solo se aceptan productos en los que coincide alguna
+            # de esas palabras
+            candidates = sorted(
+                (url for url in covered if covered[url] & self._heads[url]),
+                key=lambda url: (-scores[url], head[url], len(self._entries[url][1]))
+            )
+            if candidates:
+                # Cobertura de la consulta; luego la coincidencia más al inicio y el nombre más corto
+                url = candidates[0]
+                score = scores[url] / len(words)
+                # Otro producto que cubre casi lo mismo con palabras distintas: ambiguo
+                ambiguous = any(
+                    covered[other] != covered[url] and (scores[url] - scores[other]) / len(words) < self.margin
+                    for other in candidates[1:]
+                )
+                if score >= self.min_score and not ambiguous:
+                    result = (url, score)
+
+        self._memo[folded] = result
+        return result
+
+    def product(self, url: str) -> Optional[Tuple[str, Dict[str, float]]]:
+        """
+        Nombre y nutrientes por 100 g de un producto indexado
+
+        :param url: URL del producto
+        :return: Tupla (nombre, nutrientes) o None
+        """
+        entry = self._entries.get(url)
+        return (entry[0], entry[2]) if entry is not None else None
+
+
+def analyze_recipe(ingredients: List[Dict[str, Any]], matcher: IngredientMatcher,
+                   goals: Dict[str, float]) -> Dict[str, Any]:
+    """
+    Calcula los macronutrientes de una receta con los datos del catálogo
+
+    Las calorías se toman del producto si las tiene; si no, se estiman con
+    4 kcal por gramo de proteína y carbohidratos y 9 por gramo de grasa.
+
+    :param ingredients: Lista de {'name', 'grams'} (ver parse_recipe_ingredients)
+    :param matcher: Índice de ingredientes del catálogo
+    :param goals: Metas diarias 'daily_protein_goal', 'daily_carbs_goal' y 'daily_fat_goal'
+    :return: Diccionario con 'rows' (un registro por ingrediente), 'totals',
+        'goals' y 'percentages' por nutriente, y 'unmatched' (ingredientes sin producto)
+    """
+    rows = []
+    unmatched = []
+    totals = {key: 0.0 for key in NUTRIENTS}
+    for ingredient in ingredients:
+        found = matcher.match(ingredient['name'])
+        if found is None:
+            unmatched.append(ingredient['name'])
+            continue
+        url, score = found
+        name, nutrition = matcher.product(url)
+        factor = ingredient['grams'] / 100
+        values = {key: (nutrition.get(key) or 0.0) * factor for key in ('protein', 'carbs', 'fat')}
+        calories = nutrition.get('calories')
+        values['calories'] = (calories * factor if calories is not None else
+                              4 * (values['protein'] + values['carbs']) + 9 * values['fat'])
+        for key in NUTRIENTS:
+            totals[key] += values[key]
+        rows.append({'ingredient': ingredient['name'], 'grams': ingredient['grams'], 'product': name,
+                     'url': url, 'score': score, **values})
+
+    daily_goals = {
+        'protein': goals.get('daily_protein_goal') or 0.0,
+        'carbs': goals.get('daily_carbs_goal') or 0.0,
+        'fat': goals.get('daily_fat_goal') or 0.0
+    }
+    daily_goals['calories'] = 4 * (daily_goals['protein'] + daily_goals['carbs']) + 9 * daily_goals['fat']
+    percentages = {
+        key: totals[key] / daily_goals[key] * 100 if daily_goals[key] else None for key in NUTRIENTS
+    }
+    return {'rows': rows, 'totals': totals, 'goals': daily_goals, 'percentages': percentages, 'unmatched': unmatched}
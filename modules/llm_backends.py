@@ -0,0 +1,170 @@
+# modules/llm_backends.py
+import re
+import json
+import time
+import random
+import hashlib
+import threading
+from typing import Iterator, Dict, Optional
+
+
+class MockBackendError(RuntimeError):
+    """Error simulado por MockBackend"""
+
+
+class LLMBackend:
+    """
+    Interfaz de los modelos de lenguaje que usa RecipeGenerator
+
+    Las implementaciones deben poder llamarse desde varios hilos a la vez.
+    """
+
+    model_name = 'base'
+
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        """
+        Genera la respuesta completa
+
+        :param prompt: Texto del prompt
+        :param timeout: Segundos máximos de la llamada; el backend la corta al
+            agotarse (None para el límite por defecto del cliente)
+        :return: Texto de la respuesta
+        """
+        raise NotImplementedError
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """
+        Genera la respuesta por fragmentos a medida que llega
+
+        :param prompt: Texto del prompt
+        :return: Iterador de fragmentos de texto
+        """
+        yield self.generate(prompt)
+
+
+class GeminiBackend(LLMBackend):
+    """
+    Modelo de Google Gemini
+    """
+
+    def __init__(self, api_key: str, model_name: str = 'gemini-2.0-flash-exp'):
+        """
+        :param api_key: Clave de la API de Gemini
+        :param model_name: Nombre del modelo
+        """
+        # Se importa al crear el backend: google.generativeai tarda en cargar
+        # y no se necesita hasta generar la primera receta
+        try:
+            import google.generativeai as genai
+        except ImportError:
+            raise ImportError("google-generativeai no está instalado") from None
+        genai.configure(api_key=api_key)
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name)
+
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        # El tiempo límite lo aplica el cliente HTTP, así la llamada termina de verdad
+        request_options = {'timeout': timeout} if timeout is not None else None
+        response = self.model.generate_content(prompt, request_options=request_options)
+        if not hasattr(response, 'text'):
+            raise ValueError("La respuesta de la API no contiene el atributo 'text'.")
+        return response.text
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        for chunk in self.model.generate_content(prompt, stream=True):
+            try:
+                yield chunk.text
+            except ValueError:
+                # Fragmento sin texto (p. ej. solo metadatos de seguridad)
+                continue
+
+
+class MockBackend(LLMBackend):
+    """
+    Modelo local determinista para trabajar sin conexión y para pruebas de carga
+
+    La receta se arma a partir de los ingredientes del prompt. La latencia
+    sigue una distribución lognormal y los errores se simulan con una
+    probabilidad fija; ambos dependen solo de la semilla, el prompt y el
+    número de veces que se pidió ese prompt, así que una misma secuencia de
+    solicitudes se comporta igual en cada ejecución.
+    """
+
+    model_name = 'mock'
+
+    def __init__(self, latency: float = 0.5, jitter: float = 0.3, first_chunk_ratio: float = 0.3,
+                 error_rate: float = 0.0, chunk_size: int = 40, seed: int = 0):
+        """
+        :param latency: Mediana de la latencia total en segundos
+        :param jitter: Desviación del logaritmo de la latencia (0 para latencia fija)
+        :param first_chunk_ratio: Fracción de la latencia antes del primer fragmento
+        :param error_rate: Probabilidad de que una llamada falle
+        :param chunk_size: Caracteres por fragmento al hacer streaming
+        :param seed: Semilla de la simulación
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.first_chunk_ratio = first_chunk_ratio
+        self.error_rate = error_rate
+        self.chunk_size = chunk_size
+        self.seed = seed
+        self._lock = threading.Lock()
+        self._attempts: Dict[str, int] = {}
+        self.calls = 0
+        self.errors = 0
+
+    def _draw(self, prompt: str):
+        """
+        Sortea la latencia y si la llamada falla
+
+        :return: Tupla (latencia en segundos, falla)
+        """
+        digest = hashlib.blake2b(prompt.encode('utf-8'), digest_size=8).hexdigest()
+        with self._lock:
+            attempt = self._attempts.get(digest, 0)
+            self._attempts[digest] = attempt + 1
+            self.calls += 1
+        rng = random.Random(f"{self.seed}:{digest}:{attempt}")
+        latency = self.latency * rng.lognormvariate(0, self.jitter) if self.jitter else self.latency
+        fails = rng.random() < self.error_rate
+        if fails:
+            with self._lock:
+                self.errors += 1
+        return latency, fails
+
+    @staticmethod
+    def _recipe(prompt: str) -> str:
+        ingredients = re.findall(r"^- (.+): ([\d.]+)g$", prompt, flags=re.MULTILINE)
+        lines = ["## Receta de prueba", "", "### Ingredientes"]
+        lines += [f"- {name}: {float(grams):.0f} g" for name, grams in ingredients]
+        lines += ["", "### Preparación"]
+        lines += [f"{step}. Preparar {name.lower()}." for step, (name, _) in enumerate(ingredients, start=1)]
+        lines += [f"{len(ingredients) + 1}. Servir.", "", "### Valor nutricional aproximado", "- Ver tabla de productos"]
+        structured = [{'ingrediente': name, 'gramos': round(float(grams))} for name, grams in ingredients]
+        lines += ["", "```json", json.dumps(structured, ensure_ascii=False), "```"]
+        return "\n".join(lines)
+
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        latency, fails = self._draw(prompt)
+        if timeout is not None and latency > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"El modelo simulado superó el tiempo límite de {timeout}s")
+        time.sleep(latency)
+        if fails:
+            raise MockBackendError("Error simulado del modelo")
+        return self._recipe(prompt)
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        latency, fails = self._draw(prompt)
+        text = self._recipe(prompt)
+        chunks = [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)]
+        time.sleep(latency * self.first_chunk_ratio)
+        per_chunk = latency * (1 - self.first_chunk_ratio) / max(len(chunks) - 1, 1)
+        # Una falla simulada corta el streaming a la mitad
+        fail_at = len(chunks) // 2 if fails else None
+        for index, chunk in enumerate(chunks):
+            if index == fail_at:
+                raise MockBackendError("Error simulado del modelo durante el streaming")
+            if index:
+                time.sleep(per_chunk)
+            yield chunk
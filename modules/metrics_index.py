@@ -0,0 +1,157 @@
+# modules/metrics_index.py
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, List, Any, Optional, Tuple
+from utils.purchase_planner import promotion_tiers
+
+# Métricas derivadas: nombre -> (etiqueta, True si mayor es mejor)
+METRICS = {
+    'unit_price': ("Precio unitario con promoción (S/)", False),
+    'price_per_100g': ("Precio por 100 g (S/)", False),
+    'protein_per_sol': ("Proteína por sol (g/S/)", True),
+    'kcal_per_sol': ("Calorías por sol (kcal/S/)", True),
+    'protein_fat_ratio': ("Proteína : grasa", True),
+    'protein_density': ("Proteína por 100 kcal (g)", True)
+}
+
+
+def compute_product_metrics(product: Dict[str, Any]) -> Dict[str, Optional[float]]:
+    """
+    Calcula las métricas derivadas de un producto
+
+    El precio unitario usa el precio de la promoción más barata cuando
+    existe, que es el precio por unidad al comprar el lote promocional.
+
+    :param product: Diccionario con información del producto
+    :return: Diccionario de métricas (None si no se pueden calcular)
+    """
+    price = product.get('price') or {}
+    unit_price = price.get('regular_price')
+    for _, promo_price in promotion_tiers(price):
+        unit_price = min(promo_price, unit_price) if unit_price else promo_price
+
+    weight = product.get('weight_gr') or 0
+    nutrition = product.get('nutrition') or {}
+    protein = nutrition.get('protein')
+    fat = nutrition.get('fat')
+    calories = nutrition.get('calories')
+
+    has_price = bool(unit_price) and weight > 0
+    metrics = {
+        'unit_price': unit_price,
+        'price_per_100g': unit_price / weight * 100 if has_price else None,
+        'protein_per_sol': protein * weight / 100 / unit_price if has_price and protein is not None else None,
+        'kcal_per_sol': calories * weight / 100 / unit_price if has_price and calories is not None else None,
+        'protein_fat_ratio': None,
+        'protein_density': protein / calories * 100 if protein is not None and calories else None
+    }
+    if protein is not None and fat is not None:
+        # Grasa mínima de 0.1 g para que la razón sea finita y serializable
+        metrics['protein_fat_ratio'] = protein / max(fat, 0.1)
+    return metrics
+
+
+class MetricsIndex:
+    """
+    Índices secundarios ordenados por métrica, globales y por tipo de producto
+
+    Cada índice es una lista ordenada de (valor, url), así que las consultas
+    de los N mejores son O(log n + N).
+    """
+
+    def __init__(self, products: Dict[str, Dict[str, Any]] = None):
+        """
+        Construye los índices a partir del catálogo
+
+        :param products: Diccionario de productos por URL
+        """
+        self._entries: Dict[str, Tuple[Optional[str], Dict[str, Optional[float]]]] = {}
+        self._indexes: Dict[Tuple[str, Optional[str]], List[Tuple[float, str]]] = {}
+        for url, product in (products or {}).items():
+            self.update(url, product)
+
+    def _keys(self, metric: str, product_type: Optional[str]):
+        yield (metric, None)
+        if product_type is not None:
+            yield (metric, product_type)
+
+    def remove(self, url: str):
+        """
+        Quita un producto de todos los índices
+
+        :param url: URL del producto
+        """
+        if url not in self._entries:
+            return
+        product_type, metrics = self._entries.pop(url)
+        for metric, value in metrics.items():
+            if value is None:
+                continue
+            for key in self._keys(metric, product_type):
+                index = self._indexes[key]
+                position = bisect_left(index, (value, url))
+                if position < len(index) and index[position] == (value, url):
+                    del index[position]
+
+    def update(self, url: str, product: Dict[str, Any]) -> Dict[str, Optional[float]]:
+        """
+        Inserta o actualiza un producto en los índices
+
+        :param url: URL del producto
+        :param product: Diccionario con información del producto
+        :return: Métricas calculadas
+        """
+        self.remove(url)
+        # Siempre desde nutrición y precio: no se confía en métricas guardadas
+        metrics = compute_product_metrics(product)
+        product_type = product.get('type')
+        self._entries[url] = (product_type, metrics)
+        for metric, value in metrics.items():
+            if value is None or metric not in METRICS:
+                continue
+            for key in self._keys(metric, product_type):
+                insort(self._indexes.setdefault(key, []), (value, url))
+        return metrics
+
+    def get_metrics(self, url: str) -> Optional[Dict[str, Optional[float]]]:
+        """
+        Devuelve las métricas de un producto indexado
+
+        :param url: URL del producto
+        :return: Diccionario de métricas o None si no está indexado
+        """
+        entry = self._entries.get(url)
+        return entry[1] if entry else None
+
+    def top(
+        self,
+        metric: str,
+        n: int = 10,
+        product_type: str = None,
+        best_first: bool = True,
+        min_value: float = None,
+        max_value: float = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Devuelve los N productos con mejor (o peor) valor de una métrica
+
+        :param metric: Nombre de la métrica, ver METRICS
+        :param n: Número de productos a devolver
+        :param product_type: Restringir a un tipo de producto (None para todos)
+        :param best_first: Ordenar del mejor al peor según la métrica
+        :param min_value: Valor mínimo incluido
+        :param max_value: Valor máximo incluido
+        :return: Lista de tuplas (url, valor)
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Métrica desconocida: {metric}")
+        index = self._indexes.get((metric, product_type), [])
+
+        start = bisect_left(index, (min_value,)) if min_value is not None else 0
+        end = bisect_right(index, (max_value, '\uffff')) if max_value is not None else len(index)
+
+        descending = METRICS[metric][1] == best_first
+        if descending:
+            selection = index[max(start, end - n):end][::-1]
+        else:
+            selection = index[start:min(end, start + n)]
+        return [(url, value) for value, url in selection]
@@ -0,0 +1,184 @@
+# modules/pareto_index.py
+import math
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, List, Any, Optional, Tuple
+from modules.metrics_index import compute_product_metrics
+
+# Objetivos a minimizar: (etiqueta, unidad)
+OBJECTIVES = (
+    ("Precio por gramo de proteína", "S/"),
+    ("Grasa por 100 g", "g")
+)
+
+Point = Tuple[float, float, str]
+
+
+def pareto_point(product: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    """
+    Coordenadas de un producto en el espacio (precio por gramo de proteína, grasa)
+
+    :param product: Diccionario con información del producto
+    :return: Tupla (S/ por gramo de proteína, grasa por 100 g) o None si faltan datos
+    """
+    metrics = compute_product_metrics(product)
+    protein_per_sol = metrics.get('protein_per_sol')
+    fat = (product.get('nutrition') or {}).get('fat')
+    if not protein_per_sol or fat is None:
+        return None
+    return 1 / protein_per_sol, float(fat)
+
+
+def _dominates(a: Point, b: Point) -> bool:
+    return a[0] <= b[0] and a[1] <= b[1] and (a[0] < b[0] or a[1] < b[1])
+
+
+def pareto_frontier(points: List[Point]) -> List[Point]:
+    """
+    Calcula la frontera de Pareto (minimizando ambos ejes) en O(n log n)
+
+    Se ordenan los puntos por x y se recorren guardando el menor y visto:
+    un punto es no dominado si su y es menor que el de todos los puntos con
+    x menor. Los puntos idénticos se conservan todos.
+
+    :param points: Lista de tuplas (x, y, url)
+    :return: Frontera ordenada por x creciente (y decreciente)
+    """
+    frontier = []
+    best_y = math.inf
+    ordered = sorted(points)
+    i = 0
+    while i < len(ordered):
+        # Con el mismo x solo compiten los de menor y
+        x, min_y = ordered[i][0], ordered[i][1]
+        j = i
+        while j < len(ordered) and ordered[j][0] == x:
+            if ordered[j][1] == min_y and min_y < best_y:
+                frontier.append(ordered[j])
+            j += 1
+        best_y = min(best_y, min_y)
+        i = j
+    return frontier
+
+
+class ParetoIndex:
+    """
+    Frontera de Pareto de precio por gramo de proteína contra grasa, global
+    y por tipo de producto, mantenida de forma incremental
+
+    Insertar un punto cuesta O(log n) más los puntos de la frontera que deja
+    dominados; quitar un punto de la frontera recalcula solo la frontera de
+    su grupo a partir de la lista ya ordenada.
+    """
+
+    def __init__(self, products: Dict[str, Dict[str, Any]] = None):
+        """
+        Construye las fronteras a partir del catálogo
+
+        :param products: Diccionario de productos por URL
+        """
+        self._entries: Dict[str, Tuple[Optional[str], Point]] = {}
+        self._points: Dict[Optional[str], List[Point]] = {}
+        self._frontiers: Dict[Optional[str], List[Point]] = {}
+
+        for url, product in (products or {}).items():
+            coordinates = pareto_point(product)
+            if coordinates is None:
+                continue
+            point = (*coordinates, url)
+            product_type = product.get('type')
+            self._entries[url] = (product_type, point)
+            for group in self._groups(product_type):
+                self._points.setdefault(group, []).append(point)
+        for group, points in self._points.items():
+            points.sort()
+            self._frontiers[group] = pareto_frontier(points)
+
+    def _groups(self, product_type: Optional[str]):
+        yield None
+        if product_type is not None:
+            yield product_type
+
+    def _insert_frontier(self, group: Optional[str], point: Point):
+        frontier = self._frontiers.setdefault(group, [])
+        position = bisect_right(frontier, (point[0], math.inf))
+        if position > 0 and _dominates(frontier[position - 1], point):
+            return
+        position = bisect_left(frontier, point)
+        frontier.insert(position, point)
+        # Los puntos que el nuevo domina están justo después de él
+        end = position + 1
+        while end < len(frontier) and _dominates(point, frontier[end]):
+            end += 1
+        del frontier[position + 1:end]
+
+    def remove(self, url: str):
+        """
+        Quita un producto de las fronteras
+
+        :param url: URL del producto
+        """
+        if url not in self._entries:
+            return
+        product_type, point = self._entries.pop(url)
+        for group in self._groups(product_type):
+            points = self._points[group]
+            del points[bisect_left(points, point)]
+            frontier = self._frontiers[group]
+            position = bisect_left(frontier, point)
+            if position < len(frontier) and frontier[position] == point:
+                # Puntos que este dominaba pueden pasar a la frontera
+                self._frontiers[group] = pareto_frontier(points)
+
+    def update(self, url: str, product: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+        """
+        Inserta o actualiza un producto en las fronteras
+
+        :param url: URL del producto
+        :param product: Diccionario con información del producto
+        :return: Coordenadas del producto o None si no tiene datos suficientes
+        """
+        self.remove(url)
+        coordinates = pareto_point(product)
+        if coordinates is None:
+            return None
+        point = (*coordinates, url)
+        product_type = product.get('type')
+        self._entries[url] = (product_type, point)
+        for group in self._groups(product_type):
+            insort(self._points.setdefault(group, []), point)
+            self._insert_frontier(group, point)
+        return coordinates
+
+    def frontier(self, product_type: str = None) -> List[Tuple[str, float, float]]:
+        """
+        Devuelve los productos no dominados
+
+        :param product_type: Tipo de producto (None para todo el catálogo)
+        :return: Lista de (url, precio por gramo de proteína, grasa) ordenada por precio
+        """
+        return [(url, x, y) for x, y, url in self._frontiers.get(product_type, [])]
+
+    def points(self, product_type: str = None) -> List[Tuple[str, float, float]]:
+        """
+        Devuelve todos los productos con coordenadas
+
+        :param product_type: Tipo de producto (None para todo el catálogo)
+        :return: Lista de (url, precio por gramo de proteína, grasa)
+        """
+        return [(url, x, y) for x, y, url in self._points.get(product_type, [])]
+
+    def is_dominated(self, url: str, product_type: str = None) -> Optional[bool]:
+        """
+        Indica si un producto está dominado dentro de un grupo
+
+        :param url: URL del producto
+        :param product_type: Tipo de producto (None para todo el catálogo)
+        :return: True si está dominado, False si está en la frontera, None si no está indexado
+        """
+        entry = self._entries.get(url)
+        if entry is None:
+            return None
+        point = entry[1]
+        frontier = self._frontiers.get(product_type, [])
+        position = bisect_left(frontier, point)
+        return not (position < len(frontier) and frontier[position] == point)
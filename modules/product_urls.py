@@ -0,0 +1,69 @@
+# modules/product_urls.py
+import re
+
+def validate_makro_url(url):
+    """
+    Valida si la URL es de Makro Plaza Vea
+    
+    :param url: URL a validar
+    :return: Booleano indicando si es válida
+    """
+    return (
+        url.startswith("https://www.makro.plazavea.com.pe/") and 
+        url.endswith("/p")
+    )
+
+def extract_url_metadata(url, name=None):
+    """
+    Extrae metadatos adicionales de una URL de producto
+    
+    :param url: URL del producto
+    :param name: Nombre del producto (opcional)
+    :return: Diccionario con metadatos
+    """
+    metadata = {
+        'url': url
+    }
+
+    # Extraer peso
+    weight_match = re.search(r'(\d+)\s*(?:kg|g)\b', url, re.IGNORECASE)
+    if weight_match:
+        weight = float(weight_match.group(1))
+        metadata['weight_gr'] = weight * 1000 if 'kg' in weight_match.group(0).lower() else weight
+
+    # Extraer tipo de producto
+    meat_keywords = {
+        'pollo': ['pollo', 'pechuga', 'pierna', 'encuentro'],
+        'pavo': ['pavo'],
+        'res': ['res', 'carne', 'bistec', 'lomo'],
+        'cerdo': ['cerdo', 'chuleta']
+    }
+
+    for meat_type, keywords in meat_keywords.items():
+        if any(keyword in url.lower() or (name and keyword in name.lower()) for keyword in keywords):
+            metadata['type'] = meat_type
+            break
+
+    return metadata
+
+def bulk_validate_urls(urls):
+    """
+    Valida múltiples URLs
+    
+    :param urls: Lista de URLs
+    :return: Lista de URLs válidas
+    """
+    return [url for url in urls if validate_makro_url(url)]
+
+def preprocess_product_name(name):
+    """
+    Preprocesa el nombre del producto para búsquedas
+    
+    :param name: Nombre original del producto
+    :return: Nombre preprocesado
+    """
+    # Eliminar marcas comerciales, unidades, etc.
+    name = re.sub(r'\b(Bolsa|Paquete|x\d+|Congelado|Fresco)\b', '', name, flags=re.IGNORECASE)
+    # Eliminar espacios extra
+    name = ' '.join(name.split())
+    return name
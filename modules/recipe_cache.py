@@ -0,0 +1,206 @@
+# modules/recipe_cache.py
+import os
+import time
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, Optional
+from modules.serializers import JsonSerializer
+
+# Cambiar si cambia el texto del prompt, para no reutilizar respuestas de la versión anterior
+PROMPT_VERSION = 2
+
+# Contadores por directorio de caché, compartidos por todas las sesiones del proceso
+_COUNTERS: Dict[str, Dict[str, int]] = {}
+_COUNTERS_LOCK = threading.Lock()
+
+
+def round_grams(grams: float, precision: float) -> float:
+    """
+    Redondea gramos a la precisión de la caché
+
+    :param grams: Gramos
+    :param precision: Paso de redondeo en gramos (0 para no redondear)
+    :return: Gramos redondeados
+    """
+    if not precision:
+        return float(grams)
+    return round(round(grams / precision) * precision, 6)
+
+
+def canonical_context(recipe_context: Dict[str, Any], grams_precision: float, model_name: str) -> Dict[str, Any]:
+    """
+    Forma canónica de las entradas del prompt: ingredientes ordenados con
+    gramos redondeados, restricciones ordenadas y modelo
+
+    :param recipe_context: Contexto de la receta (ver RecipeGenerator.generate_recipe)
+    :param grams_precision: Paso de redondeo de los gramos
+    :param model_name: Nombre del modelo que genera la respuesta
+    :return: Diccionario canónico
+    """
+    ingredients = recipe_context.get('ingredients', {})
+    return {
+        'version': PROMPT_VERSION,
+        'model': model_name,
+        'ingredients': sorted(
+            [name.strip(), round_grams(grams, grams_precision)] for name, grams in ingredients.items()
+        ),
+        'meal_type': recipe_context.get('meal_type', 'cualquier comida').strip().lower(),
+        'cuisine_type': recipe_context.get('cuisine_type', 'Peruana').strip().lower(),
+        'dietary_restrictions': sorted(r.strip().lower() for r in recipe_context.get('dietary_restrictions', []))
+    }
+
+
+def context_key(canonical: Dict[str, Any]) -> str:
+    """
+    Hash de la forma canónica de las entradas
+
+    :param canonical: Resultado de canonical_context
+    :return: Hash hexadecimal
+    """
+    return hashlib.sha256(JsonSerializer().dumps(canonical)).hexdigest()
+
+
+class RecipeCache:
+    """
+    Caché persistente de respuestas del generador de recetas
+
+    Cada entrada es un archivo JSON cuyo nombre es el hash de la forma
+    canónica de las entradas. Una entrada vence cuando pasa el TTL desde que
+    se generó (created_at, que también queda como fecha de modificación del
+    archivo), aunque se siga usando. La fecha de acceso marca el último uso:
+    al superar el máximo de entradas se eliminan las menos usadas recientemente.
+    """
+
+    def __init__(self, cache_dir: str, ttl_hours: float = 168, max_entries: int = 500, grams_precision: float = 5):
+        """
+        :param cache_dir: Directorio de la caché
+        :param ttl_hours: Horas de validez de una respuesta desde que se generó
+        :param max_entries: Número máximo de respuestas guardadas
+        :param grams_precision: Paso de redondeo de los gramos en la clave
+        """
+        self.cache_dir = str(cache_dir)
+        self.ttl_seconds = ttl_hours * 3600
+        self.max_entries = max_entries
+        self.grams_precision = grams_precision
+        self.serializer = JsonSerializer()
+        self.logger = logging.getLogger(__name__)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with _COUNTERS_LOCK:
+            self._counters = _COUNTERS.setdefault(self.cache_dir, {'hits': 0, 'misses': 0, 'bypasses': 0})
+
+    def _count(self, counter: str):
+        with _COUNTERS_LOCK:
+            self._counters[counter] += 1
+
+    def key(self, canonical: Dict[str, Any]) -> str:
+        """
+        Hash de la forma canónica de las entradas
+
+        :param canonical: Resultado de canonical_context
+        :return: Hash hexadecimal
+        """
+        return context_key(canonical)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Devuelve la respuesta guardada si existe y no venció
+
+        :param key: Clave de la entrada
+        :return: Texto de la respuesta o None
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = self.serializer.loads(f.read())
+        except (FileNotFoundError, ValueError):
+            self._count('misses')
+            return None
+
+        if time.time() - entry.get('created_at', 0) > self.ttl_seconds:
+            self._count('misses')
+            return None
+
+        # Marcar el uso para el orden LRU sin tocar la fecha de creación
+        try:
+            os.utime(path, (time.time(), os.stat(path).st_mtime))
+        except OSError:
+            pass
+        self._count('hits')
+        return entry.get('response')
+
+    def put(self, key: str, canonical: Dict[str, Any], response: str):
+        """
+        Guarda una respuesta y aplica el límite de entradas
+
+        :param key: Clave de la entrada
+        :param canonical: Entradas canónicas (se guardan para inspección)
+        :param response: Texto de la respuesta
+        """
+        created_at = time.time()
+        entry = {'created_at': created_at, 'inputs': canonical, 'response': response}
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(self.serializer.dumps(entry))
+            os.replace(tmp_path, path)
+            os.utime(path, (created_at, created_at))
+        except OSError as e:
+            self.logger.warning(f"No se pudo guardar la receta en caché: {e}")
+            return
+        self._evict()
+
+    def record_bypass(self):
+        """
+        Registra una regeneración que ignoró la caché a pedido del usuario
+        """
+        self._count('bypasses')
+
+    def _evict(self):
+        """
+        Elimina las entradas vencidas y las menos usadas por encima del máximo
+        """
+        entries = []
+        now = time.time()
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            # La fecha de modificación es created_at: misma regla de vencimiento que get
+            if now - stat.st_mtime > self.ttl_seconds:
+                self._remove(path)
+            else:
+                entries.append((stat.st_atime, path))
+
+        excess = len(entries) - self.max_entries
+        if excess > 0:
+            for _, path in sorted(entries)[:excess]:
+                self._remove(path)
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Contadores de la caché en este proceso
+
+        :return: Diccionario con 'hits', 'misses', 'bypasses', 'entries' y 'hit_rate'
+        """
+        with _COUNTERS_LOCK:
+            counters = dict(self._counters)
+        lookups = counters['hits'] + counters['misses']
+        counters['entries'] = sum(1 for name in os.listdir(self.cache_dir) if name.endswith('.json'))
+        counters['hit_rate'] = counters['hits'] / lookups if lookups else 0.0
+        return counters
@@ -1,54 +1,396 @@
 # modules/recipe_generator.py
-import streamlit as st
-import google.generativeai as genai
+import time
+import asyncio
 import logging
+import contextlib
+import json
+import re
+from modules.recipe_cache import canonical_context, context_key, round_grams
+from modules.llm_backends import GeminiBackend
 
 logger = logging.getLogger(__name__)
 
-class RecipeGenerator:
-    def __init__(self, api_key):
-        genai.configure(api_key=st.secrets["GEMINIAPI"]["key"])
-        self.model = genai.GenerativeModel('gemini-2.0-flash-exp')
+# Bloque final con los ingredientes en JSON que se pide al modelo
+STRUCTURED_BLOCK = re.compile(r"```json\s*(.*?)```", re.DOTALL)
+
+
+def build_recipe_context(selected_products, user_prefs, meal_type, cuisine_type, dietary_restrictions):
+    """
+    Arma el contexto de la receta: la proteína diaria se reparte en partes
+    iguales entre los productos seleccionados
+
+    :param selected_products: Productos seleccionados (URL -> producto)
+    :param user_prefs: Preferencias del usuario con las metas diarias
+    :param meal_type: Tipo de comida
+    :param cuisine_type: Tipo de cocina
+    :param dietary_restrictions: Lista de restricciones dietéticas
+    :return: Tupla (contexto, nombres de productos sin información nutricional)
+    """
+    ingredients = {}
+    skipped = []
+    for product in selected_products.values():
+        if not product.get('nutrition'):
+            skipped.append(product['name'])
+            continue
+        daily_protein_needed = user_prefs['daily_protein'] / len(selected_products)
+        ingredients[product['name']] = (daily_protein_needed * 100) / product['nutrition']['protein']
+
+    recipe_context = {
+        "ingredients": ingredients,
+        "meal_type": meal_type,
+        "cuisine_type": cuisine_type,
+        "dietary_restrictions": dietary_restrictions,
+        "daily_protein_goal": user_prefs['daily_protein'],
+        "daily_carbs_goal": user_prefs['daily_carbs'],
+        "daily_fat_goal": user_prefs['daily_fat']
+    }
+    return recipe_context, skipped
 
-    def generate_recipe(self, recipe_context):
+
+def parse_recipe_ingredients(recipe_text):
+    """
+    Extrae la lista estructurada de ingredientes del último bloque ```json de la receta
+
+    :param recipe_text: Texto de la receta
+    :return: Lista de {'name', 'grams'}; vacía si no hay bloque o no es válido
+    """
+    blocks = STRUCTURED_BLOCK.findall(recipe_text or "")
+    if not blocks:
+        return []
+    try:
+        items = json.loads(blocks[-1])
+    except ValueError:
+        logger.warning("El bloque de ingredientes de la receta no es JSON válido")
+        return []
+
+    ingredients = []
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict):
+            continue
+        name = item.get('ingrediente') or item.get('nombre') or item.get('name')
+        grams = item.get('gramos', item.get('grams'))
         try:
-            # Construcción de la lista de ingredientes
-            ingredients = recipe_context.get('ingredients', {})
-            if not ingredients:
-                logger.warning("No se proporcionaron ingredientes para generar la receta.")
-                return "No se proporcionaron ingredientes para generar la receta."
+            grams = float(grams)
+        except (TypeError, ValueError):
+            continue
+        if name and grams > 0:
+            ingredients.append({'name': str(name), 'grams': grams})
+    return ingredients
 
-            ingredients_text = "\n".join([f"- {name}: {grams:.1f}g" for name, grams in ingredients.items()])
-            meal_type = recipe_context.get('meal_type', 'cualquier comida')
-            cuisine_type = recipe_context.get('cuisine_type', 'Peruana')
-            dietary_restrictions = recipe_context.get('dietary_restrictions', [])
 
-            if dietary_restrictions:
-                dietary_text = ", ".join(dietary_restrictions)
-                dietary_clause = f"teniendo en cuenta las siguientes restricciones dietéticas: {dietary_text}"
-            else:
-                dietary_clause = "sin restricciones dietéticas"
+def strip_structured_block(recipe_text):
+    """
+    Quita el bloque ```json de ingredientes para mostrar la receta
 
-            # Construcción del prompt
-            prompt = f"""Dame una receta {cuisine_type.lower()} para {meal_type.lower()} {dietary_clause} usando estos ingredientes:
+    :param recipe_text: Texto de la receta
+    :return: Texto sin el bloque
+    """
+    return STRUCTURED_BLOCK.sub("", recipe_text).rstrip()
+
+
+class StructuredBlockFilter:
+    """
+    Envuelve los fragmentos de generate_recipe_stream y deja de entregarlos
+    al llegar al bloque ```json de ingredientes, que no se muestra
+
+    El texto completo, con el bloque, queda en ``text`` para la caché y
+    para parse_recipe_ingredients. Si se deja de iterar, también se cierra
+    el generador envuelto para que cancele la generación.
+    """
+
+    FENCE = "```json"
+
+    def __init__(self, chunks):
+        """
+        :param chunks: Iterable de fragmentos de texto
+        """
+        self.chunks = chunks
+        self._parts = []
+
+    @property
+    def text(self):
+        """
+        Texto recibido hasta ahora, incluido el bloque de ingredientes
+        """
+        return "".join(self._parts)
+
+    def __iter__(self):
+        pending = ""
+        hidden = False
+        try:
+            for chunk in self.chunks:
+                self._parts.append(chunk)
+                if hidden:
+                    continue
+                pending += chunk
+                index = pending.find(self.FENCE)
+                if index >= 0:
+                    hidden = True
+                    visible, pending = pending[:index].rstrip(), ""
+                else:
+                    # Se retiene el posible comienzo de la marca partida entre fragmentos
+                    keep = next((size for size in range(len(self.FENCE) - 1, 0, -1)
+                                 if pending.endswith(self.FENCE[:size])), 0)
+                    visible, pending = pending[:len(pending) - keep], pending[len(pending) - keep:]
+                if visible:
+                    yield visible
+            if pending:
+                yield pending
+        finally:
+            close = getattr(self.chunks, 'close', None)
+            if close is not None:
+                close()
+
+
+class RecipeGenerator:
+    def __init__(self, api_key=None, cache=None, gate=None, backend=None):
+        """
+        :param api_key: Clave de la API de Gemini (si no se indica backend)
+        :param cache: RecipeCache opcional para reutilizar respuestas
+        :param gate: RequestGate opcional que agrupa solicitudes idénticas en curso
+            y limita las llamadas simultáneas de todo el proceso
+        :param backend: LLMBackend que genera el texto (por defecto GeminiBackend)
+        """
+        self.backend = backend if backend is not None else GeminiBackend(api_key)
+        self.model_name = self.backend.model_name
+        self.cache = cache
+        self.gate = gate
+        # Indica si la última receta devuelta vino de la caché
+        self.last_from_cache = False
+
+    def build_prompt(self, recipe_context):
+        """
+        Construye el prompt de la receta
+
+        :param recipe_context: Contexto de la receta
+        :return: Texto del prompt
+        """
+        ingredients = recipe_context.get('ingredients', {})
+        ingredients_text = "\n".join([f"- {name}: {grams:.1f}g" for name, grams in ingredients.items()])
+        meal_type = recipe_context.get('meal_type', 'cualquier comida')
+        cuisine_type = recipe_context.get('cuisine_type', 'Peruana')
+        dietary_restrictions = recipe_context.get('dietary_restrictions', [])
+
+        if dietary_restrictions:
+            dietary_text = ", ".join(dietary_restrictions)
+            dietary_clause = f"teniendo en cuenta las siguientes restricciones dietéticas: {dietary_text}"
+        else:
+            dietary_clause = "sin restricciones dietéticas"
+
+        return f"""Dame una receta {cuisine_type.lower()} para {meal_type.lower()} {dietary_clause} usando estos ingredientes:
 {ingredients_text}
 
 Por favor incluye:
 - Nombre de cada plato
 - Ingredientes con cantidades
 - Pasos de preparación
-- Valor nutricional aproximado"""
+- Valor nutricional aproximado
+
+Al final, agrega un bloque ```json con la lista de ingredientes y sus gramos totales,
+por ejemplo: [{{"ingrediente": "Pechuga de pollo", "gramos": 150}}]"""
+
+    def _prepare(self, recipe_context, regenerate):
+        """
+        Redondea los gramos, calcula la clave de las entradas y busca la
+        respuesta en la caché
+
+        :return: Tupla (contexto, entradas canónicas, clave, respuesta guardada o None)
+        """
+        if self.cache is None:
+            canonical = canonical_context(recipe_context, 0, self.model_name)
+            return recipe_context, canonical, context_key(canonical), None
+
+        # El prompt usa los mismos gramos redondeados que la clave
+        recipe_context = {**recipe_context, 'ingredients': {
+            name: round_grams(grams, self.cache.grams_precision)
+            for name, grams in recipe_context.get('ingredients', {}).items()
+        }}
+        canonical = canonical_context(recipe_context, self.cache.grams_precision, self.model_name)
+        cache_key = self.cache.key(canonical)
+        if regenerate:
+            self.cache.record_bypass()
+            return recipe_context, canonical, cache_key, None
+        return recipe_context, canonical, cache_key, self.cache.get(cache_key)
+
+    def _call_model(self, prompt, key, timeout=None):
+        """
+        Llama al modelo y devuelve el texto, pasando por el RequestGate si existe
+
+        :param prompt: Texto del prompt
+        :param key: Clave de las entradas; las llamadas idénticas en curso se comparten
+        :param timeout: Segundos máximos de la llamada, aplicados por el backend
+        :return: Texto de la respuesta
+        """
+        if self.gate is None:
+            return self.backend.generate(prompt, timeout=timeout)
+        return self.gate.run(key, lambda: self.backend.generate(prompt, timeout=timeout))
+
+    def generate_recipe(self, recipe_context, regenerate=False):
+        """
+        Genera una receta, reutilizando la respuesta guardada para las mismas entradas
+
+        :param recipe_context: Contexto con 'ingredients' (nombre -> gramos), 'meal_type',
+            'cuisine_type' y 'dietary_restrictions'
+        :param regenerate: Ignorar la respuesta guardada y generar una nueva
+        :return: Texto de la receta o None si falló
+        """
+        self.last_from_cache = False
+        try:
+            ingredients = recipe_context.get('ingredients', {})
+            if not ingredients:
+                logger.warning("No se proporcionaron ingredientes para generar la receta.")
+                return "No se proporcionaron ingredientes para generar la receta."
+
+            recipe_context, canonical, cache_key, cached = self._prepare(recipe_context, regenerate)
+            if cached is not None:
+                self.last_from_cache = True
+                return cached
+
+            # Construcción del prompt
+            prompt = self.build_prompt(recipe_context)
 
             logger.debug(f"Prompt para la API: {prompt}")
 
             # Generar contenido usando la API
-            response = self.model.generate_content(prompt)
-            if hasattr(response, 'text'):
-                return response.text
-            else:
-                logger.error("La respuesta de la API no contiene el atributo 'text'.")
-                return None
+            start = time.perf_counter()
+            text = self._call_model(prompt, cache_key)
+            logger.info(f"Receta generada en {time.perf_counter() - start:.2f}s")
+            if self.cache is not None:
+                self.cache.put(cache_key, canonical, text)
+            return text
+
+        except Exception as e:
+            logger.error(f"Error generando receta: {e}")
+            return None
+
+    def generate_recipe_stream(self, recipe_context, regenerate=False):
+        """
+        Genera una receta devolviendo el texto por fragmentos a medida que llega
 
+        Si el consumidor deja de iterar (por ejemplo, porque Streamlit
+        reinicia el script al cambiar una opción) la generación se cancela y
+        la respuesta parcial no se guarda en la caché. Se registra el tiempo
+        hasta el primer fragmento y la latencia total.
+
+        :param recipe_context: Contexto de la receta (ver generate_recipe)
+        :param regenerate: Ignorar la respuesta guardada y generar una nueva
+        :return: Generador de fragmentos de texto
+        """
+        self.last_from_cache = False
+        if not recipe_context.get('ingredients'):
+            logger.warning("No se proporcionaron ingredientes para generar la receta.")
+            yield "No se proporcionaron ingredientes para generar la receta."
+            return
+
+        recipe_context, canonical, cache_key, cached = self._prepare(recipe_context, regenerate)
+        if cached is not None:
+            self.last_from_cache = True
+            yield cached
+            return
+
+        prompt = self.build_prompt(recipe_context)
+        logger.debug(f"Prompt para la API: {prompt}")
+
+        start = time.perf_counter()
+        first_chunk = None
+        chunks = []
+        status = "completa"
+        # El streaming no se comparte entre solicitudes, pero respeta el límite global
+        slot = self.gate.slot() if self.gate is not None else contextlib.nullcontext()
+        try:
+            with slot:
+                for text in self.backend.stream(prompt):
+                    if first_chunk is None:
+                        first_chunk = time.perf_counter() - start
+                    chunks.append(text)
+                    yield text
+        except GeneratorExit:
+            status = "cancelada"
+            raise
         except Exception as e:
+            status = "fallida"
             logger.error(f"Error generando receta: {e}")
-            return None
\ No newline at end of file
+            raise
+        finally:
+            total = time.perf_counter() - start
+            ttft = f"{first_chunk:.2f}s" if first_chunk is not None else "sin texto"
+            logger.info(f"Receta {status}: primer fragmento {ttft}, total {total:.2f}s, {len(chunks)} fragmentos")
+            if status == "completa" and chunks and self.cache is not None:
+                self.cache.put(cache_key, canonical, "".join(chunks))
+
+    async def _generate_async(self, prompt, key, timeout):
+        """
+        Llama al modelo en un hilo sin bloquear el bucle de eventos
+
+        La llamada pasa por _call_model para compartir el single-flight y el
+        límite global con el resto del proceso. El tiempo límite lo aplica el
+        backend dentro del hilo (asyncio.wait_for no puede detener un hilo),
+        así que se espera a que el hilo termine y el lugar del semáforo no
+        se libera mientras la llamada sigue en curso.
+        """
+        return await asyncio.to_thread(self._call_model, prompt, key, timeout)
+
+    async def generate_recipes_async(self, recipe_contexts, max_concurrency=4, timeout=60.0, retries=2):
+        """
+        Genera varias recetas en paralelo con concurrencia acotada
+
+        Las respuestas guardadas en la caché no llaman al modelo. Cada llamada
+        tiene su tiempo límite y se reintenta con espera exponencial si falla.
+
+        :param recipe_contexts: Lista de contextos (ver generate_recipe)
+        :param max_concurrency: Máximo de llamadas simultáneas al modelo
+        :param timeout: Segundos máximos por llamada
+        :param retries: Reintentos por receta tras el primer intento
+        :return: Lista de recetas en el mismo orden (None si falló)
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def generate_one(index, recipe_context):
+            if not recipe_context.get('ingredients'):
+                return None
+            recipe_context, canonical, cache_key, cached = self._prepare(recipe_context, regenerate=False)
+            if cached is not None:
+                return cached
+
+            prompt = self.build_prompt(recipe_context)
+            for attempt in range(retries + 1):
+                start = time.perf_counter()
+                try:
+                    # Un reintento no se suma a la llamada en curso que acaba de fallar
+                    key = cache_key if attempt == 0 else (cache_key, attempt)
+                    async with semaphore:
+                        text = await self._generate_async(prompt, key, timeout)
+                except Exception as e:
+                    reason = "tiempo agotado" if isinstance(e, TimeoutError) else e
+                    logger.warning(f"Receta {index + 1}: intento {attempt + 1} fallido ({reason})")
+                    if attempt < retries:
+                        await asyncio.sleep(0.5 * 2 ** attempt)
+                    continue
+                logger.info(f"Receta {index + 1} generada en {time.perf_counter() - start:.2f}s")
+                if self.cache is not None:
+                    self.cache.put(cache_key, canonical, text)
+                return text
+            logger.error(f"Receta {index + 1}: sin respuesta tras {retries + 1} intentos")
+            return None
+
+        start = time.perf_counter()
+        recipes = await asyncio.gather(*(
+            generate_one(index, recipe_context) for index, recipe_context in enumerate(recipe_contexts)
+        ))
+        logger.info(
+            f"Lote de {len(recipe_contexts)} recetas en {time.perf_counter() - start:.2f}s, "
+            f"{sum(recipe is None for recipe in recipes)} fallidas"
+        )
+        return list(recipes)
+
+    def generate_recipes_batch(self, recipe_contexts, max_concurrency=4, timeout=60.0, retries=2):
+        """
+        Versión síncrona de generate_recipes_async para usar desde Streamlit
+
+        :param recipe_contexts: Lista de contextos (ver generate_recipe)
+        :param max_concurrency: Máximo de llamadas simultáneas al modelo
+        :param timeout: Segundos máximos por llamada
+        :param retries: Reintentos por receta tras el primer intento
+        :return: Lista de recetas en el mismo orden (None si falló)
+        """
+        return asyncio.run(self.generate_recipes_async(recipe_contexts, max_concurrency, timeout, retries))
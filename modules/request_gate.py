@@ -0,0 +1,139 @@
+# modules/request_gate.py
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, Hashable
+
+
+class QueueFullError(RuntimeError):
+    """La cola de solicitudes al modelo está llena o la espera superó el límite"""
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class RequestGate:
+    """
+    Control de solicitudes al modelo compartido por todo el proceso
+
+    - Single-flight: las solicitudes idénticas que llegan mientras otra está
+      en curso esperan su resultado en lugar de hacer otra llamada.
+    - Límite global de llamadas simultáneas; las demás esperan en una cola
+      acotada y se rechazan con QueueFullError si está llena o si la espera
+      supera el tiempo límite.
+    """
+
+    def __init__(self, max_concurrent: int = 4, max_queue: int = 32, queue_timeout: float = 120.0):
+        """
+        :param max_concurrent: Máximo de llamadas simultáneas al modelo
+        :param max_queue: Máximo de solicitudes esperando turno
+        :param queue_timeout: Segundos máximos de espera en la cola
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Hashable, _Call] = {}
+        self._counters = {'calls': 0, 'coalesced': 0, 'rejected': 0, 'queued': 0, 'running': 0}
+
+    @contextmanager
+    def slot(self):
+        """
+        Ocupa un lugar del límite global mientras dura el bloque
+
+        :raises QueueFullError: Si la cola está llena o la espera supera queue_timeout
+        """
+        with self._lock:
+            if self._counters['queued'] >= self.max_queue:
+                self._counters['rejected'] += 1
+                raise QueueFullError("Hay demasiadas solicitudes en espera, intenta en unos segundos")
+            self._counters['queued'] += 1
+        acquired = self._slots.acquire(timeout=self.queue_timeout)
+        with self._lock:
+            self._counters['queued'] -= 1
+            if not acquired:
+                self._counters['rejected'] += 1
+            else:
+                self._counters['running'] += 1
+        if not acquired:
+            raise QueueFullError("Se agotó el tiempo de espera en la cola de solicitudes")
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._counters['running'] -= 1
+            self._slots.release()
+
+    def run(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Ejecuta fn una sola vez por clave entre las solicitudes concurrentes
+
+        :param key: Clave de la solicitud (p. ej. hash de las entradas del prompt)
+        :param fn: Función sin argumentos que llama al modelo
+        :return: Resultado de fn, compartido con las solicitudes idénticas en curso
+        """
+        with self._lock:
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = self._in_flight[key] = _Call()
+            else:
+                call.waiters += 1
+                self._counters['coalesced'] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            with self.slot():
+                with self._lock:
+                    self._counters['calls'] += 1
+                call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            call.done.set()
+        return call.result
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Contadores del proceso
+
+        :return: Diccionario con 'calls', 'coalesced', 'rejected', 'queued', 'running' e 'in_flight'
+        """
+        with self._lock:
+            return {**self._counters, 'in_flight': len(self._in_flight)}
+
+
+# Controles compartidos por nombre; viven mientras viva el proceso
+_GATES: Dict[str, RequestGate] = {}
+_GATES_LOCK = threading.Lock()
+
+
+def shared_gate(name: str = 'default', **options) -> RequestGate:
+    """
+    Devuelve el RequestGate del proceso con ese nombre, creándolo la primera vez
+
+    Streamlit vuelve a ejecutar app.py en cada interacción, pero los módulos
+    importados se conservan, así que el control es el mismo para todas las
+    sesiones y reruns.
+
+    :param name: Nombre del control
+    :param options: Argumentos de RequestGate para la primera creación
+    :return: Instancia compartida
+    """
+    with _GATES_LOCK:
+        if name not in _GATES:
+            _GATES[name] = RequestGate(**options)
+        return _GATES[name]
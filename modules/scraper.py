@@ -15,14 +15,20 @@ import logging
 from zenrows import ZenRowsClient
 from bs4 import BeautifulSoup
 import unicodedata
+# Funciones de URLs sin dependencias de scraping; se reexportan por compatibilidad
+from modules.product_urls import validate_makro_url, extract_url_metadata, bulk_validate_urls, preprocess_product_name
 
 class Scraper:
-    def __init__(self, chrome_options=None, zenrows_api_key=st.secrets["zenrows"]["key"]):
+    def __init__(self, chrome_options=None, zenrows_api_key=None):
         """
         Inicializa el scraper con opciones de Chrome
         
         :param chrome_options: Diccionario de opciones para configurar Chrome
+        :param zenrows_api_key: Clave de ZenRows (por defecto la de st.secrets)
         """
+        # La clave se lee al crear el scraper, no al importar el módulo
+        if zenrows_api_key is None:
+            zenrows_api_key = st.secrets["zenrows"]["key"]
         options = Options()
         
         if chrome_options:
@@ -403,70 +409,3 @@ class Scraper:
         Asegura que el navegador se cierre al destruir la instancia
         """
         self.close()
-
-def validate_makro_url(url):
-    """
-    Valida si la URL es de Makro Plaza Vea
-    
-    :param url: URL a validar
-    :return: Booleano indicando si es válida
-    """
-    return (
-        url.startswith("https://www.makro.plazavea.com.pe/") and 
-        url.endswith("/p")
-    )
-
-def extract_url_metadata(url, name=None):
-    """
-    Extrae metadatos adicionales de una URL de producto
-    
-    :param url: URL del producto
-    :param name: Nombre del producto (opcional)
-    :return: Diccionario con metadatos
-    """
-    metadata = {
-        'url': url
-    }
-
-    # Extraer peso
-    weight_match = re.search(r'(\d+)\s*(?:kg|g)\b', url, re.IGNORECASE)
-    if weight_match:
-        weight = float(weight_match.group(1))
-        metadata['weight_gr'] = weight * 1000 if 'kg' in weight_match.group(0).lower() else weight
-
-    # Extraer tipo de producto
-    meat_keywords = {
-        'pollo': ['pollo', 'pechuga', 'pierna', 'encuentro'],
-        'pavo': ['pavo'],
-        'res': ['res', 'carne', 'bistec', 'lomo'],
-        'cerdo': ['cerdo', 'chuleta']
-    }
-
-    for meat_type, keywords in meat_keywords.items():
-        if any(keyword in url.lower() or (name and keyword in name.lower()) for keyword in keywords):
-            metadata['type'] = meat_type
-            break
-
-    return metadata
-
-def bulk_validate_urls(urls):
-    """
-    Valida múltiples URLs
-    
-    :param urls: Lista de URLs
-    :return: Lista de URLs válidas
-    """
-    return [url for url in urls if validate_makro_url(url)]
-
-def preprocess_product_name(name):
-    """
-    Preprocesa el nombre del producto para búsquedas
-    
-    :param name: Nombre original del producto
-    :return: Nombre preprocesado
-    """
-    # Eliminar marcas comerciales, unidades, etc.
-    name = re.sub(r'\b(Bolsa|Paquete|x\d+|Congelado|Fresco)\b', '', name, flags=re.IGNORECASE)
-    # Eliminar espacios extra
-    name = ' '.join(name.split())
-    return name
\ No newline at end of file
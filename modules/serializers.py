@@ -0,0 +1,148 @@
+# modules/serializers.py
+import json
+from numbers import Number
+from typing import Dict, List, Any
+
+try:
+    import orjson
+except ImportError:  # Se usa el módulo json estándar
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # El formato binario es opcional
+    msgpack = None
+
+
+class SchemaError(ValueError):
+    """Error de validación de un registro de producto"""
+
+
+class JsonSerializer:
+    """
+    Serializador JSON que usa orjson si está instalado y json estándar si no
+    """
+    name = 'json'
+    extension = '.json'
+
+    def dumps(self, data: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(data)
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def loads(self, payload: bytes) -> Any:
+        if orjson is not None:
+            return orjson.loads(payload)
+        return json.loads(payload)
+
+
+class MsgpackSerializer:
+    """
+    Serializador binario compacto basado en msgpack
+    """
+    name = 'msgpack'
+    extension = '.msgpack'
+
+    def __init__(self):
+        if msgpack is None:
+            raise ImportError("Instala msgpack para usar el formato binario")
+
+    def dumps(self, data: Any) -> bytes:
+        return msgpack.packb(data, use_bin_type=True)
+
+    def loads(self, payload: bytes) -> Any:
+        return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+
+
+SERIALIZERS = {
+    'json': JsonSerializer,
+    'msgpack': MsgpackSerializer
+}
+
+
+def get_serializer(data_format: str = 'json'):
+    """
+    Devuelve el serializador para un formato de datos
+
+    :param data_format: 'json' o 'msgpack'
+    :return: Instancia del serializador
+    """
+    try:
+        return SERIALIZERS[data_format]()
+    except KeyError:
+        raise ValueError(f"Formato de datos desconocido: {data_format}")
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, Number) and not isinstance(value, bool)
+
+
+def validate_product(product: Dict[str, Any]) -> List[str]:
+    """
+    Valida la estructura de un registro de food_data
+
+    :param product: Diccionario con información del producto
+    :return: Lista de errores encontrados (vacía si es válido)
+    """
+    if not isinstance(product, dict):
+        return ["El producto no es un diccionario"]
+
+    errors = []
+    for field in ('name', 'url'):
+        if not isinstance(product.get(field), str) or not product.get(field):
+            errors.append(f"'{field}' debe ser un texto no vacío")
+
+    weight = product.get('weight_gr')
+    if not _is_number(weight) or weight <= 0:
+        errors.append("'weight_gr' debe ser un número positivo")
+
+    if product.get('type') is not None and not isinstance(product['type'], str):
+        errors.append("'type' debe ser texto o null")
+
+    price = product.get('price')
+    if not isinstance(price, dict):
+        errors.append("'price' debe ser un diccionario")
+    else:
+        regular_price = price.get('regular_price')
+        if regular_price is not None and (not _is_number(regular_price) or regular_price < 0):
+            errors.append("'price.regular_price' debe ser un número no negativo o null")
+        promotion = price.get('promotion')
+        if promotion is not None:
+            tiers = promotion if isinstance(promotion, list) else [promotion]
+            for tier in tiers:
+                if not isinstance(tier, dict):
+                    errors.append("'price.promotion' debe ser un diccionario, una lista de ellos o null")
+                    continue
+                if not _is_number(tier.get('price')):
+                    errors.append("'price.promotion.price' debe ser un número")
+                units = tier.get('units')
+                if not (_is_number(units) or (isinstance(units, str) and units.isdigit())):
+                    errors.append("'price.promotion.units' debe ser un entero")
+
+    nutrition = product.get('nutrition')
+    if nutrition is not None:
+        if not isinstance(nutrition, dict):
+            errors.append("'nutrition' debe ser un diccionario o null")
+        else:
+            for nutrient, value in nutrition.items():
+                if value is not None and not _is_number(value):
+                    errors.append(f"'nutrition.{nutrient}' debe ser un número")
+
+    return errors
+
+
+def validate_food_data(food_data: Dict[str, Dict[str, Any]]) -> Dict[str, List[str]]:
+    """
+    Valida todos los registros de food_data
+
+    :param food_data: Diccionario de productos por URL
+    :return: Diccionario URL -> errores, solo con los registros inválidos
+    """
+    invalid = {}
+    for url, product in food_data.items():
+        errors = validate_product(product)
+        if isinstance(product, dict) and product.get('url') not in (None, url):
+            errors.append("'url' no coincide con la clave del registro")
+        if errors:
+            invalid[url] = errors
+    return invalid
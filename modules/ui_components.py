@@ -1,15 +1,24 @@
 # modules/ui_components.py
 
 import streamlit as st
-import base64
+import math
 import textwrap
-from streamlit_tailwind import st_tw
 import calendar
 from datetime import datetime
 from utils.constants import MEAT_TYPES
-from modules.config import ASSETS_DIR, LOGOS_DIR
+from modules.config import ASSETS_DIR
+from modules.metrics_index import METRICS
+from modules.assets import asset_registry
+from modules.request_gate import QueueFullError
+from modules.recipe_generator import (
+    build_recipe_context, parse_recipe_ingredients, strip_structured_block, StructuredBlockFilter
+)
+from modules.ingredient_matcher import analyze_recipe
+from utils.calculations import catalog_columns, select_columns, calculate_catalog_costs
+from utils.purchase_planner import promotion_tiers
+from utils.calculation_cache import LRUCache
+import numpy as np
 import os
-import pyperclip
 from st_copy_to_clipboard import st_copy_to_clipboard
 
 def render_sidebar():
@@ -69,45 +78,71 @@ def render_sidebar():
         "days_in_month": days_in_month
     }
 
-# Función para renderizar una tarjeta de producto con Tailwind CSS
-def render_product_card(product, theme):
+def render_macro_balance(container, balance):
     """
-    Renderiza una tarjeta de producto con información detallada utilizando Tailwind CSS.
-    Altura ajustada a 320px con espaciado optimizado.
+    Renderiza el balance de macronutrientes de la selección en un contenedor
+
+    :param container: Contenedor de Streamlit (p. ej. st.sidebar.empty())
+    :param balance: Resultado de MacroBalanceTracker.balance
+    """
+    status_icons = {'low': '🔻', 'balanced': '✅', 'high': '🔺'}
+    labels = {'protein': 'Proteína', 'carbs': 'Carbohidratos', 'fat': 'Grasas'}
+    with container.container():
+        st.markdown("### Balance de la Selección")
+        for macro, label in labels.items():
+            st.markdown(
+                f"{status_icons[balance['status'][macro]]} **{label}:** "
+                f"{balance['current'][macro]:.1f}g ({balance['percentages'][macro]:.0f}%)"
+            )
+        st.caption(f"Calorías: {balance['current']['calories']:.0f} kcal")
+
+# Función para construir el HTML de una tarjeta de producto con Tailwind CSS
+def product_card_html(product, theme, consumption=None, purchase=None, height_class="h-80", style="", image_src=None):
+    """
+    Construye el HTML de una tarjeta de producto con información detallada
 
     :param product: Diccionario con información del producto.
     :param theme: Tema actual de Streamlit ('light' o 'dark').
+    :param consumption: Consumo diario (ver calculate_daily_consumption), opcional
+    :param purchase: Compra mensual óptima (ver calculate_optimal_purchase), opcional
+    :param height_class: Clase de Tailwind para la altura de la tarjeta
+    :param style: Estilos CSS adicionales de la tarjeta
+    :param image_src: Fuente de la imagen (p. ej. miniatura local); por defecto image_url
+    :return: HTML de la tarjeta
     """
-    with open(f"{LOGOS_DIR}/fitia_logo.svg", "r") as f:
-        fitia_logo_light = f.read()
-    with open(f"{LOGOS_DIR}/fitia_logo_blank.svg", "r") as f:
-        fitia_logo_dark = f.read()
-    
-    with open(f"{LOGOS_DIR}/makro_logo.svg", "r") as f:
-        makro_logo_light = f.read()
-    with open(f"{LOGOS_DIR}/makro_logo_blank.svg", "r") as f:
-        makro_logo_dark = f.read()
-    
-    # Convertir a base64
-    fitia_logo_light_b64 = base64.b64encode(fitia_logo_light.encode()).decode()
-    fitia_logo_dark_b64 = base64.b64encode(fitia_logo_dark.encode()).decode()
-    makro_logo_light_b64 = base64.b64encode(makro_logo_light.encode()).decode()
-    makro_logo_dark_b64 = base64.b64encode(makro_logo_dark.encode()).decode()
-    
-    # Usar las versiones base64 en el HTML
-    fitia_logo = f"data:image/svg+xml;base64,{fitia_logo_dark_b64}" if theme == 'dark' else f"data:image/svg+xml;base64,{fitia_logo_light_b64}"
-    makro_logo = f"data:image/svg+xml;base64,{makro_logo_dark_b64}" if theme == 'dark' else f"data:image/svg+xml;base64,{makro_logo_light_b64}"
+    # Logos ya codificados por el registro de archivos: sin lectura de disco por tarjeta
+    fitia_logo = asset_registry.data_uri('fitia_logo', theme)
+    makro_logo = asset_registry.data_uri('makro_logo', theme)
     
     # Configurar colores según el tema
     bg_color = "bg-gray-800" if theme == "dark" else "bg-white"
     text_color = "text-white" if theme == "dark" else "text-gray-800"
+
+    # Consumo diario y compra mensual dentro de la misma tarjeta
+    figures_html = ""
+    if consumption is not None and purchase is not None:
+        figures_html = f"""
+        <div class="grid grid-cols-2 gap-3 mt-3 pt-3 border-t border-gray-300">
+            <div>
+                <h4 class="text-sm font-semibold mb-0.5">Consumo diario</h4>
+                <p class="text-sm">Gramos: {consumption['grams']:.1f} g</p>
+                <p class="text-sm">Unidades: {consumption['units']:.2f}</p>
+            </div>
+            <div>
+                <h4 class="text-sm font-semibold mb-0.5">Compra mensual óptima</h4>
+                <p class="text-sm">Total unidades: {purchase['units']}</p>
+                <p class="text-sm">Costo total: S/ {purchase['total_cost']:.2f}</p>
+                <p class="text-sm">Costo diario: S/ {purchase['daily_cost']:.2f}</p>
+            </div>
+        </div>
+        """
     
     # Construir el contenido HTML de la tarjeta
-    card_html = f"""
-    <div class="flex flex-col {bg_color} {text_color} p-4 rounded-lg shadow-lg h-80">
+    return f"""
+    <div class="flex flex-col {bg_color} {text_color} p-4 rounded-lg shadow-lg {height_class}" style="{style}">
         <!-- Header con imagen y nombre - Aumentado el tamaño y espaciado -->
         <div class="flex items-start space-x-6 mb-6">
-            <img src="{product['image_url']}" alt="{product['name']}" class="w-20 h-20 md:w-24 md:h-24 object-cover rounded-lg flex-shrink-0">
+            <img src="{image_src or product['image_url']}" alt="{product['name']}" class="w-20 h-20 md:w-24 md:h-24 object-cover rounded-lg flex-shrink-0">
             <div class="min-w-0">
                 <h3 class="text-xl md:text-2xl font-bold leading-tight mb-2">{product['name']}</h3>
                 <p class="text-sm md:text-base">Tipo: {product.get('type', 'No especificado')}</p>
@@ -119,8 +154,7 @@ def render_product_card(product, theme):
             <div>
                 <h4 class="text-sm font-semibold mb-0.5">Precio</h4>
                 <p class="text-sm">Regular: S/ {product['price'].get('regular_price', 'N/A')}</p>
-                {"<p class='text-sm'>Oferta: " + product['price']['promotion']['units'] + " x S/ " + str(product['price']['promotion']['price']) + "</p>" 
-                 if product['price'].get('promotion') else ""}
+                {"".join(f"<p class='text-sm'>Oferta: {units} x S/ {price}</p>" for units, price in promotion_tiers(product['price']))}
             </div>
             
             <div>
@@ -152,20 +186,406 @@ def render_product_card(product, theme):
             </div>
             """ +
         "</div>" if product.get('nutrition') else ""}
+    {figures_html}
     </div>
     """
-    
+
+# Función para renderizar una tarjeta de producto con Tailwind CSS
+def render_product_card(product, theme):
+    """
+    Renderiza una tarjeta de producto con información detallada utilizando Tailwind CSS.
+    Altura ajustada a 320px con espaciado optimizado.
+
+    :param product: Diccionario con información del producto.
+    :param theme: Tema actual de Streamlit ('light' o 'dark').
+    """
+    # Se importa aquí para no cargar el componente al arrancar
+    from streamlit_tailwind import st_tw
+
     # Renderizar la tarjeta utilizando streamlit_tailwind
     st_tw(
-        text=card_html,
+        text=product_card_html(product, theme),
         height="320"
     )
 
-def render_add_product_form(data_manager):
+def render_product_grid(cards, theme, page_size=12, columns=2, card_height=460, visible_rows=2, image_cache=None):
+    """
+    Renderiza las tarjetas de los productos seleccionados en un solo componente
+
+    Todas las tarjetas de la página van en un único iframe de st_tw, con
+    scroll interno y content-visibility para que el navegador no dibuje las
+    que no están a la vista; con más de page_size productos se pagina, así
+    que el costo no crece con la selección.
+
+    :param cards: Lista de {'product', 'consumption', 'purchase'}
+    :param theme: Tema actual de Streamlit ('light' o 'dark')
+    :param page_size: Tarjetas por página
+    :param columns: Columnas de la grilla
+    :param card_height: Altura de cada tarjeta en píxeles
+    :param visible_rows: Filas visibles antes de hacer scroll dentro del componente
+    :param image_cache: ImageCache con las miniaturas locales; sin ella se usan las imágenes remotas
+    """
+    if not cards:
+        return
+    from streamlit_tailwind import st_tw
+
+    pages = math.ceil(len(cards) / page_size)
+    page = 1
+    if pages > 1:
+        # El valor inicial va en session_state (no en value=) para poder corregirlo:
+        # la página guardada puede quedar fuera de rango al quitar productos
+        if 'product_grid_page' not in st.session_state:
+            st.session_state.product_grid_page = 1
+        elif st.session_state.product_grid_page > pages:
+            st.session_state.product_grid_page = pages
+        page = st.number_input(
+            f"Página (de {pages})", min_value=1, max_value=pages, step=1, key='product_grid_page'
+        )
+    page_cards = cards[(page - 1) * page_size: page * page_size]
+
+    # El navegador omite el dibujo de las tarjetas fuera de la vista
+    style = f"height: {card_height}px; content-visibility: auto; contain-intrinsic-size: auto {card_height}px;"
+    cards_html = "".join(
+        product_card_html(
+            card['product'], theme, card['consumption'], card['purchase'], height_class="", style=style,
+            image_src=image_cache.data_uri(card['product']['image_url']) if image_cache is not None else None
+        )
+        for card in page_cards
+    )
+
+    gap = 16
+    rows = math.ceil(len(page_cards) / columns)
+    viewport = min(rows, visible_rows) * (card_height + gap)
+    st_tw(
+        text=f"""
+        <div style="height: {viewport}px; overflow-y: auto;">
+            <div class="grid gap-4 p-1" style="grid-template-columns: repeat({columns}, minmax(0, 1fr));">
+                {cards_html}
+            </div>
+        </div>
+        """,
+        height=viewport + 8,
+        key='product_grid'
+    )
+
+def render_top_products(data_manager, product_types, user_prefs):
+    """
+    Renderiza el ranking de productos según una métrica derivada
+    o según el costo mensual de cubrir la meta de proteína
+
+    :param data_manager: Instancia de DataManager
+    :param product_types: Tipos de producto disponibles ('Todos' incluido)
+    :param user_prefs: Preferencias del usuario
+    """
+    metric_labels = {'monthly_cost': "Costo mensual para tu meta de proteína (S/)"}
+    metric_labels.update({name: label for name, (label, _) in METRICS.items()})
+
+    col1, col2, col3 = st.columns([2, 2, 1])
+    with col1:
+        metric = st.selectbox(
+            "Métrica",
+            list(metric_labels.keys()),
+            format_func=lambda x: metric_labels[x]
+        )
+    with col2:
+        product_type = st.selectbox("Tipo", product_types, key="top_products_type")
+    with col3:
+        n = st.number_input("Cantidad", min_value=1, max_value=50, value=10)
+
+    if metric == 'monthly_cost':
+        render_cost_ranking(data_manager, product_type, int(n), user_prefs)
+        return
+
+    top_products = data_manager.top_products(
+        metric, n=int(n), product_type=None if product_type == 'Todos' else product_type
+    )
+    if not top_products:
+        st.info("No hay productos con datos suficientes para esta métrica")
+        return
+
+    st.dataframe({
+        'Producto': [product['name'] for product in top_products],
+        'Tipo': [product.get('type') for product in top_products],
+        METRICS[metric][0]: [round(product['metrics'][metric], 2) for product in top_products],
+        'Precio por 100 g (S/)': [product['metrics']['price_per_100g'] for product in top_products]
+    })
+
+def render_cost_ranking(data_manager, product_type, n, user_prefs):
+    """
+    Ordena todo el catálogo por el costo mensual de cubrir la meta diaria
+    de proteína con un solo producto, en un único cálculo vectorizado
+
+    :param data_manager: Instancia de DataManager
+    :param product_type: Tipo de producto ('Todos' para no filtrar)
+    :param n: Número de productos a mostrar
+    :param user_prefs: Preferencias del usuario
+    """
+    columns = data_manager.catalog_view().columns
+    if product_type != 'Todos':
+        columns = select_columns(columns, columns['type'] == product_type)
+
+    costs = calculate_catalog_costs(user_prefs['daily_protein'], columns, days=user_prefs['days_in_month'])
+    valid = np.flatnonzero(np.isfinite(costs['monthly_cost']))
+    if not len(valid):
+        st.info("No hay productos con datos suficientes para calcular el costo")
+        return
+    order = valid[np.argsort(costs['monthly_cost'][valid], kind='stable')[:n]]
+
+    catalog = data_manager.catalog_view().products
+    st.dataframe({
+        'Producto': [catalog[url]['name'] for url in columns['url'][order]],
+        'Tipo': list(columns['type'][order]),
+        'Gramos diarios': np.round(costs['grams'][order], 1),
+        'Unidades al mes': costs['total_units'][order],
+        'Costo mensual (S/)': np.round(costs['monthly_cost'][order], 2),
+        'Costo diario (S/)': np.round(costs['daily_cost'][order], 2)
+    })
+
+def render_pareto_frontier(data_manager, product_types):
+    """
+    Muestra los productos que ningún otro supera a la vez en precio por
+    gramo de proteína y en grasa
+
+    :param data_manager: Gestor de datos
+    :param product_types: Tipos de producto disponibles (incluye 'Todos')
+    """
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        selected_type = st.selectbox("Tipo de producto", product_types, key="pareto_type")
+    with col2:
+        only_frontier = st.checkbox("Ocultar dominados", value=True, key="pareto_only_frontier")
+    product_type = None if selected_type == 'Todos' else selected_type
+
+    index = data_manager.get_pareto_index()
+    catalog = data_manager.catalog_view().products
+    frontier = index.frontier(product_type)
+    if not frontier:
+        st.info("No hay productos con precio, proteína y grasa para este tipo")
+        return
+    frontier_urls = {url for url, _, _ in frontier}
+    rows = frontier if only_frontier else index.points(product_type)
+
+    st.dataframe({
+        'Producto': [catalog[url]['name'] for url, _, _ in rows],
+        'Precio por g de proteína (S/)': [round(x, 4) for _, x, _ in rows],
+        'Grasa (100g)': [y for _, _, y in rows],
+        'Frontera': ['⭐' if url in frontier_urls else '' for url, _, _ in rows]
+    })
+
+    try:
+        import plotly.graph_objects as go
+
+        fig = go.Figure()
+        if not only_frontier:
+            dominated = [row for row in rows if row[0] not in frontier_urls]
+            fig.add_trace(go.Scatter(
+                x=[x for _, x, _ in dominated], y=[y for _, _, y in dominated],
+                mode='markers', name='Dominados', marker={'color': 'lightgray'},
+                text=[catalog[url]['name'] for url, _, _ in dominated]
+            ))
+        fig.add_trace(go.Scatter(
+            x=[x for _, x, _ in frontier], y=[y for _, _, y in frontier],
+            mode='lines+markers', name='Frontera de Pareto', line={'shape': 'hv'},
+            text=[catalog[url]['name'] for url, _, _ in frontier]
+        ))
+        fig.update_layout(
+            xaxis_title='Precio por gramo de proteína (S/)',
+            yaxis_title='Grasa por 100 g (g)'
+        )
+        st.plotly_chart(fig)
+    except ImportError:
+        st.warning("Instala Plotly para visualizaciones más detalladas")
+
+def render_diet_optimizer(data_manager, product_types, user_prefs, time_limit=5.0):
+    """
+    Renderiza el optimizador que elige productos y cantidades del catálogo
+    para cubrir las metas diarias al menor costo mensual
+
+    :param data_manager: Instancia de DataManager
+    :param product_types: Tipos de producto disponibles ('Todos' incluido)
+    :param user_prefs: Preferencias del usuario
+    :param time_limit: Segundos máximos del optimizador
+    """
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        allowed_types = st.multiselect("Tipos permitidos", product_types[1:], key="optimizer_types")
+    with col2:
+        max_grams = st.number_input("Máximo de gramos diarios por producto", min_value=50, max_value=2000, value=500, step=50)
+    with col3:
+        tolerance = st.slider("Tolerancia de las metas (%)", min_value=1, max_value=50, value=10)
+
+    targets = st.multiselect(
+        "Metas a cumplir",
+        ['protein', 'carbs', 'fat'],
+        default=['protein', 'carbs', 'fat'],
+        format_func=lambda x: {'protein': 'Proteínas', 'carbs': 'Carbohidratos', 'fat': 'Grasas'}[x]
+    )
+    soft_goals = st.checkbox("Permitir desviaciones si no hay solución exacta (penalizadas)", value=True)
+
+    if not st.button("Optimizar compra"):
+        return
+
+    columns = data_manager.catalog_view().columns
+    if allowed_types:
+        columns = select_columns(columns, np.isin(columns['type'], allowed_types))
+
+    goals = {macro: user_prefs[f'daily_{macro}'] if macro in targets else None for macro in ['protein', 'carbs', 'fat']}
+    try:
+        from utils.optimizer import optimize_diet
+    except ImportError:
+        st.warning("Instala SciPy para usar el optimizador")
+        return
+
+    with st.spinner("Buscando la combinación más barata..."):
+        result = optimize_diet(
+            columns,
+            goals,
+            days=user_prefs['days_in_month'],
+            tolerances={macro: tolerance / 100 for macro in goals},
+            max_grams_per_product=max_grams,
+            deviation_penalty=1.0 if soft_goals else None,
+            time_limit=time_limit
+        )
+
+    if result['status'] == 'infeasible':
+        st.error(f"No se encontró una combinación que cumpla las metas: {result['message']}")
+        return
+
+    if result['status'] == 'feasible':
+        st.caption("Mejor combinación encontrada en el tiempo disponible; podría haber una algo más barata.")
+
+    catalog = data_manager.catalog_view().products
+    st.markdown(f"""
+        **Costo mensual:** S/ {result['total_cost']:.2f} — **Costo diario:** S/ {result['daily_cost']:.2f}
+    """)
+    st.dataframe({
+        'Producto': [catalog[item['url']]['name'] for item in result['items']],
+        'Gramos diarios': [round(item['grams_daily'], 1) for item in result['items']],
+        'Unidades al mes': [item['units'] for item in result['items']],
+        'Lotes en promoción': [item['promo_sets'] for item in result['items']],
+        'Costo mensual (S/)': [round(item['total_cost'], 2) for item in result['items']]
+    })
+
+    macros = result['daily_macros']
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Proteínas", f"{macros['protein']:.1f} g", f"{macros['protein'] - user_prefs['daily_protein']:.1f} g")
+    col2.metric("Carbohidratos", f"{macros['carbs']:.1f} g", f"{macros['carbs'] - user_prefs['daily_carbs']:.1f} g")
+    col3.metric("Grasas", f"{macros['fat']:.1f} g", f"{macros['fat'] - user_prefs['daily_fat']:.1f} g")
+
+def render_meal_plan(meal_planner, user_prefs):
+    """
+    Renderiza el plan diario del mes por comida
+
+    :param meal_planner: MealPlanner sincronizado con la selección
+    :param user_prefs: Preferencias del usuario
+    """
+    day = st.selectbox(
+        "Día del mes",
+        range(meal_planner.days),
+        format_func=lambda x: f"{x + 1} de {user_prefs['month']}",
+        key="meal_plan_day"
+    )
+    portions = meal_planner.day_plan(day)
+    if not portions:
+        st.info("No hay porciones planificadas para este día.")
+        return
+
+    st.dataframe({
+        'Comida': [portion['meal'] for portion in portions],
+        'Producto': [portion['name'] for portion in portions],
+        'Gramos': [round(portion['grams'], 1) for portion in portions],
+        'Abrir paquetes': [portion['open_packages'] for portion in portions]
+    })
+
+    summary = meal_planner.summary()
+    unopened = {url: info for url, info in summary.items() if info['packages_unopened']}
+    if unopened:
+        st.caption("Paquetes que quedan cerrados para el próximo mes: " + ", ".join(
+            f"{meal_planner.name(url)} ({info['packages_unopened']})" for url, info in unopened.items()
+        ))
+    if meal_planner.last_affected:
+        st.caption(f"Días recalculados en este cambio: {len(meal_planner.last_affected)}")
+
+def render_sensitivity_sweep(selected_products, user_prefs):
+    """
+    Barrido de escenarios de peso corporal y factor de proteína para los
+    productos seleccionados, calculado en una sola pasada vectorizada
+
+    Los rangos se editan dentro de un formulario, así que la página solo se
+    vuelve a ejecutar al presionar "Calcular".
+
+    :param selected_products: Diccionario de productos seleccionados
+    :param user_prefs: Preferencias del usuario
+    """
+    from utils.sensitivity import sweep_scenarios
+
+    metrics = {
+        'monthly_cost': "Costo mensual (S/)",
+        'carbs_pct': "Carbohidratos cubiertos (% de la meta)",
+        'fat_pct': "Grasas cubiertas (% de la meta)"
+    }
+    with st.form("sensitivity_sweep"):
+        weight_range = st.slider("Rango de peso (kg)", 40.0, 200.0, (
+            max(40.0, user_prefs['weight'] - 15), min(200.0, user_prefs['weight'] + 15)
+        ), step=0.5)
+        protein_range = st.slider("Rango de proteína por kg", 1.6, 4.0, (1.6, 3.2), step=0.1)
+        steps = st.slider("Puntos por eje", 10, 100, 50, step=5)
+        metric = st.radio("Mostrar", list(metrics), format_func=lambda x: metrics[x], horizontal=True)
+        submitted = st.form_submit_button("Calcular")
+
+    if submitted:
+        nutrition_products = {url: product for url, product in selected_products.items() if product.get('nutrition')}
+        weights = np.linspace(*weight_range, steps)
+        protein_factors = np.linspace(*protein_range, steps)
+        result = sweep_scenarios(
+            catalog_columns(nutrition_products),
+            weights,
+            protein_factors,
+            user_prefs['carbs_factor'],
+            user_prefs['fats_factor'],
+            days=user_prefs['days_in_month']
+        )
+        st.session_state.sensitivity_result = {
+            'weights': weights,
+            'protein_factors': protein_factors,
+            'metric': metric,
+            'values': result[metric][:, :, 0, 0]
+        }
+
+    sweep = st.session_state.get('sensitivity_result')
+    if sweep is None:
+        st.caption("Define los rangos y presiona Calcular para ver el mapa de calor.")
+        return
+
+    try:
+        import plotly.graph_objects as go
+
+        fig = go.Figure(go.Heatmap(
+            x=sweep['weights'],
+            y=sweep['protein_factors'],
+            z=sweep['values'].T,
+            colorbar={'title': metrics[sweep['metric']]}
+        ))
+        fig.add_trace(go.Scatter(
+            x=[user_prefs['weight']], y=[user_prefs['protein_factor']],
+            mode='markers', name='Configuración actual', marker={'color': 'white', 'size': 10, 'symbol': 'x'}
+        ))
+        fig.update_layout(
+            title=f"{metrics[sweep['metric']]} ({sweep['values'].size:,} escenarios)",
+            xaxis_title='Peso (kg)',
+            yaxis_title='Proteína por kg (g)'
+        )
+        st.plotly_chart(fig)
+    except ImportError:
+        st.warning("Instala Plotly para visualizaciones más detalladas")
+
+def render_add_product_form(data_manager, fetch_product=None):
     """
     Renderiza un formulario para agregar nuevos productos
     
     :param data_manager: Instancia de DataManager
+    :param fetch_product: Función que obtiene la información de un producto a partir
+        de sus datos de URL (p. ej. Scraper.get_product_info); sin ella solo se guarda la URL
     :return: Booleano indicando si se agregó un producto
     """
     st.header("Agregar Nuevo Producto")
@@ -191,11 +611,28 @@ def render_add_product_form(data_manager):
                 'type': meat_type if meat_type else None
             }
             try:
-                if data_manager.add_product_url(url_data):
+                if not data_manager.add_product_url(url_data):
+                    st.warning("No se pudo agregar el producto. Verifica la URL.")
+                    return False
+                if fetch_product is None:
                     st.success(f"Producto agregado exitosamente: {url}")
                     return True
+
+                with st.spinner("Obteniendo información del producto..."):
+                    product_info = fetch_product(url_data)
+                if not product_info:
+                    st.warning("Se guardó la URL, pero no se pudo obtener la información del producto.")
+                    return False
+                rejected = {}
+                if data_manager.update_product_data({url: product_info}, rejected=rejected):
+                    st.success(f"Producto agregado exitosamente: {url}")
+                    return True
+                if rejected:
+                    st.error("La información del producto no es válida y no se guardó:")
+                    for error in rejected[url]:
+                        st.markdown(f"- {error}")
                 else:
-                    st.warning("No se pudo agregar el producto. Verifica la URL.")
+                    st.error("No se pudo guardar la información del producto.")
             except Exception as e:
                 st.error(f"Error al agregar producto: {e}")
         else:
@@ -203,13 +640,55 @@ def render_add_product_form(data_manager):
     
     return False
 
-def render_recipe_generator(recipe_generator, selected_products, user_prefs):
+def render_recipe_analysis(recipe_text, recipe_context, ingredient_matcher):
+    """
+    Muestra los macronutrientes de la receta calculados con el catálogo
+
+    :param recipe_text: Texto de la receta con el bloque de ingredientes
+    :param recipe_context: Contexto con las metas diarias
+    :param ingredient_matcher: IngredientMatcher del catálogo
+    """
+    ingredients = parse_recipe_ingredients(recipe_text)
+    if not ingredients:
+        st.caption("La receta no incluye la lista de ingredientes para calcular sus macronutrientes.")
+        return
+
+    analysis = analyze_recipe(ingredients, ingredient_matcher, recipe_context)
+    st.markdown("#### Macronutrientes de la receta")
+    labels = {'protein': "Proteína", 'carbs': "Carbohidratos", 'fat': "Grasas", 'calories': "Calorías"}
+    columns = st.columns(len(labels))
+    for column, (key, label) in zip(columns, labels.items()):
+        unit = "kcal" if key == 'calories' else "g"
+        percentage = analysis['percentages'][key]
+        column.metric(
+            label,
+            f"{analysis['totals'][key]:.0f} {unit}",
+            f"{percentage:.0f}% de la meta diaria" if percentage is not None else None,
+            delta_color="off"
+        )
+
+    rows = analysis['rows']
+    if rows:
+        st.dataframe({
+            'Ingrediente': [row['ingredient'] for row in rows],
+            'Gramos': [round(row['grams']) for row in rows],
+            'Producto': [row['product'] for row in rows],
+            'Proteína (g)': [round(row['protein'], 1) for row in rows],
+            'Carbohidratos (g)': [round(row['carbs'], 1) for row in rows],
+            'Grasas (g)': [round(row['fat'], 1) for row in rows],
+            'Calorías': [round(row['calories']) for row in rows]
+        })
+    if analysis['unmatched']:
+        st.caption(f"Sin datos en el catálogo (no se suman): {', '.join(analysis['unmatched'])}")
+
+def render_recipe_generator(recipe_generator, selected_products, user_prefs, ingredient_matcher=None):
     """
     Renderiza la interfaz de generación de recetas
     
     :param recipe_generator: Instancia de RecipeGenerator
     :param selected_products: Productos seleccionados
     :param user_prefs: Preferencias del usuario
+    :param ingredient_matcher: IngredientMatcher para calcular los macronutrientes de la receta
     """
     st.markdown("""
     <style>
@@ -228,26 +707,6 @@ def render_recipe_generator(recipe_generator, selected_products, user_prefs):
         st.warning("Selecciona al menos un producto para generar una receta")
         return
     
-    # Preparar ingredientes
-    ingredients = {}
-    total_protein = 0
-    
-    for product_url, product in selected_products.items():
-        if not product.get('nutrition'):
-            st.warning(f"El producto {product['name']} no tiene información nutricional")
-            continue
-        
-        # Calcular consumo diario
-        daily_protein_needed = user_prefs['daily_protein'] / len(selected_products)
-        grams_to_consume = (daily_protein_needed * 100) / product['nutrition']['protein']
-        
-        ingredients[product['name']] = grams_to_consume
-        total_protein += daily_protein_needed
-    
-    # Verificar balance de macronutrientes
-    if total_protein > user_prefs['daily_protein']:
-        st.warning(f"Atención: El consumo de proteína ({total_protein:.1f}g) supera lo recomendado ({user_prefs['daily_protein']:.1f}g)")
-    
     # Opciones adicionales de la receta
     col1, col2 = st.columns(2)
     
@@ -281,43 +740,207 @@ def render_recipe_generator(recipe_generator, selected_products, user_prefs):
         ]
     )
     
+    # Preparar contexto de la receta
+    recipe_context, skipped = build_recipe_context(
+        selected_products, user_prefs, meal_type, cuisine_type, dietary_restrictions
+    )
+    for name in skipped:
+        st.warning(f"El producto {name} no tiene información nutricional")
+
+    # La última receta se conserva entre reruns para poder regenerarla
+    last_recipe = st.session_state.get('last_recipe')
+    if last_recipe is not None and last_recipe['context'] != recipe_context:
+        last_recipe = st.session_state.last_recipe = None
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        generate = st.button("Generar Receta")
+    with col2:
+        # Ignora la respuesta guardada para estas mismas entradas
+        regenerate = last_recipe is not None and st.button("🔄 Regenerar")
+    with col3:
+        # Cualquier interacción reinicia el script y corta la generación en curso
+        st.button("⏹ Detener")
+
     # Botón para generar receta
-    if st.button("Generar Receta"):
-        spinner_message = f"Generando la receta {cuisine_type.lower()} de {meal_type.lower()}..."
-        with st.spinner(spinner_message):
-            # Preparar contexto de la receta
-            recipe_context = {
-                "ingredients": ingredients,
-                "meal_type": meal_type,
-                "cuisine_type": cuisine_type,
-                "dietary_restrictions": dietary_restrictions,
-                "daily_protein_goal": user_prefs['daily_protein'],
-                "daily_carbs_goal": user_prefs['daily_carbs'],
-                "daily_fat_goal": user_prefs['daily_fat']
-            }
-            
-            # Generar receta
-            try:
-                recipe = recipe_generator.generate_recipe(recipe_context)
-                
-                if recipe:
-                    # Mostrar receta
-                    st.markdown("### Receta Generada")
-                    st.markdown(recipe)
-                    
-                    # Analizar macronutrientes de la receta
-                    # TODO: Implementar análisis de macronutrientes de la receta generada
-                else:
-                    st.error("No se pudo generar la receta. Intenta de nuevo.")
-            
-            except Exception as e:
-                st.error(f"Error al generar la receta: {e}")
+    if generate or regenerate:
+        st.markdown("### Receta Generada")
+        try:
+            # El texto se muestra a medida que llega, sin el bloque de ingredientes
+            stream = StructuredBlockFilter(recipe_generator.generate_recipe_stream(recipe_context, regenerate=regenerate))
+            st.write_stream(stream)
+            recipe = stream.text
+
+            if recipe:
+                last_recipe = st.session_state.last_recipe = {
+                    'context': recipe_context,
+                    'recipe': recipe,
+                    'from_cache': recipe_generator.last_from_cache
+                }
+                if last_recipe['from_cache']:
+                    st.caption("Receta guardada para estos ingredientes y opciones.")
+            else:
+                st.error("No se pudo generar la receta. Intenta de nuevo.")
+
+        except QueueFullError as e:
+            st.warning(f"El generador de recetas está ocupado. {e}.")
+        except Exception as e:
+            st.error(f"Error al generar la receta: {e}")
+
+    elif last_recipe is not None:
+        # Mostrar receta
+        st.markdown("### Receta Generada")
+        if last_recipe['from_cache']:
+            st.caption("Receta guardada para estos ingredientes y opciones.")
+        st.markdown(strip_structured_block(last_recipe['recipe']))
+
+    # Analizar macronutrientes de la receta con los datos del catálogo
+    if last_recipe is not None and ingredient_matcher is not None:
+        render_recipe_analysis(last_recipe['recipe'], recipe_context, ingredient_matcher)
+
+    if recipe_generator.cache is not None:
+        cache_stats = recipe_generator.cache.stats()
+        st.caption(
+            f"Caché de recetas: {cache_stats['hits']} aciertos, {cache_stats['misses']} fallos "
+            f"({cache_stats['hit_rate']:.0%}), {cache_stats['bypasses']} regeneradas, "
+            f"{cache_stats['entries']} guardadas"
+        )
+    if recipe_generator.gate is not None:
+        gate_stats = recipe_generator.gate.stats()
+        st.caption(
+            f"Llamadas al modelo: {gate_stats['calls']} realizadas, {gate_stats['coalesced']} compartidas, "
+            f"{gate_stats['running']} en curso, {gate_stats['queued']} en cola, {gate_stats['rejected']} rechazadas"
+        )
+
+def render_weekly_recipes(recipe_generator, meal_planner, user_prefs, batch_options=None):
+    """
+    Genera en paralelo una receta por día para una semana del plan mensual
+
+    :param recipe_generator: Instancia de RecipeGenerator
+    :param meal_planner: MealPlanner sincronizado con la selección
+    :param user_prefs: Preferencias del usuario
+    :param batch_options: Opciones de generate_recipes_batch (max_concurrency, timeout, retries)
+    """
+    col1, col2 = st.columns(2)
+    with col1:
+        start_day = st.number_input("Desde el día", min_value=1, max_value=meal_planner.days, value=1, key="weekly_start")
+    with col2:
+        cuisine_type = st.selectbox("Cocina", ["Peruana", "Internacional", "Saludable", "Fitness"], key="weekly_cuisine")
+    days = list(range(start_day - 1, min(start_day + 6, meal_planner.days)))
+
+    contexts = []
+    for day in days:
+        ingredients = {}
+        for portion in meal_planner.day_plan(day):
+            ingredients[portion['name']] = ingredients.get(portion['name'], 0) + portion['grams']
+        contexts.append({
+            "ingredients": ingredients,
+            "meal_type": "Todas las comidas del día",
+            "cuisine_type": cuisine_type,
+            "dietary_restrictions": []
+        })
+
+    if st.button(f"Generar recetas de {len(days)} días"):
+        with st.spinner(f"Generando {len(days)} recetas en paralelo..."):
+            recipes = recipe_generator.generate_recipes_batch(contexts, **(batch_options or {}))
+        st.session_state.weekly_recipes = {'contexts': contexts, 'days': days, 'recipes': recipes}
+
+    weekly = st.session_state.get('weekly_recipes')
+    if weekly is None or weekly['contexts'] != contexts:
+        return
+
+    failed = sum(recipe is None for recipe in weekly['recipes'])
+    if failed:
+        st.warning(f"{failed} recetas no se pudieron generar. Intenta de nuevo.")
+    tabs = st.tabs([f"Día {day + 1}" for day in weekly['days']])
+    for tab, recipe in zip(tabs, weekly['recipes']):
+        with tab:
+            if recipe:
+                st.markdown(strip_structured_block(recipe))
+            else:
+                st.info("Sin receta para este día.")
+
+# Figuras de comparación por (versión del catálogo, selección, vista), compartidas entre sesiones
+comparison_figures = LRUCache(maxsize=64)
+
+COMPARISON_VIEWS = ["Barras", "Mapa de calor", "Dispersión"]
+COMPARISON_NUTRIENTS = [
+    ('protein', 'Proteínas (100g)'),
+    ('carbs', 'Carbohidratos (100g)'),
+    ('fat', 'Grasas (100g)'),
+    ('calories', 'Calorías (100g)')
+]
 
-def render_nutrition_comparison(selected_products):
+def comparison_figure(table, view):
+    """
+    Construye la figura de comparación nutricional directamente de las columnas
+
+    :param table: Resultado de CatalogView.nutrition_table
+    :param view: Vista de COMPARISON_VIEWS
+    :return: Figura de Plotly
+    """
+    import plotly.graph_objects as go
+
+    names = table['name']
+    if view == "Barras":
+        # Barras agrupadas: legibles con pocos productos
+        fig = go.Figure([
+            go.Bar(name=label, x=names, y=table[key]) for key, label in COMPARISON_NUTRIENTS
+        ])
+        fig.update_layout(barmode='group', title='Comparación Nutricional de Productos')
+    elif view == "Mapa de calor":
+        # Una fila por producto; el color se normaliza por nutriente para que
+        # las calorías no opaquen al resto, el texto muestra el valor real
+        values = np.column_stack([table[key] for key, _ in COMPARISON_NUTRIENTS])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            scale = np.nanmax(values, axis=0)
+            normalized = values / np.where(scale > 0, scale, 1)
+        fig = go.Figure(go.Heatmap(
+            z=normalized,
+            x=[label for _, label in COMPARISON_NUTRIENTS],
+            y=names,
+            customdata=values,
+            hovertemplate='%{y}<br>%{x}: %{customdata:.1f}<extra></extra>',
+            colorscale='Viridis',
+            showscale=False
+        ))
+        fig.update_layout(
+            title='Comparación Nutricional de Productos',
+            height=max(400, 22 * len(names) + 120),
+            yaxis={'autorange': 'reversed'}
+        )
+    else:
+        # Dispersión con WebGL: se mantiene fluida con cientos de productos
+        fig = go.Figure(go.Scattergl(
+            x=table['calories'],
+            y=table['protein'],
+            mode='markers',
+            text=names,
+            customdata=np.column_stack([table['carbs'], table['fat']]),
+            marker={'size': 9, 'color': table['fat'], 'colorscale': 'Viridis', 'colorbar': {'title': 'Grasas'}},
+            hovertemplate=(
+                '%{text}<br>Calorías: %{x:.0f}<br>Proteínas: %{y:.1f} g'
+                '<br>Carbohidratos: %{customdata[0]:.1f} g<br>Grasas: %{customdata[1]:.1f} g<extra></extra>'
+            )
+        ))
+        fig.update_layout(
+            title='Proteínas frente a calorías (por 100 g)',
+            xaxis_title='Calorías (100g)',
+            yaxis_title='Proteínas (100g)'
+        )
+    return fig
+
+def render_nutrition_comparison(catalog, selected_urls, bar_limit=12):
     """
     Renderiza una comparación nutricional de los productos seleccionados
-    
-    :param selected_products: Diccionario de productos seleccionados
+
+    La tabla se recorta de las columnas del catálogo y la figura se memoriza
+    por selección, así que un rerun sin cambios no la reconstruye. Con más
+    de bar_limit productos se propone el mapa de calor en lugar de las barras.
+
+    :param catalog: Vista del catálogo (ver DataManager.catalog_view)
+    :param selected_urls: URLs de los productos seleccionados
+    :param bar_limit: Máximo de productos para proponer el gráfico de barras
     """
     st.markdown("""
     <style>
@@ -332,51 +955,33 @@ def render_nutrition_comparison(selected_products):
     unsafe_allow_html=True
     )
 
-    if not selected_products:
+    if not selected_urls:
         st.warning("Selecciona productos para comparar")
         return
-    
-    # Preparar datos para la comparación
-    comparison_data = {
-        'Producto': [],
-        'Proteínas (100g)': [],
-        'Carbohidratos (100g)': [],
-        'Grasas (100g)': [],
-        'Calorías (100g)': []
-    }
-    
-    for product in selected_products.values():
-        if product.get('nutrition'):
-            nutrition = product['nutrition']
-            comparison_data['Producto'].append(product['name'])
-            comparison_data['Proteínas (100g)'].append(nutrition.get('protein', 0))
-            comparison_data['Carbohidratos (100g)'].append(nutrition.get('carbs', 0))
-            comparison_data['Grasas (100g)'].append(nutrition.get('fat', 0))
-            comparison_data['Calorías (100g)'].append(nutrition.get('calories', 0))
-    
-    # Mostrar tabla de comparación
 
+    table = catalog.nutrition_table(selected_urls)
+    if not table['url']:
+        st.warning("Los productos seleccionados no tienen información nutricional")
+        return
+
+    # Mostrar tabla de comparación
     col1, col2, col3 = st.columns([1,5,1])
     with col2:
+        comparison_data = {'Producto': table['name']}
+        comparison_data.update({label: table[key] for key, label in COMPARISON_NUTRIENTS})
         st.dataframe(comparison_data)
 
-    # Gráfico de barras comparativo
+    view = st.radio(
+        "Vista",
+        COMPARISON_VIEWS,
+        index=0 if len(table['url']) <= bar_limit else 1,
+        horizontal=True,
+        key='nutrition_comparison_view'
+    )
+
     try:
-        import plotly.express as px
-        import pandas as pd
-        
-        df = pd.DataFrame(comparison_data)
-        
-        # Gráfico de barras agrupadas
-        fig = px.bar(
-            df.melt(id_vars=['Producto'], var_name='Nutriente', value_name='Valor'), 
-            x='Producto', 
-            y='Valor', 
-            color='Nutriente',
-            barmode='group',
-            title='Comparación Nutricional de Productos'
-        )
-        
+        key = (catalog.version, tuple(table['url']), view)
+        fig = comparison_figures.get_or_compute(key, lambda: comparison_figure(table, view))
         st.plotly_chart(fig)
     except ImportError:
         st.warning("Instala Plotly para visualizaciones más detalladas")
@@ -406,11 +1011,11 @@ def donation_footer(ASSETS_DIR):
             st.subheader("Donar por Yape")
             col1, col2 = st.columns([1, 1])
             with col1:
-                yape_image_path = os.path.join(ASSETS_DIR, "yape.png")
-                if os.path.exists(yape_image_path):
-                    st.image(yape_image_path, width=300)
+                yape_image = asset_registry.get('yape')
+                if yape_image is not None:
+                    st.image(yape_image.data, width=300)
                 else:
-                    st.error(f"No se encontró la imagen en: {yape_image_path}")
+                    st.error(f"No se encontró la imagen en: {os.path.join(ASSETS_DIR, 'yape.png')}")
             with col2:
                 # Agregamos el número de Yape con botón para copiar
                 st_copy_to_clipboard("964536063", "Copiar número de Yape")
@@ -492,11 +1097,11 @@ def donation_footer(ASSETS_DIR):
             col1, col2 = st.columns([1, 1])
             
             with col1:
-                binance_image_path = os.path.join(ASSETS_DIR, "binance.png")
-                if os.path.exists(binance_image_path):
-                    st.image(binance_image_path, width=300)
+                binance_image = asset_registry.get('binance')
+                if binance_image is not None:
+                    st.image(binance_image.data, width=300)
                 else:
-                    st.error(f"No se encontró la imagen en: {binance_image_path}")
+                    st.error(f"No se encontró la imagen en: {os.path.join(ASSETS_DIR, 'binance.png')}")
             
             with col2:
                 st.link_button("Donar con Binance", "https://app.binance.com/qr/dplkbb7f88c5329c4692adf278670d1b37ab")
\ No newline at end of file
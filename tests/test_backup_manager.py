@@ -0,0 +1,82 @@
+# tests/test_backup_manager.py
+"""
+Ida y vuelta de los backups incrementales: crear, modificar, restaurar y podar
+"""
+import time
+from datetime import datetime
+import pytest
+from benchmarks.synthetic import make_catalog
+from modules.backup_manager import BackupManager, CHECKPOINT_INTERVAL
+from modules.data_manager import DataManager
+
+SNAPSHOT_FORMAT = "%Y%m%dT%H%M%S%f"
+
+
+@pytest.fixture
+def data_manager(tmp_path):
+    manager = DataManager(str(tmp_path))
+    manager.update_product_data(make_catalog(30, seed=1))
+    return manager
+
+
+def changed_product(product, price):
+    return {**product, 'price': {**product['price'], 'regular_price': price}}
+
+
+def test_incremental_snapshot_only_lists_changes(data_manager):
+    first = data_manager.backup_data()
+    url, product = next(iter(data_manager.load_food_data().items()))
+    data_manager.update_product_data({url: changed_product(product, 123.45)})
+    second = data_manager.backup_data()
+
+    snapshots = {snapshot['id']: snapshot for snapshot in data_manager.backup_manager.list_snapshots()}
+    assert snapshots[first]['changed'] == 30
+    assert snapshots[second]['changed'] == 1
+    assert snapshots[second]['parent'] == first
+    # El estado heredado del padre coincide con el de un recorrido completo
+    records, _ = data_manager.backup_manager._resolve(second)
+    assert records == BackupManager(data_manager.data_dir)._resolve(second)[0]
+    assert set(records) == set(data_manager.load_food_data())
+
+
+def test_round_trip_restore_at_and_prune(data_manager):
+    original = data_manager.load_food_data()
+    first = data_manager.backup_data()
+    time.sleep(0.001)
+
+    url = next(iter(original))
+    data_manager.update_product_data({url: changed_product(original[url], 99.0)})
+    second = data_manager.backup_data()
+    assert data_manager.load_food_data()[url]['price']['regular_price'] == 99.0
+
+    # Restaurar al instante del primer snapshot
+    restored = data_manager.restore_backup(at=datetime.strptime(first, SNAPSHOT_FORMAT))
+    assert restored == first
+    assert data_manager.load_food_data() == original
+
+    # La restauración guardó el estado previo: se puede deshacer
+    assert data_manager.restore_backup(second) == second
+    assert data_manager.load_food_data()[url]['price']['regular_price'] == 99.0
+
+    # Conservar solo el último snapshot (el estado previo a la última restauración, igual
+    # al original): se vuelve checkpoint y los objetos huérfanos se borran
+    manager = data_manager.backup_manager
+    latest = manager.list_snapshots()[-1]['id']
+    assert manager.prune(keep_last=1) >= 1
+    snapshots = manager.list_snapshots()
+    assert [snapshot['id'] for snapshot in snapshots] == [latest]
+    assert snapshots[0]['base'] and snapshots[0]['parent'] is None
+    data_manager.update_product_data({url: changed_product(original[url], 1.0)})
+    assert data_manager.restore_backup(latest) == latest
+    assert data_manager.load_food_data() == original
+
+
+def test_checkpoint_after_interval(data_manager):
+    url, product = next(iter(data_manager.load_food_data().items()))
+    data_manager.backup_data()
+    for step in range(CHECKPOINT_INTERVAL):
+        data_manager.update_product_data({url: changed_product(product, 10.0 + step)})
+        data_manager.backup_data()
+    snapshots = data_manager.backup_manager.list_snapshots()
+    assert [snapshot['base'] for snapshot in snapshots].count(True) == 2
+    assert snapshots[-1]['base'] and snapshots[-1]['changed'] == 30
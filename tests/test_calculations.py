@@ -0,0 +1,107 @@
+# tests/test_calculations.py
+"""
+Propiedades de utils.calculations con casos aleatorios reproducibles
+
+Cada semilla genera un caso distinto; un fallo indica la semilla para
+repetirlo. Ejecutar con: python -m pytest tests
+"""
+import math
+import random
+import numpy as np
+import pytest
+from benchmarks.synthetic import make_catalog
+from utils.calculations import (
+    calculate_daily_consumption,
+    calculate_optimal_purchase,
+    calculate_macronutrient_balance,
+    calculate_catalog_costs,
+    catalog_columns
+)
+from utils.macro_balance import MacroBalanceTracker
+
+GOALS = {'daily_protein': 200.0, 'daily_carbs': 500.0, 'daily_fat': 90.0}
+PROTEIN_NEEDED = 60.0
+SEEDS = range(200)
+
+
+def random_tiers(rng, regular_price):
+    """
+    Promoción de uno o varios niveles alrededor del precio regular
+
+    :param rng: Generador aleatorio
+    :param regular_price: Precio regular por unidad
+    :return: Diccionario (un nivel) o lista de niveles
+    """
+    tiers = []
+    for _ in range(rng.choice([1, 1, 2, 3])):
+        tiers.append({'units': rng.choice([2, 3, 4, 6, 12]), 'price': round(regular_price * rng.uniform(0.6, 1.05), 2)})
+    return tiers if len(tiers) > 1 else tiers[0]
+
+
+def random_purchase(seed):
+    rng = random.Random(seed)
+    units_daily = rng.uniform(0.01, 5.0)
+    regular_price = round(rng.uniform(0.5, 80.0), 2)
+    days = rng.choice([28, 30, 31])
+    return units_daily, regular_price, random_tiers(rng, regular_price), days
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_promotion_never_increases_cost(seed):
+    units_daily, regular_price, promotions, days = random_purchase(seed)
+    plain = calculate_optimal_purchase(units_daily, regular_price, days=days)
+    promo = calculate_optimal_purchase(units_daily, regular_price, days=days, promotions=promotions)
+    assert promo['total_cost'] <= plain['total_cost'] + 1e-9
+    assert promo['savings_percentage'] >= 0
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_units_cover_monthly_need(seed):
+    units_daily, regular_price, promotions, days = random_purchase(seed)
+    needed = math.ceil(units_daily * days)
+    assert calculate_optimal_purchase(units_daily, regular_price, days=days)['units'] >= needed
+    assert calculate_optimal_purchase(units_daily, regular_price, days=days, promotions=promotions)['units'] >= needed
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_batch_matches_scalar(seed):
+    rng = random.Random(seed)
+    products = make_catalog(100, seed=seed)
+    for product in products.values():
+        if rng.random() < 0.3:
+            product['price']['promotion'] = random_tiers(rng, product['price']['regular_price'])
+    columns = catalog_columns(products)
+    batch = calculate_catalog_costs(PROTEIN_NEEDED, columns, days=30)
+
+    for row, url in enumerate(columns['url']):
+        product = products[url]
+        consumption = calculate_daily_consumption(PROTEIN_NEEDED, product['nutrition']['protein'], product['weight_gr'])
+        purchase = calculate_optimal_purchase(
+            consumption['units'], product['price']['regular_price'], days=30,
+            promotions=product['price']['promotion']
+        )
+        assert purchase['units'] == batch['total_units'][row], url
+        assert np.isclose(purchase['total_cost'], batch['monthly_cost'][row]), url
+        assert np.isclose(consumption['grams'], batch['grams'][row]), url
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_incremental_balance_matches_recomputed(seed):
+    rng = random.Random(seed)
+    products = make_catalog(50, seed=seed)
+    urls = list(products)
+    tracker = MacroBalanceTracker()
+    grams = {}
+    for _ in range(300):
+        url = rng.choice(urls)
+        if rng.random() < 0.3:
+            tracker.remove(url)
+            grams.pop(url, None)
+        else:
+            grams[url] = rng.uniform(10, 500)
+            tracker.set(url, products[url]['nutrition'], grams[url])
+
+    expected = calculate_macronutrient_balance({url: products[url] for url in grams}, GOALS, grams)
+    incremental = tracker.balance(GOALS)
+    for macro, value in expected['current'].items():
+        assert math.isclose(value, incremental['current'][macro], rel_tol=1e-9, abs_tol=1e-6), macro
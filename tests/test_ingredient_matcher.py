@@ -0,0 +1,77 @@
+# tests/test_ingredient_matcher.py
+"""
+Casos de IngredientMatcher con nombres reales del catálogo
+"""
+import pytest
+from modules.ingredient_matcher import IngredientMatcher, analyze_recipe, tokens
+
+NAMES = [
+    'Guiso Aguja TERNEZ Pro Vacuno x Kg',
+    'Paleta TERNEZ Pro Vacuno x Kg',
+    'Mantequilla con Sal SIGMA x Kg',
+    'Mantequilla sin Sal SIGMA x Kg',
+    'Leche con Avena VIGOR Bolsa 800ml',
+    'Bebida de Avena NATURES HEART Caja 946ml Paquete 2un',
+    'Leche sin Lactosa LAIVE UHT Tetrapack 946ml',
+    'Leche Light VIGOR Bolsa 800ml',
+    'Pollo Pechuga Especial Bolsa x Kg',
+    'Filete de Pechuga de Pollo Congelado COPACOL Bolsa 800g',
+    'Porciones de Atún UNI Bolsa 1Kg',
+    'Yogurt Griego Natural VAKIMU Bolsa 4Kg',
+    'Yogurt Natural GLORIA Botella 1Kg',
+    'Huevo Jumbo ARO Paquete 60un'
+]
+CATALOG = {
+    f"https://www.makro.plazavea.com.pe/producto-{index}/p": {
+        'name': name,
+        'nutrition': {'protein': 20.0, 'carbs': 5.0, 'fat': 10.0, 'calories': 190.0}
+    }
+    for index, name in enumerate(NAMES)
+}
+
+
+@pytest.fixture(scope='module')
+def matcher():
+    return IngredientMatcher(CATALOG)
+
+
+def matched_name(matcher, ingredient):
+    found = matcher.match(ingredient)
+    return matcher.product(found[0])[0] if found else None
+
+
+@pytest.mark.parametrize('ingredient', ['Agua', 'Palta', 'Sal', 'Avena'])
+def test_no_false_matches(matcher, ingredient):
+    # Antes: agua -> Guiso Aguja, palta -> Paleta, sal -> Mantequilla, avena -> Leche con Avena
+    assert matched_name(matcher, ingredient) is None
+
+
+@pytest.mark.parametrize('ingredient, expected', [
+    ('Pechuga de pollo', 'Pollo Pechuga Especial Bolsa x Kg'),
+    ('Mantequilla sin sal', 'Mantequilla sin Sal SIGMA x Kg'),
+    ('Leche sin lactosa', 'Leche sin Lactosa LAIVE UHT Tetrapack 946ml'),
+    ('Leche con avena', 'Leche con Avena VIGOR Bolsa 800ml'),
+    ('Atún', 'Porciones de Atún UNI Bolsa 1Kg'),
+    ('Yogurt griego', 'Yogurt Griego Natural VAKIMU Bolsa 4Kg'),
+    ('Huevos', 'Huevo Jumbo ARO Paquete 60un'),
+    ('Mantequila sin sal', 'Mantequilla sin Sal SIGMA x Kg')
+])
+def test_matches(matcher, ingredient, expected):
+    assert matched_name(matcher, ingredient) == expected
+
+
+def test_negation_is_kept():
+    assert tokens('Leche sin Lactosa') == ['leche', 'sin lactosa']
+
+
+def test_ambiguous_query_is_unmatched():
+    # Dos productos distintos cubren la consulta con palabras distintas
+    matcher = IngredientMatcher(CATALOG)
+    assert matcher.match('Leche de pollo') is None
+
+
+def test_unmatched_water_adds_nothing(matcher):
+    analysis = analyze_recipe([{'name': 'Agua', 'grams': 500}], matcher, {'daily_protein_goal': 150})
+    assert analysis['unmatched'] == ['Agua']
+    assert analysis['totals']['protein'] == 0
+    assert analysis['totals']['calories'] == 0
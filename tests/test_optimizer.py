@@ -0,0 +1,54 @@
+# tests/test_optimizer.py
+"""
+Estado y tiempo de utils.optimizer.optimize_diet
+"""
+import time
+import pytest
+import utils.optimizer as optimizer
+from benchmarks.synthetic import make_catalog
+from utils.calculations import catalog_columns
+
+GOALS = {'protein': 120.0, 'carbs': 250.0, 'fat': 60.0}
+
+
+@pytest.fixture(scope='module')
+def columns():
+    return catalog_columns(make_catalog(1000, seed=0))
+
+
+def test_optimal_when_extension_finishes(columns, monkeypatch):
+    monkeypatch.setattr(optimizer, 'INITIAL_CANDIDATES', 4)
+    expected = optimizer.optimize_diet(columns, GOALS, time_limit=60.0)
+    assert expected['status'] == 'optimal'
+    monkeypatch.undo()
+    result = optimizer.optimize_diet(columns, GOALS)
+    assert result['status'] == 'optimal'
+    assert result['total_cost'] == pytest.approx(expected['total_cost'], rel=1e-3)
+
+
+def test_feasible_when_extension_times_out(columns, monkeypatch):
+    solve = optimizer._solve_milp
+    calls = []
+
+    def time_limited(model, time_limit):
+        calls.append(len(model[0]))
+        if len(calls) == 1:
+            return solve(model, time_limit)
+        # La ampliación se queda sin tiempo sin mejorar la solución inicial
+        return solve(model, 1e-9)
+
+    # Con pocos candidatos iniciales la primera solución deja productos por revisar
+    monkeypatch.setattr(optimizer, 'INITIAL_CANDIDATES', 4)
+    monkeypatch.setattr(optimizer, '_solve_milp', time_limited)
+    result = optimizer.optimize_diet(columns, GOALS)
+    assert len(calls) == 2, "el catálogo debe necesitar la ampliación"
+    assert result['status'] == 'feasible'
+    assert result['items']
+
+
+def test_time_limit_bounds_the_whole_search(columns):
+    start = time.perf_counter()
+    result = optimizer.optimize_diet(columns, GOALS, time_limit=0.2)
+    # Margen para la relajación lineal y la construcción de los modelos
+    assert time.perf_counter() - start < 1.0
+    assert result['status'] in ('optimal', 'feasible')
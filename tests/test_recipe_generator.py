@@ -0,0 +1,53 @@
+# tests/test_recipe_generator.py
+"""
+Filtro del bloque de ingredientes durante el streaming de recetas
+"""
+import random
+import pytest
+from modules.recipe_generator import StructuredBlockFilter, parse_recipe_ingredients, strip_structured_block
+
+RECIPE = (
+    "## Lomo saltado\n\nSaltear el pollo con ```cebolla``` y tomate.\n\n"
+    "```json\n[{\"ingrediente\": \"Pollo\", \"gramos\": 250}]\n```\n"
+)
+
+
+def split_randomly(text, seed):
+    rng = random.Random(seed)
+    chunks, start = [], 0
+    while start < len(text):
+        size = rng.randint(1, 12)
+        chunks.append(text[start:start + size])
+        start += size
+    return chunks
+
+
+@pytest.mark.parametrize('seed', range(50))
+def test_block_hidden_regardless_of_chunking(seed):
+    stream = StructuredBlockFilter(iter(split_randomly(RECIPE, seed)))
+    shown = "".join(stream)
+    # Los saltos de línea previos a la marca pueden haberse mostrado ya
+    assert shown.rstrip() == strip_structured_block(RECIPE)
+    assert stream.text == RECIPE
+    assert parse_recipe_ingredients(stream.text) == [{'name': 'Pollo', 'grams': 250.0}]
+
+
+def test_text_without_block_is_shown_whole():
+    text = "Receta sin bloque terminada en ``"
+    assert "".join(StructuredBlockFilter(iter(split_randomly(text, 0)))) == text
+
+
+def test_stopping_closes_wrapped_generator():
+    closed = []
+
+    def chunks():
+        try:
+            yield "Primero"
+            yield "Segundo"
+        finally:
+            closed.append(True)
+
+    stream = iter(StructuredBlockFilter(chunks()))
+    next(stream)
+    stream.close()
+    assert closed == [True]
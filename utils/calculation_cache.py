@@ -0,0 +1,140 @@
+# utils/calculation_cache.py
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Hashable, Tuple
+from utils.calculations import calculate_daily_consumption, calculate_optimal_purchase
+
+
+class LRUCache:
+    """
+    Caché en memoria con desalojo LRU, segura entre hilos
+
+    Streamlit atiende cada sesión en un hilo del mismo proceso, así que una
+    instancia a nivel de módulo se comparte entre todas las sesiones.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        """
+        :param maxsize: Número máximo de entradas
+        """
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Devuelve el valor de la clave, calculándolo y guardándolo si no está
+
+        El valor se comparte entre llamadas, así que no debe modificarse.
+
+        :param key: Clave hashable
+        :param compute: Función sin argumentos que calcula el valor
+        :return: Valor en caché o recién calculado
+        """
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+
+        # El cálculo se hace fuera del candado; si dos hilos calculan lo mismo, gana el último
+        value = compute()
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def clear(self):
+        """
+        Vacía la caché y reinicia los contadores
+        """
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Devuelve los contadores de la caché
+
+        :return: Diccionario con 'hits', 'misses', 'size', 'maxsize' y 'hit_rate'
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hit_rate': self.hits / total if total else 0.0
+            }
+
+
+def content_version(product: Dict[str, Any]) -> str:
+    """
+    Huella de los campos de un producto que usan los cálculos de consumo y compra
+
+    Cambia cuando cambian el peso, la proteína o los precios, así que una
+    actualización del producto invalida sus entradas sin tocar la caché.
+
+    :param product: Diccionario con información del producto
+    :return: Hash hexadecimal corto
+    """
+    price = product.get('price') or {}
+    relevant = [
+        product.get('weight_gr'),
+        (product.get('nutrition') or {}).get('protein'),
+        price.get('regular_price'),
+        price.get('promotion')
+    ]
+    encoded = json.dumps(relevant, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.blake2b(encoded, digest_size=8).hexdigest()
+
+
+# Caché compartida por todas las sesiones del proceso
+product_calculations_cache = LRUCache()
+
+
+def cached_product_calculations(
+    url: str,
+    product: Dict[str, Any],
+    protein_needed: float,
+    days: int
+) -> Tuple[Dict[str, float], Dict[str, Any]]:
+    """
+    Consumo diario y compra óptima de un producto, memorizados entre reruns
+
+    La clave es (url, versión del contenido, proteína necesaria, días del
+    mes): solo los campos de user_prefs que afectan a estos cálculos.
+
+    :param url: URL del producto
+    :param product: Diccionario con información del producto
+    :param protein_needed: Proteína diaria asignada al producto
+    :param days: Días del mes
+    :return: Tupla (consumo, compra) con el formato de utils.calculations
+    """
+    key = (url, content_version(product), round(float(protein_needed), 6), int(days))
+
+    def compute():
+        price = product.get('price') or {}
+        consumption = calculate_daily_consumption(
+            protein_needed=protein_needed,
+            protein_per_100g=product['nutrition']['protein'],
+            weight_gr=product['weight_gr']
+        )
+        purchase = calculate_optimal_purchase(
+            units_daily=consumption['units'],
+            regular_price=price.get('regular_price'),
+            days=days,
+            promotions=price.get('promotion')
+        )
+        return consumption, purchase
+
+    return product_calculations_cache.get_or_compute(key, compute)
@@ -1,5 +1,8 @@
 import math
-from typing import Dict, Any
+import numpy as np
+from typing import Dict, List, Any, Union
+from utils.purchase_planner import promotion_tiers, plan_purchase, plan_purchases, tier_arrays
+from utils.macro_balance import MacroBalanceTracker
 
 def calculate_daily_consumption(protein_needed: float, protein_per_100g: float, weight_gr: int) -> Dict[str, float]:
     """
@@ -28,24 +31,36 @@ def calculate_optimal_purchase(
     regular_price: float, 
     promo_price: float = None, 
     promo_units: int = None, 
-    days: int = 30
+    days: int = 30,
+    promotions: Union[Dict[str, Any], List[Dict[str, Any]]] = None
 ) -> Dict[str, Any]:
     """
     Calcula la compra óptima considerando precios regulares y promocionales
+
+    Busca la combinación entera más barata de lotes promocionales y unidades
+    sueltas que cubre las unidades del mes, incluyendo comprar un lote extra
+    cuando sale más barato que las unidades sueltas restantes.
     
     :param units_daily: Unidades consumidas diariamente
     :param regular_price: Precio regular por unidad
     :param promo_price: Precio promocional
     :param promo_units: Número de unidades en promoción
     :param days: Días del mes
+    :param promotions: Alternativa a promo_price/promo_units: ``price.promotion``
+        del producto, un diccionario o una lista de niveles {'units', 'price'}
     :return: Diccionario con información de compra óptima
     """
     # Calcular unidades totales para el mes
     total_units_needed = units_daily * days
     total_units_rounded = math.ceil(total_units_needed)
+
+    if promotions is not None:
+        tiers = promotion_tiers({'promotion': promotions})
+    else:
+        tiers = promotion_tiers({'promotion': {'units': promo_units, 'price': promo_price}}) if promo_price and promo_units else []
     
     # Si no hay promoción, calcular compra normal
-    if not promo_price or not promo_units:
+    if not tiers:
         return {
             'units': total_units_rounded,
             'total_cost': total_units_rounded * regular_price,
@@ -53,25 +68,29 @@ def calculate_optimal_purchase(
             'strategy': 'regular'
         }
     
-    # Calcular estrategia con promoción
-    promo_sets = total_units_needed // promo_units
-    remaining_units = total_units_needed % promo_units
-    
-    # Calcular costo total
-    promo_cost = promo_sets * (promo_price * promo_units)
-    regular_cost = math.ceil(remaining_units) * regular_price
-    total_cost = promo_cost + regular_cost
+    # Calcular la combinación exacta de lotes y unidades sueltas
+    plan = plan_purchase(total_units_rounded, regular_price, tiers)
+    total_cost = plan['total_cost']
+    promo_sets = sum(plan['promo_sets'])
+
+    if not promo_sets:
+        strategy = 'regular'
+    elif plan['single_units']:
+        strategy = 'mixed'
+    else:
+        strategy = 'promo'
     
     return {
-        'units': total_units_rounded,
+        'units': plan['units'],
         'promo_sets': promo_sets,
-        'promo_units': promo_units,
-        'remaining_units': math.ceil(remaining_units),
+        'promo_sets_by_tier': plan['promo_sets'],
+        'promo_units': tiers[0][0] if len(tiers) == 1 else [units for units, _ in tiers],
+        'remaining_units': plan['single_units'],
         'total_cost': total_cost,
         'daily_cost': total_cost / days,
-        'strategy': 'mixed',
+        'strategy': strategy,
         'savings_percentage': calculate_savings_percentage(
-            total_units_rounded * regular_price, 
+            total_units_rounded * regular_price if regular_price else 0.0,
             total_cost
         )
     }
@@ -94,50 +113,236 @@ def calculate_savings_percentage(original_price: float, discounted_price: float)
 
 def calculate_macronutrient_balance(
     selected_products: Dict[str, Dict[str, Any]], 
-    daily_goals: Dict[str, float]
+    daily_goals: Dict[str, float],
+    grams_daily: Dict[str, float] = None
 ) -> Dict[str, Any]:
     """
     Calcula el balance de macronutrientes de los productos seleccionados
     
+    Para actualizarlo en cada cambio de la selección conviene usar
+    directamente MacroBalanceTracker.
+    
     :param selected_products: Diccionario de productos seleccionados
     :param daily_goals: Objetivos diarios de macronutrientes
+    :param grams_daily: Gramos consumidos al día por URL (por defecto el peso del paquete)
     :return: Diccionario con balance de macronutrientes
     """
-    total_macros = {
-        'protein': 0.0,
-        'carbs': 0.0,
-        'fat': 0.0,
-        'calories': 0.0
-    }
-    
-    for product in selected_products.values():
-        nutrition = product.get('nutrition', {})
-        weight_factor = product.get('weight_gr', 1000) / 100
-        
-        total_macros['protein'] += (nutrition.get('protein', 0) * weight_factor)
-        total_macros['carbs'] += (nutrition.get('carbs', 0) * weight_factor)
-        total_macros['fat'] += (nutrition.get('fat', 0) * weight_factor)
-        total_macros['calories'] += (nutrition.get('calories', 0) * weight_factor)
-    
-    # Calcular porcentajes
-    balance = {
-        'current': total_macros,
-        'goals': daily_goals,
-        'percentages': {
-            'protein': (total_macros['protein'] / daily_goals['daily_protein']) * 100,
-            'carbs': (total_macros['carbs'] / daily_goals['daily_carbs']) * 100,
-            'fat': (total_macros['fat'] / daily_goals['daily_fat']) * 100
-        },
-        'status': {}
+    tracker = MacroBalanceTracker()
+    for url, product in selected_products.items():
+        grams = (grams_daily or {}).get(url, product.get('weight_gr', 1000))
+        tracker.set(url, product.get('nutrition') or {}, grams)
+    return tracker.balance(daily_goals)
+
+# Resultados vectorizados: un registro por producto
+CONSUMPTION_DTYPE = np.dtype([
+    ('grams', 'f8'),
+    ('units', 'f8')
+])
+
+PURCHASE_DTYPE = np.dtype([
+    ('units', 'i8'),
+    ('promo_sets', 'i8'),
+    ('remaining_units', 'i8'),
+    ('total_cost', 'f8'),
+    ('daily_cost', 'f8'),
+    ('savings_percentage', 'f8'),
+    ('has_promo', '?')
+])
+
+CATALOG_COST_DTYPE = np.dtype([
+    ('grams', 'f8'),
+    ('units', 'f8'),
+    ('total_units', 'i8'),
+    ('monthly_cost', 'f8'),
+    ('daily_cost', 'f8')
+])
+
+
+def catalog_columns(products: Dict[str, Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """
+    Convierte el catálogo en columnas NumPy para los cálculos vectorizados
+
+    Acepta un diccionario de productos o un CatalogSnapshot, en cuyo caso las
+    columnas numéricas se leen directamente del archivo mapeado.
+
+    :param products: Diccionario o Mapping de productos por URL
+    :return: Diccionario de columnas (NaN para valores faltantes)
+    """
+    if hasattr(products, 'column'):
+        def column(field):
+            return np.frombuffer(products.column(field), dtype=np.float64)
+
+        promo_units = column('promo_units')
+        promo_price = column('promo_price')
+        tier_units, tier_prices = promo_units[:, None], promo_price[:, None]
+        if any(encoded is not None for encoded in products.strings('promotion_tiers')):
+            tier_units, tier_prices = tier_arrays([
+                [tuple(tier) for tier in products.promotion_tiers(row)] for row in range(len(products))
+            ])
+
+        return {
+            'url': np.array(products.strings('url'), dtype=object),
+            'type': np.array(products.strings('type'), dtype=object),
+            'protein_per_100g': column('protein'),
+            'carbs_per_100g': column('carbs'),
+            'fat_per_100g': column('fat'),
+            'calories_per_100g': column('calories'),
+            'weight_gr': column('weight_gr'),
+            'regular_price': column('regular_price'),
+            'promo_price': promo_price,
+            'promo_units': promo_units,
+            'tier_units': tier_units,
+            'tier_prices': tier_prices
+        }
+
+    def value(x):
+        return np.nan if x is None else float(x)
+
+    urls = list(products)
+    nutrition = [products[url].get('nutrition') or {} for url in urls]
+    prices = [products[url].get('price') or {} for url in urls]
+    tiers = [promotion_tiers(price) for price in prices]
+    tier_units, tier_prices = tier_arrays(tiers)
+
+    return {
+        'url': np.array(urls, dtype=object),
+        'type': np.array([products[url].get('type') for url in urls], dtype=object),
+        'protein_per_100g': np.array([value(n.get('protein')) for n in nutrition]),
+        'carbs_per_100g': np.array([value(n.get('carbs')) for n in nutrition]),
+        'fat_per_100g': np.array([value(n.get('fat')) for n in nutrition]),
+        'calories_per_100g': np.array([value(n.get('calories')) for n in nutrition]),
+        'weight_gr': np.array([value(products[url].get('weight_gr')) for url in urls]),
+        'regular_price': np.array([value(price.get('regular_price')) for price in prices]),
+        'promo_price': np.array([product_tiers[0][1] if product_tiers else np.nan for product_tiers in tiers]),
+        'promo_units': np.array([product_tiers[0][0] if product_tiers else np.nan for product_tiers in tiers]),
+        'tier_units': tier_units,
+        'tier_prices': tier_prices
     }
-    
-    # Evaluar estado de cada macronutriente
-    for macro in ['protein', 'carbs', 'fat']:
-        if balance['percentages'][macro] < 80:
-            balance['status'][macro] = 'low'
-        elif balance['percentages'][macro] > 120:
-            balance['status'][macro] = 'high'
+
+
+def calculate_daily_consumption_batch(
+    protein_needed: Union[float, np.ndarray],
+    protein_per_100g: np.ndarray,
+    weight_gr: np.ndarray
+) -> np.ndarray:
+    """
+    Versión vectorizada de calculate_daily_consumption
+
+    :param protein_needed: Proteína diaria necesaria (escalar o un valor por producto)
+    :param protein_per_100g: Proteína por 100g de cada producto
+    :param weight_gr: Peso de cada producto en gramos
+    :return: Arreglo estructurado con 'grams' y 'units'
+    """
+    protein_per_100g = np.asarray(protein_per_100g, dtype=np.float64)
+    result = np.empty(protein_per_100g.shape, dtype=CONSUMPTION_DTYPE)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result['grams'] = (np.asarray(protein_needed, dtype=np.float64) * 100) / protein_per_100g
+        result['units'] = result['grams'] / np.asarray(weight_gr, dtype=np.float64)
+    return result
+
+
+def calculate_optimal_purchase_batch(
+    units_daily: np.ndarray,
+    regular_price: np.ndarray,
+    promo_price: np.ndarray = None,
+    promo_units: np.ndarray = None,
+    days: int = 30,
+    tier_units: np.ndarray = None,
+    tier_prices: np.ndarray = None
+) -> np.ndarray:
+    """
+    Versión vectorizada de calculate_optimal_purchase
+
+    Produce los mismos números que la versión escalar para cada producto.
+    Los productos sin promoción deben tener NaN (o 0) en promo_price/promo_units.
+
+    :param units_daily: Unidades consumidas diariamente por producto
+    :param regular_price: Precio regular por unidad
+    :param promo_price: Precio promocional por unidad
+    :param promo_units: Número de unidades en promoción
+    :param days: Días del mes
+    :param tier_units: Alternativa a promo_units con varios niveles, forma (productos, niveles)
+    :param tier_prices: Alternativa a promo_price con varios niveles, forma (productos, niveles)
+    :return: Arreglo estructurado con unidades y costos por producto
+    """
+    units_daily = np.asarray(units_daily, dtype=np.float64)
+    regular_price = np.asarray(regular_price, dtype=np.float64)
+    if tier_units is None or tier_prices is None:
+        if promo_price is None or promo_units is None:
+            tier_units = tier_prices = np.full(units_daily.shape + (0,), np.nan)
         else:
-            balance['status'][macro] = 'balanced'
-    
-    return balance
\ No newline at end of file
+            tier_units = np.asarray(promo_units, dtype=np.float64)[:, None]
+            tier_prices = np.asarray(promo_price, dtype=np.float64)[:, None]
+
+    with np.errstate(invalid='ignore'):
+        total_units_rounded = np.ceil(units_daily * days)
+    finite_units = np.isfinite(total_units_rounded)
+    total_units_rounded = np.where(finite_units, total_units_rounded, 0)
+
+    has_promo = (np.nan_to_num(tier_units) > 0) & (np.nan_to_num(tier_prices) > 0)
+    has_promo = has_promo.any(axis=1) if has_promo.ndim > 1 else has_promo
+    plan = plan_purchases(total_units_rounded.astype(np.int64), regular_price, tier_units, tier_prices)
+
+    with np.errstate(invalid='ignore'):
+        regular_cost = total_units_rounded * regular_price
+        total_cost = np.where(has_promo, plan['total_cost'], regular_cost)
+        total_cost = np.where(finite_units, total_cost, np.nan)
+        reference_cost = np.nan_to_num(regular_cost)
+        savings = np.where(reference_cost > 0, (reference_cost - total_cost) / reference_cost * 100, 0.0)
+
+    result = np.zeros(units_daily.shape, dtype=PURCHASE_DTYPE)
+    result['units'] = np.where(has_promo, plan['units'], total_units_rounded)
+    result['promo_sets'] = plan['promo_sets'].sum(axis=-1)
+    result['remaining_units'] = np.where(has_promo, plan['single_units'], 0)
+    result['total_cost'] = total_cost
+    result['daily_cost'] = total_cost / days
+    result['savings_percentage'] = np.where(has_promo, np.round(savings, 2), 0.0)
+    result['has_promo'] = has_promo
+    return result
+
+
+def calculate_catalog_costs(
+    protein_needed: Union[float, np.ndarray],
+    columns: Dict[str, np.ndarray],
+    days: int = 30
+) -> np.ndarray:
+    """
+    Calcula consumo y costo mensual de todo el catálogo en una sola pasada
+
+    Útil para ordenar todos los productos por el costo mensual de cubrir
+    el objetivo de proteína.
+
+    :param protein_needed: Proteína diaria a cubrir con cada producto
+    :param columns: Columnas generadas por catalog_columns (o una selección)
+    :param days: Días del mes
+    :return: Arreglo estructurado con gramos, unidades y costos por producto
+    """
+    consumption = calculate_daily_consumption_batch(
+        protein_needed, columns['protein_per_100g'], columns['weight_gr']
+    )
+    purchase = calculate_optimal_purchase_batch(
+        consumption['units'],
+        columns['regular_price'],
+        days=days,
+        tier_units=columns['tier_units'],
+        tier_prices=columns['tier_prices']
+    )
+
+    result = np.empty(consumption.shape, dtype=CATALOG_COST_DTYPE)
+    result['grams'] = consumption['grams']
+    result['units'] = consumption['units']
+    result['total_units'] = purchase['units']
+    result['monthly_cost'] = purchase['total_cost']
+    result['daily_cost'] = purchase['daily_cost']
+    return result
+
+
+def select_columns(columns: Dict[str, np.ndarray], selection: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Filtra las columnas del catálogo con una máscara o lista de índices
+
+    :param columns: Columnas generadas por catalog_columns
+    :param selection: Máscara booleana o índices de los productos
+    :return: Columnas con solo los productos seleccionados
+    """
+    return {name: column[selection] for name, column in columns.items()}
@@ -10,3 +10,10 @@ MEAT_TYPES = [
     'mariscos',
     'otro'
 ]
+
+# Comidas del día en las que se reparte el plan mensual
+MEALS = [
+    'Desayuno',
+    'Almuerzo',
+    'Cena'
+]
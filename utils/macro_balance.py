@@ -0,0 +1,105 @@
+# utils/macro_balance.py
+from typing import Dict, Any, Optional
+
+MACROS = ('protein', 'carbs', 'fat', 'calories')
+
+# Porcentaje de la meta por debajo o por encima del cual un macro está desbalanceado
+LOW_THRESHOLD = 80
+HIGH_THRESHOLD = 120
+
+
+class MacroBalanceTracker:
+    """
+    Balance de macronutrientes que se actualiza de forma incremental
+
+    Guarda el aporte diario de cada producto y los totales acumulados, así
+    que agregar, quitar o cambiar los gramos de un producto es O(1): solo se
+    resta su aporte anterior y se suma el nuevo.
+    """
+
+    def __init__(self):
+        self._contributions: Dict[str, Dict[str, float]] = {}
+        self.totals = {macro: 0.0 for macro in MACROS}
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._contributions
+
+    def __len__(self) -> int:
+        return len(self._contributions)
+
+    def _apply(self, contribution: Dict[str, float], sign: int):
+        for macro in MACROS:
+            self.totals[macro] += sign * contribution[macro]
+
+    def set(self, url: str, nutrition: Dict[str, Any], grams_daily: float):
+        """
+        Agrega un producto o cambia sus gramos diarios
+
+        :param url: URL del producto
+        :param nutrition: Información nutricional por 100g
+        :param grams_daily: Gramos consumidos al día
+        """
+        factor = grams_daily / 100
+        contribution = {macro: (nutrition.get(macro) or 0) * factor for macro in MACROS}
+        previous = self._contributions.get(url)
+        if previous is not None:
+            self._apply(previous, -1)
+        self._contributions[url] = contribution
+        self._apply(contribution, 1)
+
+    def remove(self, url: str):
+        """
+        Quita un producto del balance
+
+        :param url: URL del producto
+        """
+        previous = self._contributions.pop(url, None)
+        if previous is not None:
+            self._apply(previous, -1)
+        if not self._contributions:
+            # Evitar residuos de redondeo cuando no queda ningún producto
+            self.totals = {macro: 0.0 for macro in MACROS}
+
+    def retain(self, urls):
+        """
+        Quita los productos que ya no están en la selección
+
+        :param urls: URLs que se conservan
+        """
+        for url in set(self._contributions) - set(urls):
+            self.remove(url)
+
+    def contribution(self, url: str) -> Optional[Dict[str, float]]:
+        """
+        Devuelve el aporte diario de un producto
+
+        :param url: URL del producto
+        :return: Diccionario de macros o None si no está en el balance
+        """
+        return self._contributions.get(url)
+
+    def balance(self, daily_goals: Dict[str, float]) -> Dict[str, Any]:
+        """
+        Calcula porcentajes y estado de cada macro respecto a las metas
+
+        :param daily_goals: Metas diarias ('daily_protein', 'daily_carbs', 'daily_fat')
+        :return: Diccionario con 'current', 'goals', 'percentages' y 'status'
+            ('low', 'balanced' o 'high')
+        """
+        balance = {
+            'current': dict(self.totals),
+            'goals': daily_goals,
+            'percentages': {},
+            'status': {}
+        }
+        for macro in ('protein', 'carbs', 'fat'):
+            goal = daily_goals.get(f'daily_{macro}')
+            percentage = self.totals[macro] / goal * 100 if goal else 0.0
+            balance['percentages'][macro] = percentage
+            if percentage < LOW_THRESHOLD:
+                balance['status'][macro] = 'low'
+            elif percentage > HIGH_THRESHOLD:
+                balance['status'][macro] = 'high'
+            else:
+                balance['status'][macro] = 'balanced'
+        return balance
@@ -0,0 +1,209 @@
+# utils/meal_planner.py
+import math
+import numpy as np
+from typing import Dict, List, Any, Set, Tuple
+
+
+def schedule_product(
+    grams_daily: float,
+    weight_gr: float,
+    units: int,
+    days: int,
+    previous: Dict[str, Any] = None,
+    from_day: int = 0
+) -> Dict[str, Any]:
+    """
+    Reparte el consumo de un producto entre los días del mes por paquetes
+
+    Se abren solo los paquetes necesarios para cubrir los gramos del mes y
+    su contenido se reparte en partes iguales entre los días, así que cada
+    paquete abierto se termina. Los paquetes comprados de más (por ejemplo
+    por un lote promocional) quedan cerrados para el mes siguiente.
+
+    Con un calendario anterior y from_day > 0 los días previos se conservan
+    y solo se reparte lo que falta entre los días restantes.
+
+    :param grams_daily: Gramos diarios necesarios
+    :param weight_gr: Gramos por paquete
+    :param units: Paquetes comprados en el mes
+    :param days: Días del mes
+    :param previous: Calendario anterior del producto
+    :param from_day: Primer día (desde 0) que se puede modificar
+    :return: Diccionario con 'grams' (por día), 'opened' (paquetes abiertos cada día),
+        'packages_opened' y 'packages_unopened'
+    """
+    from_day = from_day if previous is not None else 0
+    grams = np.zeros(days)
+    grams[:from_day] = previous['grams'][:from_day] if from_day else 0
+    consumed = grams[:from_day].sum()
+
+    needed = consumed + grams_daily * (days - from_day)
+    packages = math.ceil(needed / weight_gr - 1e-9) if needed > 0 else 0
+    # No se pueden abrir más paquetes que los comprados, ni menos que los ya abiertos
+    packages = max(min(units, packages), math.ceil(consumed / weight_gr - 1e-9))
+    if days > from_day:
+        grams[from_day:] = (packages * weight_gr - consumed) / (days - from_day)
+
+    # Paquetes abiertos al final de cada día; se abre uno nuevo al superar el contenido del anterior
+    cumulative = np.concatenate([[0.0], np.cumsum(grams)])
+    opened = np.diff(np.ceil(np.round(cumulative / weight_gr, 9)).astype(int))
+
+    return {
+        'grams': grams,
+        'opened': opened,
+        'packages_opened': packages,
+        'packages_unopened': max(units - packages, 0)
+    }
+
+
+class MealPlanner:
+    """
+    Plan diario del mes por comida, con re-solución incremental
+
+    Cada producto se planifica por separado y el plan se guarda por día.
+    Al cambiar un producto solo se recalcula su calendario y solo se
+    actualizan los días en los que cambian sus gramos.
+    """
+
+    def __init__(self, days: int, meals: List[str]):
+        """
+        :param days: Días del mes
+        :param meals: Nombres de las comidas del día
+        """
+        self.days = days
+        self.meals = list(meals)
+        self._keys: Dict[str, Tuple] = {}
+        self._schedules: Dict[str, Dict[str, Any]] = {}
+        self._names: Dict[str, str] = {}
+        # Por día: url -> (gramos, paquetes abiertos)
+        self._days: List[Dict[str, Tuple[float, int]]] = [{} for _ in range(days)]
+        self.last_affected: Set[int] = set()
+
+    def _write_days(self, url: str, schedule: Dict[str, Any], previous: Dict[str, Any] = None) -> Set[int]:
+        """
+        Copia al plan por día solo los días en que el calendario del producto cambió
+
+        :return: Días actualizados
+        """
+        grams = schedule['grams']
+        opened = schedule['opened']
+        if previous is None:
+            changed = np.flatnonzero(grams > 0)
+        else:
+            changed = np.flatnonzero(
+                ~np.isclose(grams, previous['grams']) | (opened != previous['opened'])
+            )
+        for day in changed:
+            if grams[day] > 0:
+                self._days[day][url] = (float(grams[day]), int(opened[day]))
+            else:
+                self._days[day].pop(url, None)
+        return set(int(day) for day in changed)
+
+    def set_product(
+        self,
+        url: str,
+        name: str,
+        grams_daily: float,
+        weight_gr: float,
+        units: int,
+        from_day: int = 0
+    ) -> Set[int]:
+        """
+        Agrega o actualiza un producto en el plan
+
+        :param url: URL del producto
+        :param name: Nombre a mostrar
+        :param grams_daily: Gramos diarios necesarios
+        :param weight_gr: Gramos por paquete
+        :param units: Paquetes comprados en el mes
+        :param from_day: Primer día que se puede modificar si el producto ya estaba en el plan
+        :return: Días (índices desde 0) cuyo plan cambió
+        """
+        self._names[url] = name
+        key = (round(grams_daily, 6), weight_gr, units)
+        if self._keys.get(url) == key:
+            return set()
+        previous = self._schedules.get(url)
+        schedule = schedule_product(grams_daily, weight_gr, units, self.days, previous, from_day)
+        self._keys[url] = key
+        self._schedules[url] = schedule
+        return self._write_days(url, schedule, previous)
+
+    def remove_product(self, url: str) -> Set[int]:
+        """
+        Quita un producto del plan
+
+        :param url: URL del producto
+        :return: Días cuyo plan cambió
+        """
+        previous = self._schedules.pop(url, None)
+        self._keys.pop(url, None)
+        self._names.pop(url, None)
+        if previous is None:
+            return set()
+        affected = set(int(day) for day in np.flatnonzero(previous['grams'] > 0))
+        for day in affected:
+            self._days[day].pop(url, None)
+        return affected
+
+    def sync(self, items: Dict[str, Dict[str, Any]], from_day: int = 0) -> Set[int]:
+        """
+        Ajusta el plan a la selección actual, recalculando solo lo que cambió
+
+        :param items: URL -> {'name', 'grams_daily', 'weight_gr', 'units'}
+        :param from_day: Primer día que se puede modificar (p. ej. hoy en el mes en curso)
+        :return: Días cuyo plan cambió (también queda en last_affected)
+        """
+        affected = set()
+        for url in set(self._schedules) - set(items):
+            affected |= self.remove_product(url)
+        for url, item in items.items():
+            affected |= self.set_product(
+                url, item['name'], item['grams_daily'], item['weight_gr'], item['units'], from_day
+            )
+        self.last_affected = affected
+        return affected
+
+    def day_plan(self, day: int) -> List[Dict[str, Any]]:
+        """
+        Devuelve las porciones de un día repartidas entre las comidas
+
+        :param day: Índice del día (desde 0)
+        :return: Lista de {'meal', 'url', 'name', 'grams', 'open_packages'}
+        """
+        portions = []
+        for url, (grams, opened) in self._days[day].items():
+            for i, meal in enumerate(self.meals):
+                portions.append({
+                    'meal': meal,
+                    'url': url,
+                    'name': self._names[url],
+                    'grams': grams / len(self.meals),
+                    # Los paquetes nuevos se abren en la primera comida del día
+                    'open_packages': opened if i == 0 else 0
+                })
+        return portions
+
+    def name(self, url: str) -> str:
+        """
+        Nombre a mostrar de un producto del plan
+
+        :param url: URL del producto
+        :return: Nombre del producto
+        """
+        return self._names.get(url, url)
+
+    def summary(self) -> Dict[str, Dict[str, int]]:
+        """
+        Paquetes abiertos y sin abrir de cada producto en el mes
+
+        :return: URL -> {'packages_opened', 'packages_unopened'}
+        """
+        return {
+            url: {
+                'packages_opened': schedule['packages_opened'],
+                'packages_unopened': schedule['packages_unopened']
+            }
+            for url, schedule in self._schedules.items()
+        }
@@ -0,0 +1,244 @@
+# utils/optimizer.py
+import time
+import numpy as np
+from typing import Dict, Any, List, Tuple
+from scipy.optimize import milp, linprog, LinearConstraint, Bounds
+from scipy.sparse import csr_matrix, diags, hstack, vstack, identity
+
+MACROS = ('protein', 'carbs', 'fat')
+
+DEFAULT_TOLERANCES = {
+    'protein': 0.05,
+    'carbs': 0.15,
+    'fat': 0.15
+}
+
+# Productos con los que se intenta primero el problema entero
+INITIAL_CANDIDATES = 60
+
+
+def _build_model(data: Dict[str, np.ndarray], goals, tolerances, days, max_grams_per_product, deviation_penalty):
+    """
+    Construye el modelo lineal para un subconjunto de productos
+
+    Variables: lotes promocionales (n), unidades sueltas (n) y, si las metas
+    son blandas, desviaciones por debajo y por encima de cada meta.
+
+    :return: Tupla (costos, matriz de metas, límites inferiores, límites superiores,
+        matriz de unidades, máximo de unidades, cota superior de variables, integralidad)
+    """
+    n = len(data['weight'])
+    weight = data['weight']
+    promo_units = data['promo_units']
+
+    max_units = np.floor(max_grams_per_product * days / weight)
+    cost = np.concatenate([promo_units * data['promo_price'], data['regular_price']])
+    upper = np.concatenate([
+        np.where(data['has_promo'], np.floor(max_units / promo_units) + 1, 0),
+        np.where(data['has_regular'], max_units, 0)
+    ])
+    integrality = np.ones(2 * n)
+
+    # Gramos diarios de cada macronutriente aportados por cada variable
+    rows, lower_bounds, upper_bounds = [], [], []
+    active_macros = [macro for macro in MACROS if goals.get(macro)]
+    for macro in active_macros:
+        per_unit = weight * data[macro] / 100 / days
+        rows.append(np.concatenate([per_unit * promo_units, per_unit]))
+        lower_bounds.append(goals[macro] * (1 - tolerances[macro]))
+        upper_bounds.append(goals[macro] * (1 + tolerances[macro]))
+    goals_matrix = csr_matrix(np.array(rows)) if rows else None
+
+    n_slack = 0
+    if deviation_penalty is not None and active_macros:
+        # Holguras: por debajo (+) y por encima (-) de la banda de tolerancia
+        n_slack = 2 * len(active_macros)
+        m = len(active_macros)
+        goals_matrix = hstack([goals_matrix, identity(m), -identity(m)]).tocsr()
+        cost = np.concatenate([cost, np.full(n_slack, deviation_penalty)])
+        upper = np.concatenate([upper, np.full(n_slack, np.inf)])
+        integrality = np.concatenate([integrality, np.zeros(n_slack)])
+
+    # Unidades totales por producto dentro del máximo diario (más un lote de margen);
+    # sin promoción basta con la cota de la variable, así que solo se agregan
+    # filas para los productos con promoción
+    promo_rows = np.flatnonzero(data['has_promo'])
+    units_blocks = [diags(promo_units).tocsr()[promo_rows], identity(n, format='csr')[promo_rows]]
+    if n_slack:
+        units_blocks.append(csr_matrix((len(promo_rows), n_slack)))
+    units_matrix = hstack(units_blocks).tocsr()
+
+    return (cost, goals_matrix, np.array(lower_bounds), np.array(upper_bounds),
+            units_matrix, (max_units + promo_units)[promo_rows], upper, integrality)
+
+
+def _solve_lp(model) -> Tuple[float, np.ndarray]:
+    """
+    Resuelve la relajación lineal y devuelve su costo y los costos reducidos
+
+    :return: Tupla (costo óptimo relajado, costos reducidos por variable) o (None, None)
+    """
+    cost, goals_matrix, lower_bounds, upper_bounds, units_matrix, max_units, upper, _ = model
+    a_ub = [units_matrix]
+    b_ub = [max_units]
+    if goals_matrix is not None:
+        a_ub += [goals_matrix, -goals_matrix]
+        b_ub += [upper_bounds, -lower_bounds]
+    result = linprog(
+        cost, A_ub=vstack(a_ub).tocsr(), b_ub=np.concatenate(b_ub),
+        bounds=np.column_stack([np.zeros(len(cost)), upper]), method='highs'
+    )
+    if result.status != 0:
+        return None, None
+    return result.fun, result.lower.marginals
+
+
+def _solve_milp(model, time_limit):
+    cost, goals_matrix, lower_bounds, upper_bounds, units_matrix, max_units, upper, integrality = model
+    constraints = [LinearConstraint(units_matrix, 0, max_units)]
+    if goals_matrix is not None:
+        constraints.append(LinearConstraint(goals_matrix, lower_bounds, upper_bounds))
+    return milp(
+        c=cost,
+        constraints=constraints,
+        integrality=integrality,
+        bounds=Bounds(0, upper),
+        options={'time_limit': time_limit, 'mip_rel_gap': 1e-4}
+    )
+
+
+def optimize_diet(
+    columns: Dict[str, np.ndarray],
+    goals: Dict[str, float],
+    days: int = 30,
+    tolerances: Dict[str, float] = None,
+    max_grams_per_product: float = 500.0,
+    deviation_penalty: float = None,
+    time_limit: float = 5.0
+) -> Dict[str, Any]:
+    """
+    Elige productos y unidades enteras al mes para cubrir las metas diarias
+    de macronutrientes al menor costo mensual (programación lineal entera)
+
+    Por cada producto se decide cuántos lotes promocionales y cuántas
+    unidades sueltas comprar, así que el costo usa el precio de
+    ``price.promotion`` cuando conviene (el primer nivel si hay varios).
+
+    Primero se resuelve la relajación lineal sobre todo el catálogo y el
+    problema entero solo con los productos más prometedores. Con los costos
+    reducidos se descartan de forma exacta los productos que no pueden
+    mejorar esa solución; si alguno no se descartó, se resuelve de nuevo
+    incluyéndolo con el tiempo que quede. Si esa ampliación no termina, el
+    resultado es 'feasible': quedan productos que podrían bajar el costo.
+
+    :param columns: Columnas del catálogo (ver utils.calculations.catalog_columns)
+    :param goals: Metas diarias {'protein', 'carbs', 'fat'} en gramos; None para ignorar una
+    :param days: Días del mes
+    :param tolerances: Tolerancia relativa por macronutriente (0.1 = ±10%)
+    :param max_grams_per_product: Máximo de gramos diarios de un mismo producto
+    :param deviation_penalty: Si se indica, las metas son blandas y cada gramo
+        diario fuera de la tolerancia cuesta esta cantidad de soles al mes
+    :param time_limit: Tiempo máximo en segundos para todos los problemas enteros
+    :return: Diccionario con el estado, el costo y los productos elegidos
+    """
+    tolerances = {**DEFAULT_TOLERANCES, **(tolerances or {})}
+
+    weight = columns['weight_gr']
+    regular_price = columns['regular_price']
+    promo_price = np.nan_to_num(columns['promo_price'])
+    promo_units = np.nan_to_num(columns['promo_units'])
+
+    has_regular = np.isfinite(regular_price) & (regular_price > 0)
+    has_promo = (promo_price > 0) & (promo_units > 0)
+    valid = (np.isfinite(weight) & (weight > 0) & (has_regular | has_promo) &
+             np.all([np.isfinite(columns[f'{macro}_per_100g']) for macro in MACROS], axis=0))
+    candidates = np.flatnonzero(valid)
+    if not len(candidates):
+        return {'status': 'infeasible', 'message': "No hay productos con precio y nutrición"}
+
+    data = {
+        'weight': weight[candidates],
+        'has_regular': has_regular[candidates],
+        'has_promo': has_promo[candidates],
+        'regular_price': np.where(has_regular, regular_price, 0.0)[candidates],
+        'promo_price': promo_price[candidates],
+        'promo_units': np.where(has_promo, promo_units, 1.0)[candidates]
+    }
+    for macro in MACROS:
+        data[macro] = columns[f'{macro}_per_100g'][candidates]
+    n = len(candidates)
+
+    def build(subset):
+        return _build_model(
+            {key: values[subset] for key, values in data.items()},
+            goals, tolerances, days, max_grams_per_product, deviation_penalty
+        )
+
+    full_model = build(np.arange(n))
+    lp_cost, reduced_costs = _solve_lp(full_model)
+    if lp_cost is None:
+        return {'status': 'infeasible', 'message': "Las metas no se pueden cumplir con el catálogo"}
+    # Las variables sin cota (producto sin promoción o sin precio regular) no cuentan
+    reduced_costs = np.where(full_model[6] > 0, reduced_costs, np.inf)
+    product_reduced_cost = np.minimum(reduced_costs[:n], reduced_costs[n:2 * n])
+    ranking = np.argsort(product_reduced_cost, kind='stable')
+
+    # Problema entero sobre los productos de menor costo reducido, ampliando si no es factible
+    deadline = time.perf_counter() + time_limit
+    size = min(n, INITIAL_CANDIDATES)
+    while True:
+        subset = np.sort(ranking[:size])
+        result = _solve_milp(build(subset), max(deadline - time.perf_counter(), 0.0))
+        if result.x is not None or size == n or time.perf_counter() >= deadline:
+            break
+        size = min(n, size * 4)
+    if result.x is None:
+        return {'status': 'infeasible', 'message': result.message}
+
+    # Fijación por costo reducido: ningún producto fuera de este conjunto puede bajar el costo
+    eligible = np.flatnonzero(product_reduced_cost <= result.fun - lp_cost + 1e-7)
+    missing = np.setdiff1d(eligible, subset)
+    proven = result.status == 0
+    if len(missing):
+        remaining = deadline - time.perf_counter()
+        extended_subset = np.union1d(subset, missing)
+        extended = _solve_milp(build(extended_subset), remaining) if remaining > 0 else None
+        if extended is not None and extended.x is not None and extended.fun <= result.fun:
+            subset, result = extended_subset, extended
+        # Sin terminar la ampliación no se sabe si los productos que faltan bajan el costo
+        proven = extended is not None and extended.status == 0
+
+    m = len(subset)
+    x = np.round(result.x[:2 * m])
+    promo_sets, single_units = x[:m], x[m:]
+    sub = {key: values[subset] for key, values in data.items()}
+    units = promo_sets * sub['promo_units'] + single_units
+    item_costs = promo_sets * sub['promo_units'] * sub['promo_price'] + single_units * sub['regular_price']
+
+    items: List[Dict[str, Any]] = []
+    for i in np.flatnonzero(units > 0):
+        items.append({
+            'url': columns['url'][candidates[subset[i]]],
+            'units': int(units[i]),
+            'promo_sets': int(promo_sets[i]),
+            'single_units': int(single_units[i]),
+            'grams_daily': float(units[i] * sub['weight'][i] / days),
+            'total_cost': float(item_costs[i]),
+            'daily_cost': float(item_costs[i] / days)
+        })
+    items.sort(key=lambda item: item['total_cost'], reverse=True)
+
+    totals = {
+        macro: float(np.sum(units * sub['weight'] * sub[macro] / 100) / days)
+        for macro in MACROS
+    }
+    total_cost = float(np.sum(item_costs))
+
+    return {
+        'status': 'optimal' if proven else 'feasible',
+        'message': result.message,
+        'total_cost': total_cost,
+        'daily_cost': total_cost / days,
+        'daily_macros': totals,
+        'items': items
+    }
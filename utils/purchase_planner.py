@@ -0,0 +1,286 @@
+# utils/purchase_planner.py
+import math
+import calendar
+import numpy as np
+from typing import Dict, Any, List, Tuple, Optional
+
+
+def promotion_tiers(price_info: Dict[str, Any]) -> List[Tuple[int, float]]:
+    """
+    Obtiene los niveles de promoción de un producto
+
+    ``price.promotion`` puede ser un diccionario {'units', 'price'} o una
+    lista de ellos cuando hay varios niveles (p. ej. 3x y 6x). El precio de
+    cada nivel es el precio por unidad al comprar el lote completo.
+
+    :param price_info: Diccionario 'price' del producto
+    :return: Lista de tuplas (unidades del lote, precio por unidad)
+    """
+    promotion = (price_info or {}).get('promotion')
+    if not promotion:
+        return []
+    if isinstance(promotion, dict):
+        promotion = [promotion]
+
+    tiers = []
+    for tier in promotion:
+        try:
+            units = int(tier.get('units'))
+            price = float(tier.get('price'))
+        except (TypeError, ValueError):
+            continue
+        if units > 0 and price > 0:
+            tiers.append((units, price))
+    return tiers
+
+
+def tier_arrays(tiers_per_product: List[List[Tuple[int, float]]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convierte los niveles de promoción de varios productos en matrices
+
+    :param tiers_per_product: Lista (un elemento por producto) de listas de niveles
+    :return: Tupla (unidades, precios) de forma (productos, niveles), con NaN de relleno
+    """
+    max_tiers = max((len(tiers) for tiers in tiers_per_product), default=0)
+    units = np.full((len(tiers_per_product), max_tiers), np.nan)
+    prices = np.full((len(tiers_per_product), max_tiers), np.nan)
+    for row, tiers in enumerate(tiers_per_product):
+        for column, (tier_units, tier_price) in enumerate(tiers):
+            units[row, column] = tier_units
+            prices[row, column] = tier_price
+    return units, prices
+
+
+def plan_purchases(
+    units_needed: np.ndarray,
+    regular_price: np.ndarray,
+    tier_units: Optional[np.ndarray] = None,
+    tier_prices: Optional[np.ndarray] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Calcula la combinación más barata de lotes promocionales y unidades
+    sueltas que cubre exactamente o supera las unidades necesarias
+
+    Con un solo nivel de promoción la solución es cerrada: lo óptimo es
+    comprar floor(N/k) lotes más sueltas, ceil(N/k) lotes o solo sueltas.
+    Con varios niveles se usa programación dinámica sobre el número de
+    unidades, vectorizada sobre los productos.
+
+    :param units_needed: Unidades enteras necesarias, forma (productos,) o (productos, periodos)
+    :param regular_price: Precio regular por unidad de cada producto (NaN si no se vende suelto)
+    :param tier_units: Unidades de cada lote, forma (productos, niveles)
+    :param tier_prices: Precio por unidad de cada lote, forma (productos, niveles)
+    :return: Diccionario con 'total_cost', 'units' (compradas), 'single_units' y
+        'promo_sets' (forma (..., niveles)); costo NaN si no hay forma de comprar
+    """
+    need = np.asarray(units_needed, dtype=np.int64)
+    one_dimensional = need.ndim == 1
+    if one_dimensional:
+        need = need[:, None]
+    n_products, n_periods = need.shape
+
+    regular = np.asarray(regular_price, dtype=np.float64).reshape(n_products)
+    regular = np.where(np.isfinite(regular), regular, np.inf)
+    if tier_units is None or tier_prices is None:
+        tier_units = np.empty((n_products, 0))
+        tier_prices = np.empty((n_products, 0))
+    tier_units = np.asarray(tier_units, dtype=np.float64).reshape(n_products, -1)
+    tier_prices = np.asarray(tier_prices, dtype=np.float64).reshape(n_products, -1)
+    n_tiers = tier_units.shape[1]
+
+    valid = np.isfinite(tier_units) & np.isfinite(tier_prices) & (tier_units >= 1) & (tier_prices > 0)
+    lot_size = np.where(valid, np.round(np.nan_to_num(tier_units)), 1).astype(np.int64)
+    lot_cost = np.where(valid, lot_size * np.nan_to_num(tier_prices), np.inf)
+    valid_count = valid.sum(axis=1)
+
+    single_units = np.where(need > 0, need, 0)
+    promo_sets = np.zeros((n_products, n_periods, n_tiers), dtype=np.int64)
+
+    # Un nivel: comparar floor(N/k) lotes + sueltas, ceil(N/k) lotes y solo sueltas
+    rows = np.flatnonzero(valid_count == 1)
+    if len(rows):
+        tier = np.argmax(valid[rows], axis=1)
+        k = lot_size[rows, tier][:, None]
+        set_cost = lot_cost[rows, tier][:, None]
+        unit_price = regular[rows][:, None]
+        n = np.maximum(need[rows], 0)
+
+        floor_sets = n // k
+        remainder = n - floor_sets * k
+        ceil_sets = floor_sets + (remainder > 0)
+        with np.errstate(invalid='ignore'):
+            options = np.stack([
+                n * unit_price,
+                floor_sets * set_cost + np.where(remainder > 0, remainder * unit_price, 0),
+                ceil_sets * set_cost
+            ])
+        options = np.where(np.isnan(options), np.inf, options)
+        best = np.argmin(options, axis=0)
+
+        sets = np.select([best == 1, best == 2], [floor_sets, ceil_sets], 0)
+        single_units[rows] = np.select([best == 0, best == 1], [n, remainder], 0)
+        promo_sets[rows[:, None], np.arange(n_periods)[None, :], tier[:, None]] = sets
+
+    # Varios niveles: programación dinámica de costo mínimo para cubrir x unidades
+    rows = np.flatnonzero(valid_count > 1)
+    if len(rows):
+        max_need = int(max(need[rows].max(), 0))
+        cost = np.zeros((len(rows), max_need + 1))
+        choice = np.full((len(rows), max_need + 1), -1, dtype=np.int8)
+        row_index = np.arange(len(rows))
+        for x in range(1, max_need + 1):
+            best = cost[:, x - 1] + regular[rows]
+            best_choice = np.full(len(rows), -1, dtype=np.int8)
+            for t in range(n_tiers):
+                candidate = cost[row_index, np.maximum(x - lot_size[rows, t], 0)] + lot_cost[rows, t]
+                better = candidate < best
+                best = np.where(better, candidate, best)
+                best_choice = np.where(better, t, best_choice)
+            cost[:, x] = best
+            choice[:, x] = best_choice
+
+        position = np.maximum(need[rows], 0)
+        singles = np.zeros_like(position)
+        sets = np.zeros((len(rows), n_periods, n_tiers), dtype=np.int64)
+        while (position > 0).any():
+            active = position > 0
+            step = choice[row_index[:, None], position]
+            take_single = active & (step == -1)
+            singles += take_single
+            position = position - take_single
+            for t in range(n_tiers):
+                take_set = active & (step == t)
+                sets[..., t] += take_set
+                position = np.where(take_set, np.maximum(position - lot_size[rows, t][:, None], 0), position)
+        single_units[rows] = singles
+        promo_sets[rows] = sets
+
+    # El costo se recalcula a partir de las cantidades para que sea idéntico en todos los casos
+    with np.errstate(invalid='ignore'):
+        sets_cost = np.where(promo_sets > 0, promo_sets * lot_cost[:, None, :], 0).sum(axis=2)
+        singles_cost = np.where(single_units > 0, single_units * regular[:, None], 0)
+    total_cost = sets_cost + singles_cost
+    total_cost = np.where(np.isfinite(total_cost), total_cost, np.nan)
+    units = single_units + (promo_sets * lot_size[:, None, :]).sum(axis=2)
+
+    plan = {
+        'total_cost': total_cost,
+        'units': units,
+        'single_units': single_units,
+        'promo_sets': promo_sets
+    }
+    if one_dimensional:
+        plan = {key: value[:, 0] for key, value in plan.items()}
+    return plan
+
+
+def plan_purchase(units_needed: int, regular_price: float, tiers: List[Tuple[int, float]]) -> Dict[str, Any]:
+    """
+    Versión para un solo producto de plan_purchases
+
+    Usa la misma aritmética y el mismo criterio de desempate que la versión
+    vectorizada, en Python puro para evitar el costo fijo de NumPy en
+    llamadas individuales.
+
+    :param units_needed: Unidades enteras necesarias
+    :param regular_price: Precio regular por unidad (None si no se vende suelto)
+    :param tiers: Lista de niveles (unidades del lote, precio por unidad)
+    :return: Diccionario con costo total, unidades compradas, sueltas y lotes por nivel
+    """
+    need = max(int(units_needed), 0)
+    unit_price = math.inf if regular_price is None or not math.isfinite(regular_price) else float(regular_price)
+    valid = [
+        math.isfinite(units) and math.isfinite(price) and units >= 1 and price > 0
+        for units, price in tiers
+    ]
+    lot_size = [int(round(units)) if ok else 1 for (units, _), ok in zip(tiers, valid)]
+    lot_cost = [size * price if ok else math.inf for size, (_, price), ok in zip(lot_size, tiers, valid)]
+
+    single_units = need
+    promo_sets = [0] * len(tiers)
+    valid_tiers = [t for t, ok in enumerate(valid) if ok]
+
+    if len(valid_tiers) == 1:
+        # Un nivel: floor(N/k) lotes + sueltas, ceil(N/k) lotes o solo sueltas
+        tier = valid_tiers[0]
+        k, set_cost = lot_size[tier], lot_cost[tier]
+        floor_sets, remainder = divmod(need, k)
+        ceil_sets = floor_sets + (remainder > 0)
+        options = [
+            need * unit_price,
+            floor_sets * set_cost + (remainder * unit_price if remainder > 0 else 0),
+            ceil_sets * set_cost
+        ]
+        options = [math.inf if math.isnan(option) else option for option in options]
+        best = options.index(min(options))
+        promo_sets[tier] = (0, floor_sets, ceil_sets)[best]
+        single_units = (need, remainder, 0)[best]
+    elif len(valid_tiers) > 1:
+        # Varios niveles: programación dinámica de costo mínimo para cubrir x unidades
+        cost = [0.0] * (need + 1)
+        choice = [-1] * (need + 1)
+        for x in range(1, need + 1):
+            best, best_choice = cost[x - 1] + unit_price, -1
+            for t in range(len(tiers)):
+                candidate = cost[max(x - lot_size[t], 0)] + lot_cost[t]
+                if candidate < best:
+                    best, best_choice = candidate, t
+            cost[x] = best
+            choice[x] = best_choice
+        single_units = 0
+        position = need
+        while position > 0:
+            step = choice[position]
+            if step == -1:
+                single_units += 1
+                position -= 1
+            else:
+                promo_sets[step] += 1
+                position = max(position - lot_size[step], 0)
+
+    # El costo se recalcula a partir de las cantidades, igual que en plan_purchases
+    total_cost = sum(sets * cost for sets, cost in zip(promo_sets, lot_cost) if sets > 0)
+    total_cost += single_units * unit_price if single_units > 0 else 0
+    return {
+        'total_cost': total_cost if math.isfinite(total_cost) else math.nan,
+        'units': single_units + sum(sets * size for sets, size in zip(promo_sets, lot_size)),
+        'single_units': single_units,
+        'promo_sets': promo_sets
+    }
+
+
+def days_per_month(year: int) -> np.ndarray:
+    """
+    Días de cada mes de un año
+
+    :param year: Año
+    :return: Arreglo de 12 enteros
+    """
+    return np.array([calendar.monthrange(year, month)[1] for month in range(1, 13)])
+
+
+def plan_year(
+    units_daily: np.ndarray,
+    regular_price: np.ndarray,
+    tier_units: Optional[np.ndarray],
+    tier_prices: Optional[np.ndarray],
+    year: int
+) -> Dict[str, np.ndarray]:
+    """
+    Planifica la compra de todos los productos para los 12 meses de un año
+    en una sola llamada
+
+    :param units_daily: Unidades consumidas al día por producto
+    :param regular_price: Precio regular por unidad
+    :param tier_units: Unidades de cada lote, forma (productos, niveles)
+    :param tier_prices: Precio por unidad de cada lote, forma (productos, niveles)
+    :param year: Año a planificar
+    :return: Plan con arreglos de forma (productos, 12) y 'days' con los días de cada mes
+    """
+    days = days_per_month(year)
+    with np.errstate(invalid='ignore'):
+        needed = np.ceil(np.asarray(units_daily, dtype=np.float64)[:, None] * days[None, :])
+    needed = np.where(np.isfinite(needed), needed, 0).astype(np.int64)
+    plan = plan_purchases(needed, regular_price, tier_units, tier_prices)
+    plan['days'] = days
+    return plan
@@ -0,0 +1,76 @@
+# utils/sensitivity.py
+import numpy as np
+from typing import Dict, Union
+from utils.purchase_planner import plan_purchases
+
+ArrayLike = Union[float, np.ndarray]
+
+
+def sweep_scenarios(
+    columns: Dict[str, np.ndarray],
+    weights: ArrayLike,
+    protein_factors: ArrayLike,
+    carbs_factors: ArrayLike,
+    fats_factors: ArrayLike,
+    days: int = 30
+) -> Dict[str, np.ndarray]:
+    """
+    Evalúa en una sola pasada vectorizada una grilla de escenarios de peso
+    corporal y factores de macronutrientes para los productos seleccionados
+
+    Como en la página principal, la proteína diaria se reparte en partes
+    iguales entre los productos y se compra la cantidad entera más barata
+    (con promociones) para el mes. El costo solo depende de la proteína
+    diaria, así que se calcula una vez por valor distinto de
+    peso × factor de proteína y se reutiliza en el resto de los ejes.
+
+    :param columns: Columnas de los productos seleccionados (ver catalog_columns)
+    :param weights: Pesos corporales en kg
+    :param protein_factors: Gramos de proteína por kg
+    :param carbs_factors: Gramos de carbohidratos por kg
+    :param fats_factors: Gramos de grasas por kg
+    :param days: Días del mes
+    :return: Diccionario con 'monthly_cost', 'daily_protein', 'carbs_pct' y 'fat_pct'
+        de forma (pesos, factores de proteína, factores de carbohidratos, factores de grasa)
+    """
+    weights = np.atleast_1d(np.asarray(weights, dtype=np.float64))
+    protein_factors = np.atleast_1d(np.asarray(protein_factors, dtype=np.float64))
+    carbs_factors = np.atleast_1d(np.asarray(carbs_factors, dtype=np.float64))
+    fats_factors = np.atleast_1d(np.asarray(fats_factors, dtype=np.float64))
+    shape = (len(weights), len(protein_factors), len(carbs_factors), len(fats_factors))
+
+    daily_protein = weights[:, None] * protein_factors[None, :]
+    protein_values, inverse = np.unique(daily_protein, return_inverse=True)
+    inverse = inverse.reshape(daily_protein.shape)
+
+    n_products = len(columns['weight_gr'])
+    if not n_products:
+        nan = np.full(shape, np.nan)
+        return {'monthly_cost': nan, 'daily_protein': np.broadcast_to(daily_protein[:, :, None, None], shape),
+                'carbs_pct': nan, 'fat_pct': nan}
+
+    # Gramos diarios de cada producto por valor de proteína: (productos, escenarios)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        grams = (protein_values[None, :] / n_products * 100) / columns['protein_per_100g'][:, None]
+        units_needed = np.ceil(grams / columns['weight_gr'][:, None] * days)
+    feasible = np.isfinite(units_needed).all(axis=0)
+    units_needed = np.where(np.isfinite(units_needed), units_needed, 0).astype(np.int64)
+
+    plan = plan_purchases(units_needed, columns['regular_price'], columns['tier_units'], columns['tier_prices'])
+    cost = np.where(feasible, plan['total_cost'].sum(axis=0), np.nan)
+
+    carbs = np.nansum(grams * columns['carbs_per_100g'][:, None] / 100, axis=0)
+    fat = np.nansum(grams * columns['fat_per_100g'][:, None] / 100, axis=0)
+
+    # Porcentaje de la meta cubierto: (pesos, proteína, carbohidratos, grasas)
+    carbs_goal = weights[:, None, None, None] * carbs_factors[None, None, :, None]
+    fat_goal = weights[:, None, None, None] * fats_factors[None, None, None, :]
+    carbs_pct = carbs[inverse][:, :, None, None] / carbs_goal * 100
+    fat_pct = fat[inverse][:, :, None, None] / fat_goal * 100
+
+    return {
+        'monthly_cost': np.broadcast_to(cost[inverse][:, :, None, None], shape),
+        'daily_protein': np.broadcast_to(daily_protein[:, :, None, None], shape),
+        'carbs_pct': np.broadcast_to(carbs_pct, shape),
+        'fat_pct': np.broadcast_to(fat_pct, shape)
+    }